@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+'''
+Micro benchmarks for soapfish.
+
+Each module can be run on its own, e.g.:
+
+    python -m benchmarks.parse_scaling
+
+The numbers are only meaningful relative to each other (on the same machine).
+'''
+
+from __future__ import absolute_import, print_function
+
+import timeit
+
+__all__ = ['best_of', 'report']
+
+
+def best_of(func, repeat=5, number=1):
+    '''
+    Returns the best time (in seconds) for a single call of ``func``.
+    '''
+    timer = timeit.Timer(func)
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+
+def report(title, rows, headers):
+    rows = [['%.6f' % value if isinstance(value, float) else str(value) for value in row] for row in rows]
+    widths = [max([len(str(header)), 14] + [len(row[i]) for row in rows]) for i, header in enumerate(headers)]
+    print(title)
+    print('-' * len(title))
+    print('  '.join(str(header).rjust(width) for header, width in zip(headers, widths)))
+    for row in rows:
+        print('  '.join(value.rjust(width) for value, width in zip(row, widths)))
+    print()
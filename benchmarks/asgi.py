@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+'''
+Concurrent slow SOAP calls (the service method waits 50 ms for downstream
+I/O): WsgiSoapApplication served by a pool of worker threads vs.
+AsgiSoapApplication with an async service method in a single event loop.
+'''
+
+from __future__ import absolute_import, print_function
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from soapfish.aio import AsgiSoapApplication
+from soapfish.soap_dispatch import SOAPDispatcher, WsgiSoapApplication
+from soapfish.testutil import echo_service
+from soapfish.testutil.echo_service import EchoType
+
+from . import report
+from .serializer import ECHO_REQUEST
+
+CONCURRENCY = (10, 100, 1000)
+WORKER_THREADS = 16
+DELAY = 0.05
+
+
+def _wsgi_app():
+    def echo(request, input_):
+        time.sleep(DELAY)
+        return EchoType.create(input_.value)
+    return WsgiSoapApplication(SOAPDispatcher(echo_service(echo)))
+
+
+def _asgi_app():
+    async def echo(request, input_):
+        await asyncio.sleep(DELAY)
+        return EchoType.create(input_.value)
+    return AsgiSoapApplication(SOAPDispatcher(echo_service(echo)))
+
+
+def _wsgi_calls(app, count):
+    def call(_):
+        environ = {'SOAPACTION': 'echo', 'REQUEST_METHOD': 'POST', 'CONTENT_LENGTH': str(len(ECHO_REQUEST)),
+                   'wsgi.input': BytesIO(ECHO_REQUEST)}
+        return b''.join(app(environ, lambda status, headers: None))
+    with ThreadPoolExecutor(WORKER_THREADS) as executor:
+        list(executor.map(call, range(count)))
+
+
+def _asgi_calls(app, count):
+    async def call():
+        scope = {'type': 'http', 'method': 'POST', 'path': '/', 'headers': [(b'soapaction', b'echo')]}
+
+        async def receive():
+            return {'type': 'http.request', 'body': ECHO_REQUEST}
+
+        async def send(message):
+            pass
+        await app(scope, receive, send)
+
+    async def calls():
+        await asyncio.gather(*[call() for _ in range(count)])
+    loop = asyncio.new_event_loop()
+    try:
+        loop.run_until_complete(calls())
+    finally:
+        loop.close()
+
+
+def _seconds(func, *args):
+    start = time.time()
+    func(*args)
+    return time.time() - start
+
+
+def main():
+    wsgi_app, asgi_app = _wsgi_app(), _asgi_app()
+    rows = []
+    for count in CONCURRENCY:
+        wsgi = _seconds(_wsgi_calls, wsgi_app, count)
+        asgi = _seconds(_asgi_calls, asgi_app, count)
+        rows.append((count, wsgi * 1e3, asgi * 1e3, int(count / wsgi), int(count / asgi)))
+    report('%d ms calls, WSGI (%d threads) vs. ASGI [ms]' % (DELAY * 1e3, WORKER_THREADS), rows,
+           headers=('calls', 'wsgi ms', 'asgi ms', 'wsgi calls/s', 'asgi calls/s'))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+'''
+Fanning out calls to a slow service (20 ms per call): Stub.call() one after
+the other and from a pool of threads vs. AsyncStub.call() with asyncio.
+'''
+
+from __future__ import absolute_import, print_function
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from soapfish.aio import AsgiSoapApplication, AsyncStub
+from soapfish.soap import Stub
+from soapfish.soap_dispatch import SOAPDispatcher
+from soapfish.testutil import echo_service
+from soapfish.testutil.aio import serve_asgi
+from soapfish.testutil.echo_service import EchoType
+
+from . import report
+
+CALL_COUNTS = (10, 100, 500)
+WORKER_THREADS = 16
+DELAY = 0.02
+
+
+def _start_server():
+    async def echo(request, input_):
+        await asyncio.sleep(DELAY)
+        return EchoType.create(input_.value)
+    app = AsgiSoapApplication(SOAPDispatcher(echo_service(echo)))
+    loop = asyncio.new_event_loop()
+    server, location = loop.run_until_complete(serve_asgi(app))
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    return location
+
+
+def _seconds(func, *args):
+    start = time.time()
+    func(*args)
+    return time.time() - start
+
+
+def main():
+    location = _start_server()
+    stub = Stub(location=location, service=echo_service())
+    echo = EchoType.create('foo')
+
+    def sequential(count):
+        for _ in range(count):
+            stub.call('echoOperation', echo)
+
+    def threads(count):
+        with ThreadPoolExecutor(WORKER_THREADS) as executor:
+            list(executor.map(lambda _: stub.call('echoOperation', echo), range(count)))
+
+    def async_calls(count):
+        async def calls():
+            async_stub = AsyncStub(location=location, service=echo_service())
+            await asyncio.gather(*[async_stub.call('echoOperation', echo) for _ in range(count)])
+        loop = asyncio.new_event_loop()
+        try:
+            loop.run_until_complete(calls())
+        finally:
+            loop.close()
+
+    rows = []
+    for count in CALL_COUNTS:
+        rows.append((count, _seconds(sequential, count) * 1e3, _seconds(threads, count) * 1e3,
+                     _seconds(async_calls, count) * 1e3))
+    report('%d ms calls [ms]' % (DELAY * 1e3), rows,
+           headers=('calls', 'Stub', 'Stub, %d threads' % WORKER_THREADS, 'AsyncStub'))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+'''
+Many independent calls of the same operation against a local server (5 ms
+per call): Stub.call() in a loop vs. Stub.call_many().
+'''
+
+from __future__ import absolute_import, print_function
+
+import time
+
+from soapfish.soap import Stub
+from soapfish.testutil import echo_service
+from soapfish.testutil.echo_service import EchoType
+
+from . import report
+from .session import _start_server
+
+CALL_COUNT = 500
+WORKERS = (1, 4, 10, 32)
+DELAY = 0.005
+
+
+def _seconds(func):
+    start = time.time()
+    func()
+    return time.time() - start
+
+
+def main():
+    location = _start_server(DELAY)
+    parameters = [EchoType.create('value %d' % i) for i in range(CALL_COUNT)]
+    rows = []
+    with Stub(location=location, service=echo_service(), pool_maxsize=max(WORKERS)) as stub:
+        seconds = _seconds(lambda: [stub.call('echoOperation', parameter) for parameter in parameters])
+        rows.append(('call() loop', seconds * 1e3, int(CALL_COUNT / seconds)))
+        for max_workers in WORKERS:
+            seconds = _seconds(lambda: stub.call_many('echoOperation', parameters, max_workers=max_workers))
+            rows.append(('call_many(), %d workers' % max_workers, seconds * 1e3, int(CALL_COUNT / seconds)))
+    report('%d calls of %d ms' % (CALL_COUNT, DELAY * 1e3), rows, headers=('method', 'ms', 'calls/s'))
+
+
+if __name__ == '__main__':
+    main()
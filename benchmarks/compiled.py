@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+'''
+Generic vs. compiled (``COMPILED = True``) parsing and rendering for the
+classes generated by xsd2py from tests/assets/generation/default.xsd and for
+the benchmark order/request types.
+'''
+
+from __future__ import absolute_import, print_function
+
+import os
+from datetime import datetime
+
+from lxml import etree
+
+from soapfish import xsd, xsd2py
+from soapfish.testutil import generated_symbols
+
+from . import best_of, report
+from .dedupe import Order, _order_xml
+from .lazy import Request, request_xml
+
+NUMBER = 10
+REPEAT = 10
+ITEM_COUNT = 1000
+OPS_COUNT = 200
+SCHEMA = os.path.join(os.path.dirname(__file__), os.pardir, 'tests', 'assets', 'generation', 'default.xsd')
+
+
+def _generated_types():
+    with open(SCHEMA, 'rb') as f:
+        code = xsd2py.generate_code_from_xsd(f.read(), cwd=os.path.dirname(SCHEMA))
+    return generated_symbols(code)[1]
+
+
+def _ops_xml(types):
+    airport = types['Airport'](code_type='ICAO', code='EGLL')
+    ops = types['Ops'](
+        aircraft='N608WB', flight_number='123123', type='COMMERCIAL',
+        takeoff_airport=airport, takeoff_datetime=datetime(2017, 1, 1, 12, 0),
+        takeoff_fuel=types['Weight'](value=100, unit='kg'), takeoff_pilot='CAPTAIN',
+        landing_airport=airport, landing_datetime=datetime(2017, 1, 1, 14, 0),
+        landing_fuel=types['Weight'](value=20, unit='kg'), V2=150, Vref=140,
+    )
+    return ''.join(['<root>', ops.xml('ops').decode('utf-8') * OPS_COUNT, '</root>']).encode('utf-8')
+
+
+def _best_of(func, compiled):
+    xsd.ComplexType.COMPILED = compiled
+    try:
+        return best_of(func, repeat=1, number=NUMBER)
+    finally:
+        xsd.ComplexType.COMPILED = False
+
+
+def _measure(cls, xmlelements):
+    '''
+    Returns the best parse and render times of the generic and the compiled
+    functions. Both modes are timed alternately so that load changes on the
+    machine affect them alike.
+    '''
+    instances = [cls.parse_xmlelement(xmlelement) for xmlelement in xmlelements]
+
+    def parse():
+        return [cls.parse_xmlelement(xmlelement) for xmlelement in xmlelements]
+
+    def render():
+        return [instance.render(etree.Element('root'), instance) for instance in instances]
+
+    times = [[], [], [], []]
+    for _ in range(REPEAT):
+        for i, (func, compiled) in enumerate([(parse, False), (parse, True), (render, False), (render, True)]):
+            times[i].append(_best_of(func, compiled))
+    return [min(t) * 1e6 for t in times]
+
+
+def main():
+    types = _generated_types()
+    documents = [
+        ('%d generated Ops' % OPS_COUNT, types['Ops'], list(etree.fromstring(_ops_xml(types)))),
+        ('order, %d items' % ITEM_COUNT, Order, [etree.fromstring(_order_xml(ITEM_COUNT))]),
+        ('request, 200 fields', Request, [request_xml()]),
+    ]
+    rows = []
+    for title, cls, xmlelements in documents:
+        parse, compiled_parse, render, compiled_render = _measure(cls, xmlelements)
+        rows.append((title, parse, compiled_parse, parse / compiled_parse,
+                     render, compiled_render, render / compiled_render))
+    headers = ('document', 'parse us', 'compiled us', 'speedup', 'render us', 'compiled us', 'speedup')
+    report('Generic vs. compiled parse/render functions', rows, headers=headers)
+
+
+if __name__ == '__main__':
+    main()
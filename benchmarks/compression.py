@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+'''
+WsgiSoapApplication with and without gzip compression of the requests and
+responses: bytes on the wire and time per request (echo service).
+'''
+
+from __future__ import absolute_import, print_function
+
+from io import BytesIO
+
+from soapfish import compression
+from soapfish.soap_dispatch import SOAPDispatcher, WsgiSoapApplication
+from soapfish.testutil import echo_service
+from soapfish.xsd_serializer import _escape_text
+
+from . import best_of, report
+from .dedupe import _order_xml
+
+ITEM_COUNTS = (10, 100, 1000)
+NUMBER = 20
+
+
+def _echo_request(item_count):
+    value = _escape_text(_order_xml(item_count).decode('ascii'))
+    return ('<senv:Envelope xmlns:senv="http://schemas.xmlsoap.org/soap/envelope/"><senv:Body>'
+            '<ns1:echoRequest xmlns:ns1="http://soap.example/echo/types"><value>%s</value></ns1:echoRequest>'
+            '</senv:Body></senv:Envelope>' % value).encode('ascii')
+
+
+def main():
+    app = WsgiSoapApplication(SOAPDispatcher(echo_service()), compress_responses=True)
+    rows = []
+    for item_count in ITEM_COUNTS:
+        plain = _echo_request(item_count)
+        gzipped = compression.compress(plain, 'gzip')
+
+        def call(content, **environ):
+            environ.update({'SOAPACTION': 'echo', 'REQUEST_METHOD': 'POST', 'CONTENT_LENGTH': str(len(content)),
+                            'wsgi.input': BytesIO(content)})
+            return b''.join(app(environ, lambda status, headers: None))
+        response = call(gzipped, HTTP_CONTENT_ENCODING='gzip', HTTP_ACCEPT_ENCODING='gzip')
+        uncompressed = best_of(lambda: call(plain), number=NUMBER)
+        compressed = best_of(lambda: call(gzipped, HTTP_CONTENT_ENCODING='gzip', HTTP_ACCEPT_ENCODING='gzip'),
+                             number=NUMBER)
+        rows.append((item_count, len(plain) + len(call(plain)), len(gzipped) + len(response),
+                     uncompressed * 1e6, compressed * 1e6))
+    report('WsgiSoapApplication, request + response', rows,
+           headers=('items', 'bytes', 'gzip bytes', 'us plain', 'us gzip'))
+
+
+if __name__ == '__main__':
+    main()
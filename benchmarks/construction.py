@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+'''
+Construction throughput for a ComplexType with 50 fields.
+'''
+
+from __future__ import absolute_import, print_function
+
+from soapfish import xsd
+
+from . import best_of, report
+
+FIELD_COUNT = 50
+NUMBER = 1000
+
+
+def _wide_type():
+    attrs = {'field%02d' % i: xsd.Element(xsd.String, minOccurs=0) for i in range(FIELD_COUNT)}
+    return type('Wide', (xsd.ComplexType, ), attrs)
+
+
+Wide = _wide_type()
+VALUES = {'field%02d' % i: 'value %d' % i for i in range(FIELD_COUNT)}
+
+
+def main():
+    rows = []
+    for title, func in (
+        ('Wide()', lambda: Wide()),
+        ('Wide(**values)', lambda: Wide(**VALUES)),
+        ('Wide.from_trusted(**values)', lambda: Wide.from_trusted(**VALUES)),
+    ):
+        seconds = best_of(func, number=NUMBER)
+        rows.append((title, seconds * 1e6, int(1 / seconds)))
+    report('Constructing a ComplexType with %d fields' % FIELD_COUNT, rows,
+           headers=('constructor', 'us per object', 'objects/s'))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+'''
+Deduplicating parsed messages with a set (hashing and equality).
+'''
+
+from __future__ import absolute_import, print_function
+
+from soapfish import xsd
+
+from . import best_of, report
+
+COUNT = 2000
+DISTINCT = 100
+
+
+class Item(xsd.ComplexType):
+    sku = xsd.Attribute(xsd.String)
+    quantity = xsd.Element(xsd.Integer)
+    price = xsd.Element(xsd.Decimal)
+
+
+class Order(xsd.ComplexType):
+    items = xsd.ListElement(Item, 'item')
+
+
+def _order_xml(count):
+    items = ''.join(
+        '<item sku="S%d"><quantity>%d</quantity><price>%d.5</price></item>' % ((i % DISTINCT, ) * 3)
+        for i in range(count)
+    )
+    return ('<order>%s</order>' % items).encode('ascii')
+
+
+def main():
+    items = Order.parsexml(_order_xml(COUNT)).items
+
+    def dedupe():
+        return len(set(items))
+
+    assert dedupe() == DISTINCT
+    seconds = best_of(dedupe)
+    rows = [('set(items)', seconds * 1e3, int(COUNT / seconds))]
+    report('Deduplicating %d parsed items (%d distinct)' % (COUNT, DISTINCT), rows,
+           headers=('operation', 'ms', 'items/s'))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+'''
+?wsdl requests: substituting the WSDL template for every request (former
+behaviour) vs. the per-host cache, with gzip and with a matching
+If-None-Match header (304).
+'''
+
+from __future__ import absolute_import, print_function
+
+import string
+
+import six
+
+from soapfish.core import SOAPRequest
+from soapfish.soap_dispatch import SOAPDispatcher
+
+from . import best_of, report
+from .routing import _service
+
+OPERATION_COUNTS = (1, 100, 400)
+NUMBER = 200
+
+
+def _substitute(dispatcher):
+    # the former handle_wsdl_request()
+    wsdl = dispatcher.wsdl
+    if six.PY3:
+        wsdl = wsdl.decode()
+    wsdl = string.Template(wsdl).safe_substitute(scheme='http', host='soap.example')
+    if six.PY3:
+        wsdl = wsdl.encode()
+    return wsdl
+
+
+def main():
+    rows = []
+    for operation_count in OPERATION_COUNTS:
+        service = _service(operation_count)
+        service.location = '${scheme}://${host}/ws'
+        dispatcher = SOAPDispatcher(service)
+
+        def get(**environ):
+            environ.update(REQUEST_METHOD='GET', QUERY_STRING='wsdl', HTTP_HOST='soap.example')
+            return dispatcher.dispatch(SOAPRequest(environ, b''))
+        response = get(HTTP_ACCEPT_ENCODING='gzip')
+        etag = response.http_headers['ETag']
+        substitute = best_of(lambda: _substitute(dispatcher), number=NUMBER)
+        cached = best_of(get, number=NUMBER)
+        gzipped = best_of(lambda: get(HTTP_ACCEPT_ENCODING='gzip'), number=NUMBER)
+        not_modified = best_of(lambda: get(HTTP_IF_NONE_MATCH=etag), number=NUMBER)
+        rows.append((operation_count, len(dispatcher.wsdl), len(response.http_content), substitute * 1e6,
+                     cached * 1e6, gzipped * 1e6, not_modified * 1e6))
+    report('?wsdl requests [us]', rows,
+           headers=('operations', 'bytes', 'gzip bytes', 'substitute', 'cached', 'cached gzip', '304'))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+'''
+Peak memory (max RSS, includes libxml2) when reading all items of a large
+ListElement payload from a file with parsexml() and with iterparse().
+
+Every measurement runs in its own process.
+'''
+
+from __future__ import absolute_import, print_function
+
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+
+from . import report
+from .memory import Catalogue, catalogue_xml
+
+ITEM_COUNTS = (10000, 100000, 300000)
+
+
+def read_items(mode, path):
+    if mode == 'parsexml':
+        with open(path, 'rb') as fp:
+            items = Catalogue.parsexml(fp.read()).items
+        return sum(item.quantity for item in items)
+    return sum(item.quantity for item in Catalogue.iterparse(path, 'items'))
+
+
+def measure(mode, path):
+    output = subprocess.check_output([sys.executable, '-m', 'benchmarks.iterparse', mode, path])
+    return int(output)
+
+
+def main():
+    rows = []
+    for item_count in ITEM_COUNTS:
+        fd, path = tempfile.mkstemp(suffix='.xml')
+        try:
+            # Written in chunks, the peak RSS of the parent process would be
+            # inherited by the child processes.
+            with os.fdopen(fd, 'wb') as fp:
+                fp.write(b'<catalogue>')
+                for _ in range(item_count // 1000):
+                    fp.write(catalogue_xml(1000)[len(b'<catalogue>'):-len(b'</catalogue>')])
+                fp.write(b'</catalogue>')
+            rows.append((item_count, measure('parsexml', path) // 1024, measure('iterparse', path) // 1024))
+        finally:
+            os.remove(path)
+    report('Peak memory for reading all items', rows, headers=('items', 'parsexml MiB', 'iterparse MiB'))
+
+
+if __name__ == '__main__':
+    if len(sys.argv) == 3:
+        read_items(*sys.argv[1:])
+        print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+    else:
+        main()
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+'''
+Eager vs. lazy parsing of a request type with 200 fields when the handler
+reads only a few of them.
+'''
+
+from __future__ import absolute_import, print_function
+
+from lxml import etree
+
+from soapfish import xsd
+
+from . import best_of, report
+
+FIELD_COUNT = 200
+NUMBER = 100
+FIELD_TYPES = (xsd.String, xsd.Integer, xsd.Decimal, xsd.DateTime)
+
+
+class Address(xsd.ComplexType):
+    street = xsd.Element(xsd.String)
+    city = xsd.Element(xsd.String)
+
+
+def _request_type():
+    attrs = {'field%03d' % i: xsd.Element(FIELD_TYPES[i % len(FIELD_TYPES)]) for i in range(FIELD_COUNT - 1)}
+    attrs['address'] = xsd.Element(Address)
+    return type('Request', (xsd.ComplexType, ), attrs)
+
+
+Request = _request_type()
+FIELD_VALUES = ('value', '42', '3.14', '2017-01-01T12:00:00')
+
+
+def request_xml():
+    parts = ['<request>']
+    parts.extend('<field%03d>%s</field%03d>' % (i, FIELD_VALUES[i % len(FIELD_VALUES)], i)
+                 for i in range(FIELD_COUNT - 1))
+    parts.append('<address><street>Main Street</street><city>Springfield</city></address>')
+    parts.append('</request>')
+    return etree.fromstring(''.join(parts))
+
+
+def main():
+    xmlelement = request_xml()
+
+    def read_some(lazy):
+        request = Request.parse_xmlelement(xmlelement, lazy=lazy)
+        return request.field000, request.field003, request.address.city
+
+    def read_all(lazy):
+        request = Request.parse_xmlelement(xmlelement, lazy=lazy)
+        return [getattr(request, field._name) for field in Request._meta.all]
+
+    assert read_some(False) == read_some(True)
+    assert read_all(False) == read_all(True)
+    rows = []
+    for title, func in (
+        ('eager, 3 fields read', lambda: read_some(False)),
+        ('lazy, 3 fields read', lambda: read_some(True)),
+        ('eager, all fields read', lambda: read_all(False)),
+        ('lazy, all fields read', lambda: read_all(True)),
+    ):
+        seconds = best_of(func, number=NUMBER)
+        rows.append((title, seconds * 1e6, int(1 / seconds)))
+    report('Parsing a request with %d fields' % FIELD_COUNT, rows,
+           headers=('mode', 'us per request', 'requests/s'))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+'''
+Memory used by the objects parsed from a large ListElement payload, comparing
+the default (__dict__ based) and the compact (__slots__ based) layout with
+and without keeping references to the parsed XML elements.
+
+The Python allocations are traced with tracemalloc, which does not see the
+memory allocated by libxml2 for the XML trees kept alive by the parsed
+objects. The growth of the resident set size (RSS, Linux only) is measured
+as well: each case parses the XML in a fresh process and drops the input
+tree, so only the memory retained by the parsed objects is counted.
+'''
+
+from __future__ import absolute_import, print_function
+
+import ctypes
+import gc
+import multiprocessing
+import resource
+import tracemalloc
+
+from lxml import etree
+
+from soapfish import xsd
+
+from . import report
+
+ITEM_COUNT = 100000
+
+
+class Item(xsd.ComplexType):
+    sku = xsd.Attribute(xsd.String)
+    name = xsd.Element(xsd.String)
+    quantity = xsd.Element(xsd.Integer)
+    price = xsd.Element(xsd.Decimal)
+
+
+class Catalogue(xsd.ComplexType):
+    items = xsd.ListElement(Item, 'item')
+
+
+class CompactItem(xsd.ComplexType):
+    COMPACT = True
+    sku = xsd.Attribute(xsd.String)
+    name = xsd.Element(xsd.String)
+    quantity = xsd.Element(xsd.Integer)
+    price = xsd.Element(xsd.Decimal)
+
+
+class CompactCatalogue(xsd.ComplexType):
+    COMPACT = True
+    items = xsd.ListElement(CompactItem, 'item')
+
+
+def catalogue_xml(item_count):
+    parts = ['<catalogue>']
+    parts.extend(
+        '<item sku="SKU-%d"><name>Item %d</name><quantity>%d</quantity><price>%d.5</price></item>' % (i, i, i, i)
+        for i in range(item_count)
+    )
+    parts.append('</catalogue>')
+    return ''.join(parts).encode('utf-8')
+
+
+def parsed_size(catalogue_class, xml, **kwargs):
+    '''
+    Returns the number of bytes (allocated by Python) which are kept alive by
+    the parsed catalogue.
+    '''
+    xmlelement = etree.fromstring(xml)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        catalogue = catalogue_class.parse_xmlelement(xmlelement, **kwargs)
+        gc.collect()
+        after = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    assert len(catalogue.items) == ITEM_COUNT
+    return after - before
+
+
+def _rss():
+    '''
+    Returns the resident set size of the process in bytes or None if it can
+    not be determined (no /proc file system).
+    '''
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * resource.getpagesize()
+    except IOError:
+        return None
+
+
+def _release_free_memory():
+    '''
+    Collects garbage and returns the free heap memory to the operating
+    system (glibc only), so freed memory does not count in the RSS.
+    '''
+    gc.collect()
+    try:
+        ctypes.CDLL('libc.so.6').malloc_trim(0)
+    except (OSError, AttributeError):
+        pass
+
+
+def retained_rss(catalogue_class, kwargs):
+    '''
+    Returns the growth of the resident set size (Python and libxml2 memory)
+    caused by the parsed catalogue after the input tree was dropped, None if
+    the RSS is not available. Run it in a fresh process.
+    '''
+    xml = catalogue_xml(ITEM_COUNT)
+    _release_free_memory()
+    before = _rss()
+    catalogue = catalogue_class.parse_xmlelement(etree.fromstring(xml), **kwargs)
+    _release_free_memory()
+    after = _rss()
+    assert len(catalogue.items) == ITEM_COUNT
+    return None if before is None else after - before
+
+
+def _in_new_process(func, *args):
+    pool = multiprocessing.Pool(1)
+    try:
+        return pool.apply(func, args)
+    finally:
+        pool.close()
+        pool.join()
+
+
+def main():
+    xml = catalogue_xml(ITEM_COUNT)
+    rows = []
+    for title, catalogue_class, kwargs in (
+        ('default', Catalogue, {}),
+        ('compact', CompactCatalogue, {}),
+        ('default, detached', Catalogue, {'retain_xmlelement': False}),
+        ('compact, detached', CompactCatalogue, {'retain_xmlelement': False}),
+    ):
+        size = parsed_size(catalogue_class, xml, **kwargs)
+        rss = _in_new_process(retained_rss, catalogue_class, kwargs)
+        rows.append((title, size // 1024, float(size) / ITEM_COUNT, 'n/a' if rss is None else rss // 1024))
+    report('Parsing %d items' % ITEM_COUNT, rows, headers=('layout', 'Python KiB', 'bytes per item', 'RSS KiB'))
+    print('Python KiB: tracemalloc, without the memory of libxml2 for retained XML trees.')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+'''
+Cost of the middleware chain per request: composing the functools.partial
+chain for every request (the former SOAPDispatcher.middleware()) vs. the
+chain which is composed once, for stacks of different sizes.
+'''
+
+from __future__ import absolute_import, print_function
+
+import functools
+
+from soapfish.core import SOAPRequest
+from soapfish.soap_dispatch import SOAPDispatcher, call_method
+from soapfish.testutil import echo_service
+
+from . import best_of, report
+from .serializer import ECHO_REQUEST
+
+STACK_SIZES = (0, 2, 8, 16)
+NUMBER = 20000
+
+
+def _pass_through(request, next_call):
+    return next_call(request)
+
+
+def _compose_per_request(middlewares, i=0):
+    # the former SOAPDispatcher.middleware()
+    if i == len(middlewares):
+        return call_method
+    return functools.partial(middlewares[i], next_call=_compose_per_request(middlewares, i + 1))
+
+
+def main():
+    rows = []
+    for size in STACK_SIZES:
+        dispatcher = SOAPDispatcher(echo_service(), middlewares=[_pass_through] * size)
+        per_request = best_of(lambda: _compose_per_request(dispatcher.middlewares), number=NUMBER)
+        composed = best_of(dispatcher.middleware, number=NUMBER)
+
+        def dispatch():
+            request = SOAPRequest(dict(SOAPACTION='echo', REQUEST_METHOD='POST'), ECHO_REQUEST)
+            return dispatcher.dispatch(request)
+        latency = best_of(dispatch, number=NUMBER // 100)
+        rows.append((size, per_request * 1e6, composed * 1e6, latency * 1e6))
+    report('Middleware chain per request', rows,
+           headers=('middlewares', 'compose us', 'composed us', 'dispatch us'))
+
+
+if __name__ == '__main__':
+    main()
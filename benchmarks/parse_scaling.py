@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+'''
+Parse time of ComplexType.parse_xmlelement() for documents of growing size.
+
+Every child element is dispatched to its field through the per-class parse
+plan so the time per child element should stay (roughly) constant.
+'''
+
+from __future__ import absolute_import, print_function
+
+from lxml import etree
+
+from soapfish import xsd
+
+from . import best_of, report
+
+FIELD_COUNT = 60
+
+
+class Item(xsd.ComplexType):
+    sku = xsd.Element(xsd.String)
+    quantity = xsd.Element(xsd.Integer)
+
+
+def _order_type():
+    attrs = {'field%02d' % i: xsd.Element(xsd.String, minOccurs=0) for i in range(FIELD_COUNT)}
+    attrs['items'] = xsd.ListElement(Item, 'item', minOccurs=0)
+    return type('Order', (xsd.ComplexType, ), attrs)
+
+
+Order = _order_type()
+
+
+def order_xml(item_count):
+    parts = ['<order>']
+    parts.extend('<field%02d>value %d</field%02d>' % (i, i, i) for i in range(FIELD_COUNT))
+    parts.extend('<item><sku>SKU-%d</sku><quantity>%d</quantity></item>' % (i, i) for i in range(item_count))
+    parts.append('</order>')
+    return ''.join(parts).encode('utf-8')
+
+
+def main():
+    rows = []
+    for item_count in (500, 1000, 2000, 4000, 8000):
+        xmlelement = etree.fromstring(order_xml(item_count))
+        seconds = best_of(lambda: Order.parse_xmlelement(xmlelement), repeat=3)
+        children = FIELD_COUNT + item_count
+        rows.append((item_count, seconds, seconds / children * 1e6))
+    report('Order.parse_xmlelement (%d fields)' % FIELD_COUNT, rows,
+           headers=('items', 'seconds', 'us per child'))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+'''
+ComplexType.parsexml() of a pretty printed document with comments: the
+global default lxml parser (former behaviour) vs. the per-thread parsers of
+utils.XMLParserConfig with the default options (comments removed) and with
+blank text removed as well.
+'''
+
+from __future__ import absolute_import, print_function
+
+from lxml import etree
+
+from soapfish.utils import XMLParserConfig
+
+from . import best_of, report
+from .dedupe import Order, _order_xml
+
+ITEM_COUNTS = (10, 100, 1000)
+NUMBER = 20
+
+
+def _document(count):
+    xml = etree.tostring(etree.fromstring(_order_xml(count)), pretty_print=True)
+    return xml.replace(b'<item>', b'<!-- item --><item>')
+
+
+def main():
+    stripping = XMLParserConfig(remove_blank_text=True)
+    rows = []
+    for count in ITEM_COUNTS:
+        xml = _document(count)
+        default = best_of(lambda: Order.parse_xmlelement(etree.fromstring(xml)), number=NUMBER)
+        config = best_of(lambda: Order.parsexml(xml), number=NUMBER)
+        stripped = best_of(lambda: Order.parsexml(xml, parser_config=stripping), number=NUMBER)
+        rows.append((count, default * 1e6, config * 1e6, stripped * 1e6, default / stripped))
+    report('Order.parsexml() [us]', rows,
+           headers=('items', 'etree.fromstring', 'XMLParserConfig()', 'without blanks', 'speedup'))
+
+
+if __name__ == '__main__':
+    main()
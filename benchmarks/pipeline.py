@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+'''
+Request pipeline of SOAPDispatcher with and without single_pass: total
+latency and the time spent in each phase (request.timings) for the echo
+service.
+'''
+
+from __future__ import absolute_import, print_function
+
+from soapfish.core import SOAPRequest
+from soapfish.soap_dispatch import SOAPDispatcher
+from soapfish.testutil import echo_service
+
+from . import best_of, report
+from .serializer import ECHO_REQUEST
+
+NUMBER = 2000
+PHASES = ('parse', 'validate', 'route', 'parse_input', 'call', 'render')
+
+
+def _request():
+    return SOAPRequest(dict(SOAPACTION='echo', REQUEST_METHOD='POST'), ECHO_REQUEST)
+
+
+def main():
+    rows = []
+    for single_pass in (False, True):
+        dispatcher = SOAPDispatcher(echo_service(), single_pass=single_pass)
+        latency = best_of(lambda: dispatcher.dispatch(_request()), number=NUMBER)
+        totals = dict.fromkeys(PHASES, 0.0)
+        for _ in range(NUMBER):
+            request = _request()
+            dispatcher.dispatch(request)
+            for phase, seconds in request.timings.items():
+                totals[phase] += seconds
+        rows.append((single_pass, latency * 1e6) + tuple(totals[phase] / NUMBER * 1e6 for phase in PHASES))
+    report('SOAPDispatcher.dispatch() [us]', rows, headers=('single_pass', 'total') + PHASES)
+
+
+if __name__ == '__main__':
+    main()
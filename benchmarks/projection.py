@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+'''
+Full parsing vs. parsing only the fields selected with ``only``, for a
+request with 200 fields and an order with 1000 items.
+'''
+
+from __future__ import absolute_import, print_function
+
+from lxml import etree
+
+from . import best_of, report
+from .dedupe import Order, _order_xml
+from .lazy import Request, request_xml
+
+NUMBER = 20
+ITEM_COUNT = 1000
+SELECTED = ['field000', 'field003', 'address.city']
+
+
+def main():
+    request = request_xml()
+    order = etree.fromstring(_order_xml(ITEM_COUNT))
+    rows = []
+    for title, func in (
+        ('request, all fields', lambda: Request.parse_xmlelement(request)),
+        ('request, 3 fields', lambda: Request.parse_xmlelement(request, only=SELECTED)),
+        ('order, all fields', lambda: Order.parse_xmlelement(order)),
+        ('order, items.sku', lambda: Order.parse_xmlelement(order, only=['items.sku'])),
+    ):
+        seconds = best_of(func, number=NUMBER)
+        rows.append((title, seconds * 1e6, int(1 / seconds)))
+    report('Parsing with and without projection', rows, headers=('document, fields', 'us per parse', 'parses/s'))
+
+
+if __name__ == '__main__':
+    main()
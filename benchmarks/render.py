@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+'''
+Rendering throughput of ComplexType.xml() and soap11.Envelope.response().
+'''
+
+from __future__ import absolute_import, print_function
+
+from soapfish import soap11, xsd
+
+from . import best_of, report
+
+NAMESPACE = 'http://benchmark.example/orders'
+
+
+class Line(xsd.ComplexType):
+    sku = xsd.Element(xsd.String)
+    description = xsd.Element(xsd.String)
+    quantity = xsd.Element(xsd.Integer)
+    price = xsd.Element(xsd.Decimal)
+
+
+class OrderResponse(xsd.ComplexType):
+    id = xsd.Attribute(xsd.String)
+    customer = xsd.Element(xsd.String)
+    status = xsd.Element(xsd.String)
+    lines = xsd.ListElement(Line, 'line', minOccurs=0)
+
+
+Schema = xsd.Schema(
+    NAMESPACE,
+    elementFormDefault=xsd.ElementFormDefault.QUALIFIED,
+    complexTypes=[Line, OrderResponse],
+    elements={'orderResponse': xsd.Element(OrderResponse)},
+)
+
+
+def order_response(line_count):
+    response = OrderResponse(id='order-1', customer='ACME', status='shipped')
+    for i in range(line_count):
+        response.lines.append(Line(sku='SKU-%d' % i, description='Item %d' % i, quantity=i, price=i + 0.5))
+    return response
+
+
+def main():
+    rows = []
+    for line_count in (100, 1000, 10000):
+        response = order_response(line_count)
+        xml = best_of(lambda: response.xml('orderResponse', namespace=NAMESPACE,
+                                           elementFormDefault=xsd.ElementFormDefault.QUALIFIED,
+                                           pretty_print=False), repeat=3)
+        envelope = best_of(lambda: soap11.Envelope.response('orderResponse', response), repeat=3)
+        rows.append((line_count, xml, envelope))
+    report('Rendering OrderResponse', rows, headers=('lines', 'xml() s', 'response() s'))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+'''
+Finding the method for a request in a service with many operations: the
+former linear search over service.methods vs. the dispatcher's dict index
+(by soapAction and by root tag) and Service.get_method().
+'''
+
+from __future__ import absolute_import, print_function
+
+from lxml import etree
+
+from soapfish import xsd
+from soapfish.core import SOAPRequest
+from soapfish.soap_dispatch import SOAPDispatcher
+from soapfish.testutil import echo_service
+
+from . import best_of, report
+
+OPERATION_COUNTS = (10, 100, 400)
+NUMBER = 2000
+
+
+def _service(operation_count):
+    service = echo_service()
+    echo_method = service.methods[0]
+    service.methods = [
+        xsd.Method(operationName='operation%d' % i, soapAction='action%d' % i, input='request%d' % i,
+                   output='echoResponse', function=echo_method.function)
+        for i in range(operation_count - 1)
+    ] + [echo_method]
+    return service
+
+
+def _linear_search(service, soap_action, root_tag):
+    # the former SOAPDispatcher._find_handler_for_request()
+    for method in service.methods:
+        if soap_action:
+            if soap_action == method.soapAction:
+                return method
+        elif root_tag == method.input:
+            return method
+
+
+def main():
+    body = etree.fromstring(b'<ns1:echoRequest xmlns:ns1="http://soap.example/echo/types"/>')
+    action_request = SOAPRequest(dict(SOAPACTION='echo', REQUEST_METHOD='POST'), b'')
+    tag_request = SOAPRequest(dict(REQUEST_METHOD='POST'), b'')
+    rows = []
+    for operation_count in OPERATION_COUNTS:
+        service = _service(operation_count)
+        dispatcher = SOAPDispatcher(service)
+        linear_action = best_of(lambda: _linear_search(service, 'echo', None), number=NUMBER)
+        indexed_action = best_of(lambda: dispatcher._find_handler_for_request(action_request, body), number=NUMBER)
+        linear_tag = best_of(lambda: _linear_search(service, None, 'echoRequest'), number=NUMBER)
+        indexed_tag = best_of(lambda: dispatcher._find_handler_for_request(tag_request, body), number=NUMBER)
+        linear_name = best_of(lambda: next(m for m in service.methods if m.operationName == 'echoOperation'),
+                              number=NUMBER)
+        indexed_name = best_of(lambda: service.get_method('echoOperation'), number=NUMBER)
+        rows.append((operation_count, linear_action * 1e6, indexed_action * 1e6, linear_tag * 1e6,
+                     indexed_tag * 1e6, linear_name * 1e6, indexed_name * 1e6))
+    report('Method lookup (last operation) [us]', rows,
+           headers=('operations', 'action linear', 'action index', 'tag linear', 'tag index',
+                    'get_method linear', 'get_method index'))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+'''
+Rendering responses with lxml vs. the direct serializer: Envelope.response()
+for lists of different sizes and the complete request/response latency of a
+SOAPDispatcher (echo service) with and without direct_responses.
+'''
+
+from __future__ import absolute_import, print_function
+
+from decimal import Decimal
+
+from soapfish import soap11, xsd
+from soapfish.core import SOAPRequest
+from soapfish.soap_dispatch import SOAPDispatcher
+from soapfish.testutil import echo_service
+
+from . import best_of, report
+from .memory import Catalogue, Item
+
+ITEM_COUNTS = (1, 10, 100, 1000)
+NUMBER = 20
+ECHO_REQUEST = b'''<senv:Envelope xmlns:senv="http://schemas.xmlsoap.org/soap/envelope/">
+<senv:Body><ns1:echoRequest xmlns:ns1="http://soap.example/echo/types"><value>foobar</value></ns1:echoRequest>
+</senv:Body></senv:Envelope>'''
+
+
+def _catalogue(item_count):
+    Catalogue.SCHEMA = xsd.Schema('http://catalogue.example/', elementFormDefault=xsd.ElementFormDefault.UNQUALIFIED)
+    items = [Item.from_trusted(sku='SKU-%d' % i, name='Item %d' % i, quantity=i, price=Decimal(i))
+             for i in range(item_count)]
+    return Catalogue.from_trusted(items=items)
+
+
+def main():
+    rows = []
+    for item_count in ITEM_COUNTS:
+        catalogue = _catalogue(item_count)
+        lxml = best_of(lambda: soap11.Envelope.response('catalogue', catalogue), number=NUMBER)
+        direct = best_of(lambda: soap11.Envelope.response('catalogue', catalogue, direct=True), number=NUMBER)
+        rows.append((item_count, lxml * 1e6, direct * 1e6, lxml / direct))
+    report('Envelope.response()', rows, headers=('items', 'lxml us', 'direct us', 'speedup'))
+
+    rows = []
+    for direct_responses in (False, True):
+        dispatcher = SOAPDispatcher(echo_service(), direct_responses=direct_responses)
+
+        def dispatch():
+            request = SOAPRequest(dict(SOAPACTION='echo', REQUEST_METHOD='POST'), ECHO_REQUEST)
+            return dispatcher.dispatch(request)
+        seconds = best_of(dispatch, number=NUMBER * 10)
+        rows.append((direct_responses, seconds * 1e6, int(1 / seconds)))
+    report('SOAPDispatcher.dispatch() (echo service)', rows,
+           headers=('direct_responses', 'us per request', 'requests/s'))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+'''
+Stub.call() against a local HTTP/1.1 server: a new connection for every call
+(module level requests.post(), the former behaviour) vs. the keep-alive
+connections of the session owned by the stub.
+'''
+
+from __future__ import absolute_import, print_function
+
+import threading
+import time
+from io import BytesIO
+
+import requests
+import six
+
+from soapfish.soap import Stub
+from soapfish.soap_dispatch import SOAPDispatcher, WsgiSoapApplication
+from soapfish.testutil import echo_service
+from soapfish.testutil.echo_service import EchoType
+
+from . import best_of, report
+
+NUMBER = 200
+
+
+def _start_server(delay=0):
+    '''
+    Starts a local HTTP/1.1 server (keep-alive, one thread per connection)
+    for the echo service which answers after delay seconds.
+    '''
+    def echo(request, input_):
+        time.sleep(delay)
+        return EchoType.create(input_.value)
+    app = WsgiSoapApplication(SOAPDispatcher(echo_service(echo)))
+
+    class Handler(six.moves.BaseHTTPServer.BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        disable_nagle_algorithm = True
+
+        def do_POST(self):
+            content = self.rfile.read(int(self.headers['Content-Length']))
+            environ = {'REQUEST_METHOD': 'POST', 'SOAPACTION': self.headers.get('SOAPAction', ''),
+                       'CONTENT_LENGTH': str(len(content)), 'wsgi.input': BytesIO(content)}
+            status = []
+            body = b''.join(app(environ, lambda code, headers: status.append((code, headers))))
+            self.send_response(int(status[0][0].split()[0]))
+            for name, value in status[0][1]:
+                self.send_header(name, value)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = six.moves.socketserver.ThreadingTCPServer(('127.0.0.1', 0), Handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    return 'http://127.0.0.1:%d/service' % server.server_address[1]
+
+
+def main():
+    location = _start_server()
+    echo = EchoType.create('foo')
+    stub = Stub(location=location, service=echo_service())
+
+    def former():
+        # Stub.call() before the stub owned a session
+        method, data, headers = stub._prepare_call('echoOperation', echo)
+        r = requests.post(stub.location, headers=headers, data=data)
+        return stub._handle_response(method, r.headers, r.content)
+
+    rows = []
+    for title, func in (
+        ('requests.post()', former),
+        ('Stub.session', lambda: stub.call('echoOperation', echo)),
+    ):
+        seconds = best_of(func, number=NUMBER)
+        rows.append((title, seconds * 1e6, int(1 / seconds)))
+    stub.close()
+    report('Sequential calls to a local server', rows, headers=('connections', 'us per call', 'calls/s'))
+
+
+if __name__ == '__main__':
+    main()
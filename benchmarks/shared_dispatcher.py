@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+'''
+Per-request cost of the web framework adapters: creating a SOAPDispatcher for
+every request (as flask_dispatcher/django_dispatcher used to do) vs. the
+SharedDispatcher for echo services with schemas of different sizes.
+'''
+
+from __future__ import absolute_import, print_function
+
+from soapfish import xsd
+from soapfish.core import SOAPRequest
+from soapfish.soap_dispatch import SharedDispatcher, SOAPDispatcher
+from soapfish.testutil import echo_service
+
+from . import best_of, report
+from .serializer import ECHO_REQUEST
+
+TYPE_COUNTS = (0, 10, 100)
+NUMBER = 20
+
+
+def _service(type_count):
+    service = echo_service()
+    schema = service.schemas[0]
+    types = [type(str('Extra%d' % i), (xsd.ComplexType,), {
+        'name': xsd.Element(xsd.String),
+        'quantity': xsd.Element(xsd.Integer, minOccurs=0),
+    }) for i in range(type_count)]
+    elements = dict(schema.elements)
+    elements.update(('extra%d' % i, xsd.Element(t)) for i, t in enumerate(types))
+    complex_types = tuple(schema.complexTypes) + tuple(types)
+    service.schemas = [xsd.Schema(schema.targetNamespace, elementFormDefault=schema.elementFormDefault,
+                                  simpleTypes=schema.simpleTypes, complexTypes=complex_types, elements=elements)]
+    return service
+
+
+def _request():
+    return SOAPRequest(dict(SOAPACTION='echo', REQUEST_METHOD='POST'), ECHO_REQUEST)
+
+
+def main():
+    rows = []
+    for type_count in TYPE_COUNTS:
+        service = _service(type_count)
+        shared = SharedDispatcher(service)
+        per_request = best_of(lambda: SOAPDispatcher(service).dispatch(_request()), number=NUMBER)
+        cached = best_of(lambda: shared.dispatch(_request()), number=NUMBER * 10)
+        rows.append((type_count, per_request * 1e6, cached * 1e6, per_request / cached))
+    report('dispatch() per request', rows, headers=('extra types', 'new dispatcher us', 'shared us', 'speedup'))
+
+
+if __name__ == '__main__':
+    main()
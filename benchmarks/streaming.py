@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+'''
+Peak memory (max RSS, includes libxml2) when rendering a SOAP response with
+a large list, with Envelope.response() and with Envelope.response_chunks().
+The peak includes the memory used by the response object itself.
+
+Every measurement runs in its own process.
+'''
+
+from __future__ import absolute_import, print_function
+
+import resource
+import subprocess
+import sys
+from decimal import Decimal
+
+from soapfish import soap11, xsd
+
+from . import report
+from .memory import Catalogue, Item
+
+ITEM_COUNTS = (10000, 100000, 300000)
+
+
+def render(mode, item_count):
+    items = [Item.from_trusted(sku='SKU-%d' % i, name='Item %d' % i, quantity=i, price=Decimal(i))
+             for i in range(int(item_count))]
+    Catalogue.SCHEMA = xsd.Schema('http://catalogue.example/', elementFormDefault=xsd.ElementFormDefault.UNQUALIFIED)
+    catalogue = Catalogue.from_trusted(items=items)
+    if mode == 'objects':
+        return 0
+    if mode == 'response':
+        return len(soap11.Envelope.response('catalogue', catalogue))
+    return sum(len(chunk) for chunk in soap11.Envelope.response_chunks('catalogue', catalogue))
+
+
+def measure(mode, item_count):
+    return int(subprocess.check_output([sys.executable, '-m', 'benchmarks.streaming', mode, str(item_count)]))
+
+
+def main():
+    rows = []
+    for item_count in ITEM_COUNTS:
+        rows.append((item_count, measure('objects', item_count) // 1024, measure('response', item_count) // 1024,
+                     measure('response_chunks', item_count) // 1024))
+    report('Peak memory for rendering a response', rows,
+           headers=('items', 'objects only MiB', 'response() MiB', 'response_chunks() MiB'))
+
+
+if __name__ == '__main__':
+    if len(sys.argv) == 3:
+        render(*sys.argv[1:])
+        print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+    else:
+        main()
@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+'''
+Full client + server round trips of Stub.call() (echo service) with the
+in-process DispatcherTransport and with the HTTP transports against a local
+server.
+'''
+
+from __future__ import absolute_import, print_function
+
+from soapfish.soap import Stub
+from soapfish.soap_dispatch import SOAPDispatcher
+from soapfish.testutil import echo_service
+from soapfish.testutil.echo_service import EchoType
+from soapfish.transport import DispatcherTransport, RequestsTransport, Urllib3Transport
+
+from . import best_of, report
+from .session import _start_server
+
+NUMBER = 200
+
+
+def main():
+    location = _start_server()
+    echo = EchoType.create('foo')
+    rows = []
+    for title, transport in (
+        ('RequestsTransport', RequestsTransport()),
+        ('Urllib3Transport', Urllib3Transport()),
+        ('DispatcherTransport', DispatcherTransport(SOAPDispatcher(echo_service()))),
+    ):
+        stub = Stub(location=location, service=echo_service(), transport=transport)
+        seconds = best_of(lambda: stub.call('echoOperation', echo), number=NUMBER)
+        rows.append((title, seconds * 1e6, int(1 / seconds)))
+        transport.close()
+    report('Stub.call() round trips', rows, headers=('transport', 'us per call', 'calls/s'))
+
+
+if __name__ == '__main__':
+    main()
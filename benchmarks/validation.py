@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+'''
+Validated parsing with a soapfish schema: ``parsexml(xml, schema=Schema)``
+with the cached XMLSchema vs. compiling the schema for every call (the old
+behaviour) and vs. parsing without validation.
+'''
+
+from __future__ import absolute_import, print_function
+
+from lxml import etree
+
+from soapfish import py2xsd, xsd
+
+from . import best_of, report
+
+NAMESPACE = 'http://benchmark.example/validation.xsd'
+NUMBER = 200
+
+
+class Item(xsd.ComplexType):
+    sku = xsd.Element(xsd.String)
+    quantity = xsd.Element(xsd.Integer)
+    price = xsd.Element(xsd.Decimal)
+
+
+class Order(xsd.ComplexType):
+    reference = xsd.Element(xsd.String)
+    items = xsd.ListElement(Item, 'item', maxOccurs=xsd.UNBOUNDED)
+
+
+Schema = xsd.Schema(NAMESPACE, location=NAMESPACE, elementFormDefault=xsd.ElementFormDefault.QUALIFIED,
+                    complexTypes=[Item, Order], elements={'order': xsd.Element(Order)})
+
+
+def order_xml(count):
+    order = Order(reference='R-1', items=[Item(sku='A%d' % i, quantity=i, price=1.5) for i in range(count)])
+    return order.xml('order', namespace=NAMESPACE, elementFormDefault=Schema.elementFormDefault)
+
+
+def _uncached(xml):
+    xml_schema = etree.XMLSchema(py2xsd.generate_xsd(Schema))
+    return Order.parse_xmlelement(etree.fromstring(xml, etree.XMLParser(schema=xml_schema)))
+
+
+def main():
+    rows = []
+    for count in (1, 10, 100):
+        xml = order_xml(count)
+        Order.parsexml(xml, schema=Schema)
+        plain = best_of(lambda: Order.parsexml(xml), number=NUMBER)
+        uncached = best_of(lambda: _uncached(xml), number=NUMBER)
+        cached = best_of(lambda: Order.parsexml(xml, schema=Schema), number=NUMBER)
+        rows.append((count, plain * 1e6, uncached * 1e6, cached * 1e6, '%.1fx' % (uncached / cached)))
+    report('parsexml(schema=Schema) [µs per document]', rows,
+           ('items', 'no validation', 'compile per call', 'cached schema', 'speedup'))
+
+
+if __name__ == '__main__':
+    main()
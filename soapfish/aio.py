@@ -0,0 +1,462 @@
+# -*- coding: utf-8 -*-
+'''
+asyncio support (Python 3.5+ only): an ASGI application for SOAPDispatcher
+and an asynchronous client stub.
+
+Service methods and middlewares can be coroutine functions (``async def``).
+Middlewares get an awaitable ``next_call``::
+
+    async def my_middleware(request, next_call):
+        response = await next_call(request)
+        return response
+
+Regular functions are supported as well, they are called in a thread of the
+executor so they do not block the event loop. Contiguous regular middlewares
+and a regular service method run in one executor call, like
+WsgiSoapApplication does. Regular middlewares around coroutine functions
+block their executor thread until the inner chain is finished, that thread
+runs the regular functions of the inner chain meanwhile, so a request never
+occupies more than one executor thread (a bounded executor limits the
+throughput of such requests but can not deadlock).
+'''
+
+from __future__ import absolute_import
+
+import asyncio
+import functools
+import inspect
+import io
+import logging
+import queue
+import ssl
+import threading
+import weakref
+from concurrent.futures import ProcessPoolExecutor
+
+import six
+from requests.structures import CaseInsensitiveDict
+
+from . import compression
+from .core import SOAPError, SOAPRequest, SOAPResponse
+from .soap import Stub
+from .soap_dispatch import _HttpApplication, _RequestError, _Stopwatch, call_method
+from .transport import _http_environ
+
+__all__ = ['AsgiSoapApplication', 'AsyncHttpTransport', 'AsyncStub']
+
+logger = logging.getLogger(__name__)
+
+# default number of concurrent calls of an AsyncStub
+MAX_CONCURRENCY = 100
+# default limit for the (decompressed) response body of AsyncHttpTransport
+MAX_RESPONSE_SIZE = 100 * 1024 * 1024
+
+
+def _is_async(func):
+    return inspect.iscoroutinefunction(func) or inspect.iscoroutinefunction(getattr(func, '__call__', None))
+
+
+async def _call_method(request, run):
+    function = request.method.function
+    if _is_async(function):
+        response = await function(request, request.soap_body)
+    else:
+        response = await run(function, request, request.soap_body)
+    if not isinstance(response, SOAPResponse):
+        response = SOAPResponse(response)
+    return response
+
+
+def _compose_sync(middlewares, next_call):
+    for middleware in reversed(middlewares):
+        next_call = functools.partial(middleware, next_call=next_call)
+    return next_call
+
+
+def _set_future(future, result, exception):
+    if future.cancelled():
+        return
+    if exception is not None:
+        future.set_exception(exception)
+    else:
+        future.set_result(result)
+
+
+def _async_stage(middleware, inner):
+    async def stage(request, run):
+        return await middleware(request, next_call=lambda request: inner(request, run))
+    return stage
+
+
+def _sync_stage(middlewares, inner):
+    '''
+    Returns the stage for contiguous regular middlewares which wrap the
+    (asynchronous) inner stage.
+    '''
+    async def stage(request, run):
+        if inner is _call_method and not _is_async(request.method.function):
+            return await run(_compose_sync(middlewares, call_method), request)
+        loop = asyncio.get_event_loop()
+
+        def blocking_next_call(request):
+            # Runs the inner stage in the event loop and the regular functions
+            # of the inner stage in this thread until it is finished.
+            tasks = queue.Queue()
+
+            def thread_run(func, *args):
+                future = loop.create_future()
+                tasks.put((future, functools.partial(func, *args)))
+                return future
+            done = asyncio.run_coroutine_threadsafe(inner(request, thread_run), loop)
+            done.add_done_callback(lambda _: tasks.put(None))
+            while True:
+                task = tasks.get()
+                if task is None:
+                    return done.result()
+                future, func = task
+                try:
+                    result, exception = func(), None
+                except BaseException as e:
+                    result, exception = None, e
+                loop.call_soon_threadsafe(_set_future, future, result, exception)
+        return await run(_compose_sync(middlewares, blocking_next_call), request)
+    return stage
+
+
+def _environ(scope):
+    '''
+    Returns a WSGI like environ for the ASGI scope of an HTTP request (the
+    dispatcher and the middlewares only know WSGI environs).
+    '''
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', ''),
+        'PATH_INFO': scope['path'],
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_PROTOCOL': 'HTTP/%s' % scope.get('http_version', '1.1'),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'asgi.scope': scope,
+    }
+    if scope.get('server'):
+        environ['SERVER_NAME'], environ['SERVER_PORT'] = scope['server'][0], str(scope['server'][1])
+    if scope.get('client'):
+        environ['REMOTE_ADDR'] = scope['client'][0]
+    headers = ((name.decode('latin-1'), value.decode('latin-1')) for name, value in scope.get('headers', ()))
+    _http_environ(environ, headers)
+    return environ
+
+
+class AsgiSoapApplication(_HttpApplication):
+    '''
+    ASGI application for a SOAPDispatcher, see WsgiSoapApplication for the
+    compression options.
+
+    :param executor: concurrent.futures.Executor (a thread pool) for regular
+        service methods and middlewares, by default the default executor of
+        the event loop.
+    :param offload: bool, parse and render the envelopes in the executor
+        instead of the event loop (worth it for large messages, lxml releases
+        the GIL while parsing).
+    '''
+
+    def __init__(self, dispatcher, executor=None, offload=False, **kwargs):
+        if isinstance(executor, ProcessPoolExecutor):
+            # requests and dispatchers can not be passed to other processes
+            raise TypeError('AsgiSoapApplication requires a thread pool executor.')
+        super(AsgiSoapApplication, self).__init__(dispatcher, **kwargs)
+        self.executor = executor
+        self.offload = offload
+        self._chain = (None, None, False)  # (middlewares, composed chain, has coroutine functions)
+        self._chain_lock = threading.Lock()
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self._lifespan(receive, send)
+        if scope['type'] != 'http':
+            raise ValueError('Unsupported ASGI scope type %r' % scope['type'])
+        environ = _environ(scope)
+        chunks = []
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                return
+            chunks.append(message.get('body', b''))
+            if not message.get('more_body'):
+                break
+        try:
+            content = self._decompress(environ, b''.join(chunks))
+        except _RequestError as e:
+            response = e.response()
+        else:
+            response = await self.dispatch(SOAPRequest(environ, content))
+        http_content = response.http_content
+        if self.compress_responses:
+            http_content = self._compress(environ, response)
+        await self._send_response(send, response, http_content)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def _run(self, func, *args):
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(self.executor, functools.partial(func, *args))
+
+    async def _maybe_offload(self, func, *args):
+        if self.offload:
+            return await self._run(func, *args)
+        return func(*args)
+
+    async def dispatch(self, request):
+        '''
+        Like SOAPDispatcher.dispatch() but SOAP requests are handled
+        asynchronously. WSDL/XSD requests are answered from the cache of
+        the dispatcher.
+        '''
+        if request.environ.get('REQUEST_METHOD') == 'POST':
+            return await self.handle_soap_request(request)
+        return await self._maybe_offload(self.dispatcher.dispatch, request)
+
+    async def handle_soap_request(self, request):
+        dispatcher = self.dispatcher
+        stopwatch = _Stopwatch()
+        try:
+            await self._maybe_offload(dispatcher._prepare_soap_request, request, stopwatch)
+        except SOAPError as ex:
+            response = ex
+        else:
+            chain = self.middleware(request.method.function)
+            if chain is None:
+                # no coroutine functions involved: run the regular chain at once
+                response = await self._run(dispatcher.middleware(), request)
+            else:
+                response = await chain(request, self._run)
+            stopwatch.lap('call')
+        response = await self._maybe_offload(dispatcher._finish_soap_request, request, response, stopwatch)
+        return response
+
+    def middleware(self, function):
+        '''
+        Returns the composed asynchronous middleware chain of the dispatcher
+        (called as ``chain(request, run)`` with the coroutine function which
+        runs regular functions in the executor) or None if neither the
+        middlewares nor the service method are coroutine functions. The chain
+        is composed once and only composed again when the middlewares change.
+        '''
+        middlewares, chain, has_async = self._chain
+        if middlewares != self.dispatcher.middlewares:
+            with self._chain_lock:
+                middlewares, chain, has_async = self._chain
+                if middlewares != self.dispatcher.middlewares:
+                    middlewares = self.dispatcher.middlewares[:]
+                    chain = self._compose(middlewares)
+                    has_async = any(_is_async(middleware) for middleware in middlewares)
+                    self._chain = (middlewares, chain, has_async)
+        if not has_async and not _is_async(function):
+            return None
+        return chain
+
+    @staticmethod
+    def _compose(middlewares):
+        # at the end call the method, contiguous regular middlewares form one stage
+        chain = _call_method
+        end = len(middlewares)
+        while end:
+            if _is_async(middlewares[end - 1]):
+                chain = _async_stage(middlewares[end - 1], chain)
+                end -= 1
+                continue
+            start = end
+            while start and not _is_async(middlewares[start - 1]):
+                start -= 1
+            chain = _sync_stage(middlewares[start:end], chain)
+            end = start
+        return chain
+
+    async def _send_response(self, send, response, http_content):
+        headers = [(str(name).lower().encode('latin-1'), str(value).encode('latin-1'))
+                   for name, value in response.http_headers.items()]
+        await send({'type': 'http.response.start', 'status': response.http_status_code, 'headers': headers})
+        if http_content is None or isinstance(http_content, (six.binary_type, six.text_type)):
+            if isinstance(http_content, six.text_type):
+                http_content = http_content.encode('utf-8')
+            await send({'type': 'http.response.body', 'body': http_content or b''})
+            return
+        # streamed response
+        chunks = iter(http_content)
+        while True:
+            chunk = await self._maybe_offload(next, chunks, None)
+            if chunk is None:
+                break
+            await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+        await send({'type': 'http.response.body', 'body': b''})
+
+
+class AsyncHttpTransport(object):
+    '''
+    Minimal HTTP/1.1 client on asyncio streams, the default transport of
+    AsyncStub (one connection per call). An asynchronous transport is a
+    coroutine function ``transport(url, headers, body)`` which returns
+    ``(status code, headers, body)`` with the decompressed body (like the
+    transports in soapfish.transport without streaming).
+
+    :param max_response_size: int, maximum size of the response body in
+        bytes (before and after decompression), larger responses raise
+        ValueError.
+    '''
+
+    def __init__(self, ssl_context=None, max_response_size=MAX_RESPONSE_SIZE):
+        self.ssl_context = ssl_context
+        self.max_response_size = max_response_size
+
+    async def __call__(self, url, headers, body):
+        parts = six.moves.urllib.parse.urlsplit(url)
+        secure = parts.scheme == 'https'
+        context = (self.ssl_context or ssl.create_default_context()) if secure else None
+        reader, writer = await asyncio.open_connection(parts.hostname, parts.port or (443 if secure else 80),
+                                                       ssl=context)
+        try:
+            path = (parts.path or '/') + ('?' + parts.query if parts.query else '')
+            lines = ['POST %s HTTP/1.1' % path, 'Host: %s' % parts.netloc, 'Content-Length: %d' % len(body),
+                     'Connection: close']
+            lines.extend('%s: %s' % item for item in headers.items())
+            writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + body)
+            await writer.drain()
+
+            status = int((await reader.readline()).split()[1])
+            response_headers = CaseInsensitiveDict()
+            while True:
+                line = await reader.readline()
+                if line in (b'\r\n', b'\n', b''):
+                    break
+                name, _, value = line.decode('latin-1').partition(':')
+                response_headers[name.strip()] = value.strip()
+            if response_headers.get('Transfer-Encoding', '').lower() == 'chunked':
+                content = await self._read_chunked(reader)
+            elif 'Content-Length' in response_headers:
+                length = int(response_headers['Content-Length'])
+                self._check_size(length)
+                content = await reader.readexactly(length)
+            else:
+                content = await self._read_until_eof(reader)
+        finally:
+            writer.close()
+        content = compression.decompress(content, response_headers.get('Content-Encoding'), self.max_response_size)
+        return status, response_headers, content
+
+    def _check_size(self, size):
+        if size > self.max_response_size:
+            raise ValueError('Response exceeds %d bytes' % self.max_response_size)
+
+    async def _read_chunked(self, reader):
+        chunks, total = [], 0
+        while True:
+            size = int((await reader.readline()).split(b';')[0], 16)
+            if not size:
+                break
+            total += size
+            self._check_size(total)
+            chunks.append(await reader.readexactly(size))
+            await reader.readline()
+        return b''.join(chunks)
+
+    async def _read_until_eof(self, reader):
+        chunks, total = [], 0
+        while True:
+            chunk = await reader.read(64 * 1024)
+            if not chunk:
+                return b''.join(chunks)
+            total += len(chunk)
+            self._check_size(total)
+            chunks.append(chunk)
+
+
+class AsyncStub(Stub):
+    '''
+    Client stub with coroutine methods: ``await stub.call(...)``. Builds the
+    envelopes and handles the responses like Stub.
+
+    :param transport: the transport coroutine function, see
+        AsyncHttpTransport (the default).
+    :param max_concurrency: int, limit for concurrent calls of the stub (per
+        event loop), further calls wait until a call is finished.
+    :param timeout: float, default timeout of a call in seconds (including
+        the time waiting for a free slot), asyncio.TimeoutError is raised.
+    '''
+
+    def __init__(self, *args, transport=None, max_concurrency=MAX_CONCURRENCY, timeout=None, **kwargs):
+        transport = transport if transport is not None else AsyncHttpTransport()
+        super(AsyncStub, self).__init__(*args, transport=transport, **kwargs)
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self._semaphores = weakref.WeakKeyDictionary()
+
+    def _semaphore(self):
+        loop = asyncio.get_event_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = self._semaphores[loop] = asyncio.Semaphore(self.max_concurrency)
+        return semaphore
+
+    async def _post(self, operationName, parameter, header, timeout):
+        method, data, headers = self._prepare_call(operationName, parameter, header=header)
+
+        async def post():
+            async with self._semaphore():
+                return await self.transport(self.location, headers, data)
+        timeout = self.timeout if timeout is None else timeout
+        status, http_headers, content = await asyncio.wait_for(post(), timeout)
+        logger.debug('Response Headers: %s', http_headers)
+        logger.debug('Response Envelope: %s', content)
+        return method, status, http_headers, content
+
+    async def call(self, operationName, parameter, header=None, timeout=None):
+        '''
+        :param timeout: float, timeout in seconds (default: the timeout of
+            the stub).
+        :raises: lxml.etree.XMLSyntaxError -- validation problems.
+        '''
+        method, _, http_headers, content = await self._post(operationName, parameter, header, timeout)
+        return self._handle_response(method, http_headers, content)
+
+    async def _call_or_error(self, index, operationName, parameter, header, timeout):
+        try:
+            return index, await self.call(operationName, parameter, header=header, timeout=timeout)
+        except SOAPError as e:
+            return index, e
+
+    def iter_call_many(self, operationName, parameters, header=None, timeout=None):
+        '''
+        Like Stub.iter_call_many() but returns an iterator over awaitables
+        (in the order in which the calls are finished), the calls are
+        limited by max_concurrency::
+
+            for result in stub.iter_call_many('operation', parameters):
+                index, response = await result
+        '''
+        return asyncio.as_completed([self._call_or_error(index, operationName, parameter, header, timeout)
+                                     for index, parameter in enumerate(parameters)])
+
+    async def call_many(self, operationName, parameters, header=None, timeout=None):
+        '''
+        Like Stub.call_many(), the calls are limited by max_concurrency.
+        '''
+        results = await asyncio.gather(*[self._call_or_error(index, operationName, parameter, header, timeout)
+                                         for index, parameter in enumerate(parameters)])
+        return [result for _, result in results]
+
+    async def iter_call(self, operationName, parameter, path, header=None, timeout=None):
+        '''
+        Like Stub.iter_call() but the response is received completely before
+        the items are parsed (incrementally).
+        '''
+        method, status, http_headers, content = await self._post(operationName, parameter, header, timeout)
+        if status != 200:
+            self._raise_fault(method, status, http_headers, content)
+        return self._output_type(method).iterparse(io.BytesIO(content), path, ancestors=('Envelope', 'Body'),
+                                                   parser_config=self.parser_config)
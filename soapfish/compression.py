@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+'''
+HTTP content codings (gzip and deflate) for SOAP messages.
+'''
+
+from __future__ import absolute_import
+
+import zlib
+
+__all__ = [
+    'ENCODINGS',
+    'DecompressionError',
+    'accepted_encoding',
+    'compress',
+    'compress_chunks',
+    'decompress',
+    'is_supported',
+]
+
+# supported content codings in order of preference
+ENCODINGS = ('gzip', 'deflate')
+
+_WBITS = {
+    'gzip': 16 + zlib.MAX_WBITS,
+    'x-gzip': 16 + zlib.MAX_WBITS,
+    'deflate': zlib.MAX_WBITS,
+}
+_CHUNK_SIZE = 64 * 1024
+
+
+class DecompressionError(ValueError):
+    '''
+    The content is not valid for its content coding or too large
+    (too_large is True).
+    '''
+
+    def __init__(self, message, too_large=False):
+        super(DecompressionError, self).__init__(message)
+        self.too_large = too_large
+
+
+def _normalize(encoding):
+    encoding = (encoding or '').strip().lower()
+    return 'gzip' if encoding == 'x-gzip' else encoding
+
+
+def is_supported(encoding):
+    '''
+    Returns True if content with this Content-Encoding can be decompressed.
+    '''
+    return _normalize(encoding) in ('', 'identity') + ENCODINGS
+
+
+def accepted_encoding(accept_encoding, encodings=ENCODINGS):
+    '''
+    Returns the first of encodings which is acceptable according to the
+    value of an Accept-Encoding header (q > 0) or None.
+    '''
+    accepted = set()
+    for coding in (accept_encoding or '').split(','):
+        name, _, params = coding.partition(';')
+        params = params.replace(' ', '')
+        if params.startswith('q='):
+            try:
+                if float(params[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(_normalize(name))
+    for encoding in encodings:
+        if encoding in accepted:
+            return encoding
+    return None
+
+
+def compress(data, encoding):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, _WBITS[encoding])
+    return compressor.compress(data) + compressor.flush()
+
+
+def compress_chunks(chunks, encoding):
+    '''
+    Compresses an iterable of byte strings incrementally.
+    '''
+    compressor = zlib.compressobj(6, zlib.DEFLATED, _WBITS[encoding])
+    for chunk in chunks:
+        chunk = compressor.compress(chunk)
+        if chunk:
+            yield chunk
+    yield compressor.flush()
+
+
+def decompress(data, encoding, max_size=None):
+    '''
+    Returns the decoded content. Raises DecompressionError for unknown or
+    invalid content codings and if the decoded content is larger than
+    max_size bytes (protection against compression bombs).
+    '''
+    encoding = _normalize(encoding)
+    if encoding in ('', 'identity'):
+        return data
+    if not is_supported(encoding):
+        raise DecompressionError('Unsupported content encoding %r' % encoding)
+    candidates = [_WBITS[encoding]]
+    if encoding == 'deflate':
+        # some clients send raw deflate data without the zlib header
+        candidates.append(-zlib.MAX_WBITS)
+    for wbits in candidates:
+        decompressor = zlib.decompressobj(wbits)
+        try:
+            if max_size is None:
+                return decompressor.decompress(data) + decompressor.flush()
+            parts, size, pending = [], 0, data
+            while True:
+                part = decompressor.decompress(pending, _CHUNK_SIZE)
+                pending = decompressor.unconsumed_tail
+                # all input consumed and no more output buffered
+                finished = not pending and len(part) < _CHUNK_SIZE
+                if finished:
+                    part += decompressor.flush()
+                size += len(part)
+                if size > max_size:
+                    raise DecompressionError('Decompressed content exceeds %d bytes' % max_size, too_large=True)
+                parts.append(part)
+                if finished:
+                    return b''.join(parts)
+        except zlib.error as e:
+            error = e
+    raise DecompressionError('Invalid %s content: %s' % (encoding, error))
@@ -2,8 +2,10 @@
 
 from __future__ import absolute_import
 
+import six
+
 from soapfish.core import SOAPRequest
-from soapfish.soap_dispatch import SOAPDispatcher
+from soapfish.soap_dispatch import SharedDispatcher
 
 __all__ = ['django_dispatcher']
 
@@ -22,19 +24,31 @@ class DjangoEnvironWrapper(object):
 
 
 def django_dispatcher(service, **dispatcher_kwargs):
-    from django.http import HttpResponse
+    """
+    Returns a Django view for the service. The SOAPDispatcher is created on
+    the first request and shared, call ``view.reset_dispatcher()`` to create
+    a new one after changing the service.
+    """
+    from django.http import HttpResponse, StreamingHttpResponse
     from django.views.decorators.csrf import csrf_exempt
 
+    soap_dispatcher = SharedDispatcher(service, **dispatcher_kwargs)
+
     def django_dispatch(request):
         soap_request = SOAPRequest(DjangoEnvironWrapper(request.environ), request.body)
         soap_request._original_request = request
-        soap_dispatcher = SOAPDispatcher(service, **dispatcher_kwargs)
         soap_response = soap_dispatcher.dispatch(soap_request)
 
-        response = HttpResponse(soap_response.http_content)
+        if isinstance(soap_response.http_content, (six.binary_type, six.text_type)):
+            response = HttpResponse(soap_response.http_content)
+        else:
+            response = StreamingHttpResponse(soap_response.http_content)
         response.status_code = soap_response.http_status_code
         for k, v in soap_response.http_headers.items():
             response[k] = v
         return response
 
-    return csrf_exempt(django_dispatch)
+    view = csrf_exempt(django_dispatch)
+    view.get_dispatcher = soap_dispatcher.get
+    view.reset_dispatcher = soap_dispatcher.reset
+    return view
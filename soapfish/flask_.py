@@ -3,18 +3,24 @@
 from __future__ import absolute_import
 
 from soapfish.core import SOAPRequest
-from soapfish.soap_dispatch import SOAPDispatcher
+from soapfish.soap_dispatch import SharedDispatcher
 
 __all__ = ['flask_dispatcher']
 
 
 def flask_dispatcher(service, **dispatcher_kwargs):
+    """
+    Returns a Flask view for the service. The SOAPDispatcher is created on
+    the first request and shared, call ``view.reset_dispatcher()`` to create
+    a new one after changing the service.
+    """
     from flask import request, Response
 
+    soap_dispatcher = SharedDispatcher(service, **dispatcher_kwargs)
+
     def flask_dispatch():
         soap_request = SOAPRequest(request.environ, request.data)
         soap_request._original_request = request
-        soap_dispatcher = SOAPDispatcher(service, **dispatcher_kwargs)
         soap_response = soap_dispatcher.dispatch(soap_request)
 
         response = Response(soap_response.http_content)
@@ -23,4 +29,6 @@ def flask_dispatcher(service, **dispatcher_kwargs):
             response.headers[k] = v
         return response
 
+    flask_dispatch.get_dispatcher = soap_dispatcher.get
+    flask_dispatch.reset_dispatcher = soap_dispatcher.reset
     return flask_dispatch
@@ -4,10 +4,12 @@
 from __future__ import absolute_import, print_function
 
 import argparse
+import collections
 import imp
 import inspect
 import logging
 import sys
+import threading
 
 import six
 from lxml import etree
@@ -27,6 +29,12 @@ ALL_TYPES = NUMERIC_TYPES + STRING_TYPES
 
 logger = logging.getLogger('soapfish')
 
+# compiled etree.XMLSchema objects by the (identity of the) soapfish schemas
+# (least recently used are evicted first), see get_xml_schema()
+MAX_CACHED_SCHEMAS = 64
+_xml_schemas = collections.OrderedDict()
+_xml_schemas_lock = threading.Lock()
+
 
 # --- Helpers -----------------------------------------------------------------
 def get_xsd_type(_type):
@@ -214,13 +222,7 @@ def generate_xsd(schema):
     return xmlelement
 
 
-def schema_validator(schemas):
-    """
-    Return a callable for the specified soapfish schemas which can be used
-    to validate (etree) xml documents.
-    The method takes care of resolving imported (soapfish) schemas but prevents
-    any unwanted network access.
-    """
+def _compile_xml_schema(schemas):
     class SchemaResolver(etree.Resolver):
 
         def __init__(self, schemas, *args, **kwargs):
@@ -253,8 +255,53 @@ def schema_validator(schemas):
     # conflicting namespace urls).
     schema_xml = b''.join(etree.tostring(generate_xsd(s)) for s in schemas)
     schema_element = etree.fromstring(schema_xml, parser)
-    xml_schema = etree.XMLSchema(schema_element)
-    return xml_schema.assertValid
+    return etree.XMLSchema(schema_element), resolver.lookup
+
+
+def get_xml_schema(schemas):
+    """
+    Return the compiled etree.XMLSchema for a soapfish schema (or a sequence
+    of schemas). Imported soapfish schemas are resolved without network
+    access.
+    Compiling a schema is expensive so the result is cached by the identity
+    of the given schemas. Call invalidate_xml_schema() after modifying a
+    schema which was already used for validation.
+    """
+    if isinstance(schemas, xsd.Schema):
+        schemas = (schemas,)
+    key = tuple(schemas)
+    with _xml_schemas_lock:
+        entry = _xml_schemas.pop(key, None)
+        if entry is not None:
+            _xml_schemas[key] = entry  # most recently used
+            return entry[0]
+    xml_schema, imported = _compile_xml_schema(key)
+    with _xml_schemas_lock:
+        _xml_schemas[key] = (xml_schema, key + tuple(imported.values()))
+        while len(_xml_schemas) > MAX_CACHED_SCHEMAS:
+            _xml_schemas.popitem(last=False)
+    return xml_schema
+
+
+def invalidate_xml_schema(schema=None):
+    """
+    Remove the cached etree.XMLSchema objects which were compiled from (or
+    import) the given soapfish schema, all of them if schema is None.
+    """
+    with _xml_schemas_lock:
+        for key, (_, schemas) in list(_xml_schemas.items()):
+            if schema is None or any(s is schema for s in schemas):
+                _xml_schemas.pop(key, None)
+
+
+def schema_validator(schemas):
+    """
+    Return a callable for the specified soapfish schemas which can be used
+    to validate (etree) xml documents.
+    The method takes care of resolving imported (soapfish) schemas but prevents
+    any unwanted network access (see get_xml_schema()).
+    """
+    return get_xml_schema(schemas).assertValid
 
 
 # --- Program -----------------------------------------------------------------
@@ -5,14 +5,17 @@ SOAP protocol implementation, dispatchers and client stub.
 
 from __future__ import absolute_import
 
+import base64
+import itertools
 import logging
 import string
+from concurrent import futures
 
-import requests
 import six
 
-from . import core, namespaces as ns, soap11, soap12, wsa
-from .utils import uncapitalize
+from . import compression, core, namespaces as ns, soap11, soap12, wsa
+from .transport import RequestsTransport
+from .utils import DEFAULT_PARSER_CONFIG, uncapitalize
 
 SOAP_HTTP_Transport = ns.wsdl_soap_http
 
@@ -55,17 +58,23 @@ class Service(object):
 
     def __init__(self, targetNamespace, location, schemas, methods,
                  version=SOAPVersion.SOAP11, name='Service',
-                 input_header=None, output_header=None, use_wsa=False):
+                 input_header=None, output_header=None, use_wsa=False, parser_config=None):
         '''
         :param targetNamespace: string
         :param location: string, endpoint url.
         :param schemas: xsd.Schema instances.
         :param methods: list of xsd.Methods
+        :param parser_config: utils.XMLParserConfig for parsing the messages
+            of the service (default: utils.DEFAULT_PARSER_CONFIG).
         '''
         self.name = name
         self.targetNamespace = targetNamespace
         self.location = location
         self.schemas = schemas
+        # incremented when the methods are replaced or bound to a function so
+        # indexes of the methods (e.g. in the dispatcher) can be rebuilt
+        self.revision = 0
+        self._methods_by_name = None
         self.methods = methods
         self.version = version
         self.use_wsa = use_wsa
@@ -75,9 +84,30 @@ class Service(object):
             output_header = wsa.WSAHeader
         self.input_header = input_header
         self.output_header = output_header
+        self.parser_config = parser_config if parser_config is not None else DEFAULT_PARSER_CONFIG
+
+    @property
+    def methods(self):
+        return self._methods
+
+    @methods.setter
+    def methods(self, methods):
+        self._methods = methods
+        self.revision += 1
 
     def get_method(self, operationName):
-        return next(m for m in self.methods if m.operationName == operationName)
+        index = self._methods_by_name
+        key = (self.revision, len(self._methods))
+        if index is None or index[0] != key:
+            methods_by_name = {}
+            for method in self._methods:
+                methods_by_name.setdefault(method.operationName, method)
+            index = self._methods_by_name = (key, methods_by_name)
+        try:
+            return index[1][operationName]
+        except KeyError:
+            # same exception as the former next() over the methods
+            raise StopIteration(operationName)
 
     def find_element_by_name(self, name):
         element = None
@@ -93,10 +123,49 @@ class Service(object):
 
         def wrapper(func):
             method.function = func
+            self.revision += 1
             return func
         return wrapper
 
 
+def _close(source):
+    close = getattr(source, 'close', None)
+    if close is not None:
+        close()
+
+
+class _ClosingIterator(six.Iterator):
+    '''
+    Iterator over the items which closes source (a streamed response body)
+    when the items are exhausted, parsing fails or close() is called. Can be
+    used as context manager.
+    '''
+
+    def __init__(self, items, source):
+        self.items = items
+        self.source = source
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        try:
+            return next(self.items)
+        except BaseException:
+            self.close()
+            raise
+
+    def close(self):
+        source, self.source = self.source, None
+        _close(source)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
 class Stub(object):
     '''
     Client stub. Handles only document style calls.
@@ -104,11 +173,39 @@ class Stub(object):
     SERVICE = None
     SCHEME = 'http'
     HOST = 'www.example.net'
+    # requests shorter than this are sent uncompressed
+    COMPRESS_MIN_SIZE = 1024
 
-    def __init__(self, username=None, password=None, service=None, location=None):
+    def __init__(self, username=None, password=None, service=None, location=None, parser_config=None,
+                 compress_requests=False, session=None, pool_connections=10, pool_maxsize=10, pool_block=False,
+                 timeout=None, transport=None):
+        '''
+        :param compress_requests: bool, send gzip compressed requests (the
+            server must support it, e.g. soap_dispatch.WsgiSoapApplication).
+        :param transport: the HTTP transport (see soapfish.transport), by
+            default a transport.RequestsTransport which keeps connections
+            alive in a requests.Session (can be shared by threads) and is
+            configured with the following parameters.
+        :param session: requests.Session to use (the stub does not close it).
+        :param pool_connections: int, number of hosts for which connections
+            are pooled (own session only).
+        :param pool_maxsize: int, maximum number of connections kept per host
+            (own session only).
+        :param pool_block: bool, wait for a free connection instead of opening
+            more than pool_maxsize connections to a host (own session only).
+        :param timeout: float or (connect timeout, read timeout) in seconds.
+        '''
         self.username = username
         self.password = password
         self.service = service if service else self.SERVICE
+        self.parser_config = parser_config if parser_config is not None else self.service.parser_config
+        self.compress_requests = compress_requests
+        self.pool_maxsize = pool_maxsize
+        self._owns_transport = transport is None
+        if transport is None:
+            transport = RequestsTransport(session=session, pool_connections=pool_connections,
+                                          pool_maxsize=pool_maxsize, pool_block=pool_block, timeout=timeout)
+        self.transport = transport
 
         context = {'scheme': self.SCHEME, 'host': self.HOST}
         if location is None:
@@ -121,9 +218,28 @@ class Stub(object):
         else:
             raise TypeError('Expected string or callable for location.')
 
+    @property
+    def session(self):
+        # the requests.Session of the default transport (None for transports without a session)
+        return getattr(self.transport, 'session', None)
+
+    def close(self):
+        '''
+        Closes the connections of the transport created by the stub (new
+        connections are opened if the stub is used again).
+        '''
+        if self._owns_transport:
+            self.transport.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
     def _handle_response(self, method, http_headers, content):
         soap = self.service.version
-        envelope = soap.Envelope.parsexml(content)
+        envelope = soap.Envelope.parsexml(content, parser_config=self.parser_config)
 
         if envelope.Header and method and method.output_header:
             response_header = envelope.Header.parse_as(method.output_header)
@@ -135,17 +251,25 @@ class Stub(object):
             error = core.SOAPError(code=code, message=message, actor=actor)
             raise error
 
-        if isinstance(method.output, six.string_types):
-            _type = self.service.find_element_by_name(method.output)._type.__class__
-        else:
-            _type = method.output
-
-        body = envelope.Body.parse_as(_type)
+        body = envelope.Body.parse_as(self._output_type(method))
         return core.SOAPResponse(body, soap_header=response_header)
 
-    def call(self, operationName, parameter, header=None):
+    def _raise_fault(self, method, status, http_headers, content):
         '''
-        :raises: lxml.etree.XMLSyntaxError -- validation problems.
+        Raises the fault of a response with an HTTP status other than 200,
+        core.SOAPError as well if the response contains no fault.
+        '''
+        self._handle_response(method, http_headers, content)
+        raise core.SOAPError(self.service.version.Code.SERVER, 'HTTP status %d without SOAP fault' % status)
+
+    def _output_type(self, method):
+        if isinstance(method.output, six.string_types):
+            return self.service.find_element_by_name(method.output)._type.__class__
+        return method.output
+
+    def _prepare_call(self, operationName, parameter, header=None):
+        '''
+        Returns the method, the request envelope and the HTTP headers of a call.
         '''
         soap = self.service.version
         method = self.service.get_method(operationName)
@@ -155,14 +279,98 @@ class Stub(object):
         else:
             tagname = uncapitalize(parameter.__class__.__name__)
 
-        auth = (self.username, self.password) if self.username else None
         data = soap.Envelope.response(tagname, parameter, header=header)
         headers = soap.build_http_request_headers(method.soapAction)
+        # the transports decode compressed responses
+        headers['Accept-Encoding'] = ', '.join(compression.ENCODINGS)
+        if self.username:
+            credentials = ('%s:%s' % (self.username, self.password)).encode('utf-8')
+            headers['Authorization'] = 'Basic ' + base64.b64encode(credentials).decode('ascii')
 
         logger.info("Call '%s' on '%s'", operationName, self.location)
-        logger.debug('Request Headers: %s', headers)
         logger.debug('Request Envelope: %s', data)
-        r = requests.post(self.location, auth=auth, headers=headers, data=data)
-        logger.debug('Response Headers: %s', r.headers)
-        logger.debug('Response Envelope: %s', r.content)
-        return self._handle_response(method, r.headers, r.content)
+        if self.compress_requests and len(data) >= self.COMPRESS_MIN_SIZE:
+            data = compression.compress(data, 'gzip')
+            headers['Content-Encoding'] = 'gzip'
+        logger.debug('Request Headers: %s', headers)
+        return method, data, headers
+
+    def call(self, operationName, parameter, header=None):
+        '''
+        :raises: lxml.etree.XMLSyntaxError -- validation problems.
+        '''
+        method, data, headers = self._prepare_call(operationName, parameter, header=header)
+        _, http_headers, content = self.transport(self.location, headers, data)
+        logger.debug('Response Headers: %s', http_headers)
+        logger.debug('Response Envelope: %s', content)
+        return self._handle_response(method, http_headers, content)
+
+    def _call_or_error(self, operationName, parameter, header):
+        try:
+            return self.call(operationName, parameter, header=header)
+        except core.SOAPError as e:
+            return e
+
+    def iter_call_many(self, operationName, parameters, header=None, max_workers=None):
+        '''
+        Calls the operation for each of the parameters concurrently in a
+        thread pool (rendering, HTTP request and parsing in the workers, all
+        using the connection pool of the stub). Returns an iterator over
+        (index of the parameter, response or core.SOAPError) in the order in
+        which the calls are finished. Other exceptions are raised.
+
+        :param max_workers: int, number of threads (default: pool_maxsize).
+        '''
+        max_workers = max_workers or self.pool_maxsize
+        parameters = enumerate(parameters)
+        pending = {}
+        with futures.ThreadPoolExecutor(max_workers) as executor:
+            def submit(count):
+                # at most two calls per worker are queued
+                for index, parameter in itertools.islice(parameters, count):
+                    pending[executor.submit(self._call_or_error, operationName, parameter, header)] = index
+            submit(2 * max_workers)
+            while pending:
+                done, _ = futures.wait(pending, return_when=futures.FIRST_COMPLETED)
+                submit(len(done))
+                for future in done:
+                    yield pending.pop(future), future.result()
+
+    def call_many(self, operationName, parameters, header=None, max_workers=None):
+        '''
+        Like iter_call_many() but returns a list of the responses (or
+        core.SOAPError) in the order of the parameters.
+        '''
+        results = dict(self.iter_call_many(operationName, parameters, header=header, max_workers=max_workers))
+        return [results[index] for index in range(len(results))]
+
+    def iter_call(self, operationName, parameter, path, header=None):
+        '''
+        Calls the operation and parses the items of a (large) list in the
+        response incrementally while the response body is downloaded, see
+        xsd.ComplexType.iterparse(). Returns an iterator over the items which
+        closes the response when it is exhausted. Call close() on it (or use
+        it as context manager) to release the connection when stopping early.
+
+        :param path: str, dotted field names from the output type to the field
+            whose items are returned, e.g. 'items'.
+        :raises: core.SOAPError -- the service returned a fault (HTTP status
+            other than 200).
+        '''
+        method, data, headers = self._prepare_call(operationName, parameter, header=header)
+        output_type = self._output_type(method)
+        output_type._iterparse_path(path)  # check the path before sending the request
+        status, http_headers, source = self.transport(self.location, headers, data, stream=True)
+        try:
+            logger.debug('Response Headers: %s', http_headers)
+            if status != 200:
+                # Faults are small, parse them like regular responses.
+                content = source.read()
+                _close(source)
+                self._raise_fault(method, status, http_headers, content)
+            items = output_type.iterparse(source, path, ancestors=('Envelope', 'Body'),
+                                          parser_config=self.parser_config)
+        except BaseException:
+            _close(source)
+            raise
+        return _ClosingIterator(items, source)
@@ -78,14 +78,32 @@ class Envelope(xsd.ComplexType):
     Body = xsd.Element(Body)
 
     @classmethod
-    def response(cls, tagname, return_object, header=None):
+    def _response_envelope(cls, tagname, return_object, header=None):
         envelope = cls()
         if header is not None:
             envelope.Header = header
         envelope.Body = Body()
         envelope.Body.message = xsd.NamedType(name=tagname, value=return_object)
+        return envelope
+
+    @classmethod
+    def response(cls, tagname, return_object, header=None, direct=False):
+        '''
+        Returns the envelope as bytes, see ComplexType.xml() for direct.
+        '''
+        envelope = cls._response_envelope(tagname, return_object, header=header)
         return envelope.xml('Envelope', namespace=ENVELOPE_NAMESPACE,
-                            elementFormDefault=xsd.ElementFormDefault.QUALIFIED, pretty_print=False)
+                            elementFormDefault=xsd.ElementFormDefault.QUALIFIED, pretty_print=False, direct=direct)
+
+    @classmethod
+    def response_chunks(cls, tagname, return_object, header=None, chunk_size=xsd.XML_CHUNK_SIZE):
+        '''
+        Like response() but returns an iterator over chunks of the envelope
+        which is rendered incrementally while the chunks are consumed.
+        '''
+        envelope = cls._response_envelope(tagname, return_object, header=header)
+        return envelope.xml_chunks('Envelope', namespace=ENVELOPE_NAMESPACE,
+                                   elementFormDefault=xsd.ElementFormDefault.QUALIFIED, chunk_size=chunk_size)
 
     @classmethod
     def error_response(cls, code, message, header=None, actor=None):
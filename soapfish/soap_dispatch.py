@@ -2,21 +2,32 @@
 
 from __future__ import absolute_import
 
+import collections
 import functools
+import hashlib
 import logging
 import string
+import threading
+import timeit
 
 import six
 from lxml import etree
 
-from . import py2wsdl, py2xsd, wsa
+from . import compression, py2wsdl, py2xsd, wsa
 from .core import SOAPError, SOAPRequest, SOAPResponse
 from .utils import uncapitalize, walk_schema_tree
 
-__all__ = ['SOAPDispatcher']
+__all__ = ['SOAPDispatcher', 'SharedDispatcher']
 
 logger = logging.getLogger(__name__)
 
+# number of (scheme, host) combinations for which the WSDL is cached
+WSDL_CACHE_SIZE = 64
+# responses shorter than this are not worth compressing
+COMPRESS_MIN_SIZE = 1024
+# limit for the decompressed content of requests
+MAX_REQUEST_SIZE = 10 * 1024 * 1024
+
 
 def call_method(request):
     response = request.method.function(request, request.soap_body)
@@ -25,19 +36,132 @@ def call_method(request):
     return response
 
 
+class _Document(object):
+    """
+    A WSDL/XSD document with its gzip compressed content and the (strong)
+    ETags of both representations.
+    """
+
+    def __init__(self, content):
+        if isinstance(content, six.text_type):
+            content = content.encode('utf-8')
+        self.content = content
+        digest = hashlib.sha1(content).hexdigest()
+        self.etag = '"%s"' % digest
+        self.gzip_etag = '"%s-gzip"' % digest
+        self.gzipped = compression.compress(content, 'gzip')
+
+
+class _DocumentCache(object):
+    """
+    Least recently used cache of _Document objects.
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._documents = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, create):
+        """
+        Returns the document for key, create() returns the content of the
+        document if it is not cached.
+        """
+        with self._lock:
+            document = self._documents.pop(key, None)
+            if document is not None:
+                self._documents[key] = document  # most recently used
+                return document
+        document = _Document(create())
+        with self._lock:
+            self._documents[key] = document
+            while len(self._documents) > self.maxsize:
+                self._documents.popitem(last=False)
+        return document
+
+
+def _etag_matches(if_none_match, etags):
+    for etag in (if_none_match or '').split(','):
+        etag = etag.strip()
+        if etag.startswith('W/'):
+            etag = etag[2:]  # If-None-Match uses the weak comparison
+        if etag == '*' or etag in etags:
+            return True
+    return False
+
+
+class _Stopwatch(object):
+    """
+    Measures the time between calls of lap() and stores it by phase name.
+    """
+
+    def __init__(self):
+        self.timings = collections.OrderedDict()
+        self._start = timeit.default_timer()
+
+    def lap(self, phase):
+        now = timeit.default_timer()
+        self.timings[phase] = now - self._start
+        self._start = now
+
+    def __str__(self):
+        return ', '.join('%s=%.3fms' % (phase, seconds * 1000) for phase, seconds in self.timings.items())
+
+
+class _Routes(object):
+    """
+    Methods of a service indexed by soapAction and by the qualified and the
+    local name of their input element (the first method wins like in a linear
+    search) and the parser types of the input elements.
+    """
+
+    def __init__(self, service):
+        self.revision = (service.revision, len(service.methods))
+        self.by_action = {}
+        self.by_tag = {}
+        self.by_name = {}
+        self.input_types = {}
+        for method in service.methods:
+            self.by_action.setdefault(method.soapAction, method)
+            if not isinstance(method.input, six.string_types):
+                self.input_types[method] = method.input
+                continue
+            self.by_name.setdefault(method.input, method)
+            element = service.find_element_by_name(method.input)
+            if element is None:
+                continue
+            self.input_types[method] = element._type
+            if element.namespace:
+                self.by_tag.setdefault('{%s}%s' % (element.namespace, method.input), method)
+
+
 class SOAPDispatcher(object):
 
-    def __init__(self, service, middlewares=None, wsdl=None, xsds=None, strict_soap_header=True):
+    def __init__(self, service, middlewares=None, wsdl=None, xsds=None, strict_soap_header=True,
+                 stream_responses=False, direct_responses=False, single_pass=False, parser_config=None):
         """
         Args:
             service: the service to expose
-            middlewares: the middleware stack
+            middlewares: the middleware stack (see add_middleware())
             wsdl: an alternative wsdl to replace the one generated by soapfish
             strict_soap_header: if True an exception will be raised in a header part is not
                 in the schema
+            stream_responses: if True the http_content of successful responses is an
+                iterator over chunks of the envelope which is rendered while it is sent
+                (errors during rendering can not be reported as SOAP faults anymore)
+            direct_responses: if True successful responses are serialized directly to
+                bytes without building an lxml element tree (the output is the same)
+            single_pass: if True the request is parsed only once: the header and the body
+                content are validated and parsed from the XML elements without building
+                Envelope/Body objects first
+            parser_config: the utils.XMLParserConfig for requests (default: the one of the service)
+        The time spent in each phase of a SOAP request is stored in request.timings
+        (seconds by phase name: parse, validate, route, parse_input, call, render).
         """
         self.service = service
         self.middlewares = middlewares if middlewares is not None else []
+        self._middleware_lock = threading.Lock()
+        self._chain = (None, None)  # (middlewares, composed chain)
         self.schema_validator = py2xsd.schema_validator(self.service.schemas)
 
         if wsdl is None:
@@ -53,20 +177,78 @@ class SOAPDispatcher(object):
                 return etree.tostring(xsdelement, pretty_print=True)
             xsds = walk_schema_tree(self.service.schemas, callback)
         self.xsds = xsds
+        self._wsdl_documents = _DocumentCache(WSDL_CACHE_SIZE)
+        self._xsd_documents = _DocumentCache(max(len(xsds), 1))
 
         self.strict_soap_header = strict_soap_header
+        self.stream_responses = stream_responses
+        self.direct_responses = direct_responses
+        self.single_pass = single_pass
+        self.parser_config = parser_config if parser_config is not None else self.service.parser_config
+        self._routes = _Routes(self.service)
+
+    @staticmethod
+    def _compose(middlewares):
+        # at the end call the method
+        chain = call_method
+        for middleware in reversed(middlewares):
+            chain = functools.partial(middleware, next_call=chain)
+        return chain
 
     def middleware(self, i=0):
-        if i == len(self.middlewares):
-            # at the end call the method
-            return call_method
-        return functools.partial(self.middlewares[i], next_call=self.middleware(i + 1))
+        """
+        Returns the middleware chain (starting with the middleware at index
+        i) which calls the service method at the end. The complete chain is
+        composed once and only composed again when the middlewares change.
+        """
+        if i:
+            return self._compose(self.middlewares[i:])
+        middlewares, chain = self._chain
+        if middlewares != self.middlewares:
+            with self._middleware_lock:
+                middlewares, chain = self._chain
+                if middlewares != self.middlewares:
+                    middlewares = self.middlewares[:]
+                    chain = self._compose(middlewares)
+                    self._chain = (middlewares, chain)
+        return chain
+
+    def add_middleware(self, middleware, index=None):
+        """
+        Adds a middleware at the given index of the stack (0 is the outermost
+        layer), by default as innermost layer. Can be used while requests are
+        dispatched, these requests still use the previous middlewares.
+        """
+        with self._middleware_lock:
+            middlewares = list(self.middlewares)
+            if index is None:
+                middlewares.append(middleware)
+            else:
+                middlewares.insert(index, middleware)
+            self._replace_middlewares(middlewares)
+
+    def remove_middleware(self, middleware):
+        """
+        Removes a middleware from the stack (see add_middleware()).
+        Raises ValueError if the middleware is not in the stack.
+        """
+        with self._middleware_lock:
+            middlewares = list(self.middlewares)
+            middlewares.remove(middleware)
+            self._replace_middlewares(middlewares)
+
+    def _replace_middlewares(self, middlewares):
+        # the list is replaced (and not modified in place) so concurrent
+        # requests never see a partially modified stack
+        chain = self._compose(middlewares)
+        self._chain = (middlewares[:], chain)
+        self.middlewares = middlewares
 
     def _parse_soap_content(self, xml):
         SOAP = self.service.version
         try:
             # note : no validation is performed
-            envelope = SOAP.Envelope.parsexml(xml)
+            envelope = SOAP.Envelope.parsexml(xml, parser_config=self.parser_config)
         except etree.XMLSyntaxError as e:
             raise SOAPError(SOAP.Code.CLIENT, repr(e))
         # Actually this is more a stopgap measure than a real fix. The real
@@ -79,32 +261,41 @@ class SOAPDispatcher(object):
             raise SOAPError(SOAP.Code.CLIENT, 'Missing SOAP body')
         return envelope
 
+    def _get_routes(self):
+        routes = self._routes
+        if routes.revision != (self.service.revision, len(self.service.methods)):
+            # the service was changed (e.g. Service.route())
+            routes = self._routes = _Routes(self.service)
+        return routes
+
     def _find_handler_for_request(self, request, body_document):
         SOAP = self.service.version
+        routes = self._get_routes()
         soap_action = SOAP.determine_soap_action(request)
-        root_tag = None
-        if not soap_action:
-            root_tag = self._find_root_tag(body_document)
-            logger.debug('Soap action not found in http headers, use root tag "%s".', root_tag)
-        else:
+        if soap_action:
             logger.debug('Soap action found in http headers: %s', soap_action)
-        # TODO: handle invalid xml
-        for method in self.service.methods:
-            if soap_action:
-                if soap_action == method.soapAction:
-                    return method
-            elif root_tag == method.input:
+            method = routes.by_action.get(soap_action)
+            if method is not None:
                 return method
-        if soap_action is not None:
             error_msg = "Invalid soap action '%s'" % soap_action
         else:
-            error_msg = "Missing soap action and invalid root tag '%s'" % root_tag
+            # TODO: handle invalid xml
+            method = routes.by_tag.get(body_document.tag)
+            if method is not None:
+                return method
+            root_tag = self._find_root_tag(body_document)
+            logger.debug('Soap action not found in http headers, use root tag "%s".', root_tag)
+            method = routes.by_name.get(root_tag)
+            if method is not None:
+                return method
+            if soap_action is not None:
+                error_msg = "Invalid soap action '%s'" % soap_action
+            else:
+                error_msg = "Missing soap action and invalid root tag '%s'" % root_tag
         raise SOAPError(SOAP.Code.CLIENT, error_msg)
 
     def _find_root_tag(self, body_document):
-        root = body_document
-        ns = root.nsmap[root.prefix]
-        return root.tag[len('{%s}' % ns):]
+        return etree.QName(body_document).localname
 
     def _parse_header(self, handler, soap_header):
         # TODO return soap fault if header is required but missing in the input
@@ -116,6 +307,9 @@ class SOAPDispatcher(object):
             return soap_header.parse_as(self.service.input_header)
 
     def _parse_input(self, method, message):
+        input_parser = self._get_routes().input_types.get(method)
+        if input_parser is not None:
+            return input_parser.parse_xmlelement(message)
         input_parser = method.input
         if isinstance(method.input, six.string_types):
             element = self.service.find_element_by_name(method.input)
@@ -130,10 +324,22 @@ class SOAPDispatcher(object):
                           namespace=schema.targetNamespace,
                           elementFormDefault=schema.elementFormDefault)
 
+    def _parse_header_element(self, handler, header_element):
+        # like _parse_header() for the XML element of the SOAP header
+        if header_element is None:
+            return None
+        header_type = handler.input_header or self.service.input_header
+        if header_type:
+            return header_type.parse_xmlelement(header_element)
+
     def _validate_header(self, soap_header):
-        if soap_header is None:
+        if soap_header is not None:
+            self._validate_header_element(soap_header._xmlelement)
+
+    def _validate_header_element(self, header_element):
+        if header_element is None:
             return
-        for children in soap_header._xmlelement.getchildren():
+        for children in header_element.getchildren():
             namespace = children.nsmap.get(children.prefix)
             if namespace == wsa.NAMESPACE:
                 wsa.XML_SCHEMA.assertValid(children)
@@ -165,28 +371,87 @@ class SOAPDispatcher(object):
             return SOAPResponse('bad request', http_status_code=400, http_content='bad_request',
                                 http_headers={'Content-Type': 'text/plain'})
 
+    def _split_envelope(self, xml):
+        """
+        Parses the XML once and returns the SOAP header element (or None) and
+        the content element of the SOAP body without building Envelope, Header
+        and Body objects.
+        """
+        SOAP = self.service.version
+        try:
+            root = self.parser_config.fromstring(xml)
+        except etree.XMLSyntaxError as e:
+            raise SOAPError(SOAP.Code.CLIENT, repr(e))
+        header_tag = '{%s}Header' % SOAP.ENVELOPE_NAMESPACE
+        body_tag = '{%s}Body' % SOAP.ENVELOPE_NAMESPACE
+        header = body = None
+        for element in root:
+            if element.tag == body_tag:
+                body = element
+            elif element.tag == header_tag:
+                header = element
+        # see _parse_soap_content()
+        if body is None:
+            raise SOAPError(SOAP.Code.CLIENT, 'Missing SOAP body')
+        if not len(body):
+            raise SOAPError(SOAP.Code.CLIENT, 'Missing SOAP body content')
+        return header, body[0]
+
     def handle_soap_request(self, request):
+        stopwatch = _Stopwatch()
+        try:
+            self._prepare_soap_request(request, stopwatch)
+        except SOAPError as ex:
+            response = ex
+        else:
+            response = self.middleware()(request)
+            stopwatch.lap('call')
+        return self._finish_soap_request(request, response, stopwatch)
+
+    def _prepare_soap_request(self, request, stopwatch):
+        """
+        Parses and validates the request, finds the service method and parses
+        its input (request.method, request.soap_header and request.soap_body).
+        Raises SOAPError for invalid requests.
+        """
         request.dispatcher = self
+        request.timings = stopwatch.timings
         SOAP = self.service.version
 
-        try:
+        if self.single_pass:
+            header_element, soap_body_content = self._split_envelope(request.http_content)
+            parse_header = self._parse_header_element
+        else:
             soap_envelope = self._parse_soap_content(request.http_content)
             soap_body_content = soap_envelope.Body.content()
-            soap_header = soap_envelope.Header
+            header_element = soap_envelope.Header
+            parse_header = self._parse_header
+        stopwatch.lap('parse')
 
-            try:
+        try:
+            if self.single_pass:
+                self._validate_header_element(header_element)
+                self.schema_validator(soap_body_content)
+            else:
                 self._validate_input(soap_envelope)
-            except (etree.XMLSyntaxError, etree.DocumentInvalid) as e:
-                raise SOAPError(SOAP.Code.CLIENT, repr(e))
-
-            request.method = self._find_handler_for_request(request, soap_body_content)
-            request.soap_header = self._parse_header(request.method, soap_header)
-            request.soap_body = self._parse_input(request.method, soap_body_content)
-        except SOAPError as ex:
-            response = ex
-        else:
-            response = self.middleware()(request)
+        except (etree.XMLSyntaxError, etree.DocumentInvalid) as e:
+            raise SOAPError(SOAP.Code.CLIENT, repr(e))
+        stopwatch.lap('validate')
+
+        request.method = self._find_handler_for_request(request, soap_body_content)
+        stopwatch.lap('route')
+        request.soap_header = parse_header(request.method, header_element)
+        request.soap_body = self._parse_input(request.method, soap_body_content)
+        stopwatch.lap('parse_input')
+
+    def _finish_soap_request(self, request, response, stopwatch):
+        response = self._render_response(request, response)
+        stopwatch.lap('render')
+        logger.debug('Request timings: %s', stopwatch)
+        return response
 
+    def _render_response(self, request, response):
+        SOAP = self.service.version
         if not isinstance(response, SOAPResponse):
             response = SOAPResponse(response)
 
@@ -203,50 +468,199 @@ class SOAPDispatcher(object):
             if isinstance(request.method.output, six.string_types):
                 tagname = request.method.output
             else:
-                tagname = uncapitalize(response.content.__class__.__name__)
-            response.http_content = SOAP.Envelope.response(tagname, response.soap_body, header=response.soap_header)
+                tagname = uncapitalize(response.soap_body.__class__.__name__)
+            if self.stream_responses:
+                render = SOAP.Envelope.response_chunks
+            else:
+                render = functools.partial(SOAP.Envelope.response, direct=self.direct_responses)
+            response.http_content = render(tagname, response.soap_body, header=response.soap_header)
         return response
 
     def handle_wsdl_request(self, request):
         scheme = request.environ.get('X-Forwarded-Proto', request.environ.get('wsgi.url_scheme', 'http'))
         host = request.environ.get('HTTP_HOST')
-        wsdl = self.wsdl
-        if scheme and host:
-            if six.PY3:
-                wsdl = wsdl.decode()
 
-            wsdl = string.Template(wsdl).safe_substitute(scheme=scheme, host=host)
+        def render():
+            wsdl = self.wsdl
+            if scheme and host:
+                if six.PY3:
+                    wsdl = wsdl.decode()
 
-            if six.PY3:
-                wsdl = wsdl.encode()
+                wsdl = string.Template(wsdl).safe_substitute(scheme=scheme, host=host)
 
-        return SOAPResponse('wsdl', http_content=wsdl, http_headers={'Content-Type': 'text/xml'})
+                if six.PY3:
+                    wsdl = wsdl.encode()
+            return wsdl
+        document = self._wsdl_documents.get((scheme, host) if scheme and host else None, render)
+        return self._document_response(request, 'wsdl', document)
 
     def handle_xsd_request(self, request):
         qs = request.environ.get('QUERY_STRING')
         qs = six.moves.urllib.parse.parse_qs(qs, keep_blank_values=True)
-        try:
-            xsd = self.xsds[qs['xsd'][0] or 'xsd']
-        except KeyError:
+        name = qs['xsd'][0] or 'xsd'
+        if name not in self.xsds:
             return SOAPResponse('not found', http_status_code=404, http_content='not_found',
                                 http_headers={'Content-Type': 'text/plain'})
-        else:
-            return SOAPResponse('xsd', http_content=xsd, http_headers={'Content-Type': 'text/xml'})
+        document = self._xsd_documents.get(name, lambda: self.xsds[name])
+        return self._document_response(request, 'xsd', document)
+
+    def _document_response(self, request, name, document):
+        """
+        Returns the (cached) WSDL/XSD document, gzip compressed if the client
+        accepts it, or 304 Not Modified if the client has the same version.
+        """
+        accept_encoding = request.environ.get('HTTP_ACCEPT_ENCODING')
+        gzipped = compression.accepted_encoding(accept_encoding, ('gzip',)) is not None
+        headers = {
+            'ETag': document.gzip_etag if gzipped else document.etag,
+            'Vary': 'Accept-Encoding',
+        }
+        if _etag_matches(request.environ.get('HTTP_IF_NONE_MATCH'), (document.etag, document.gzip_etag)):
+            return SOAPResponse(name, http_status_code=304, http_content=b'', http_headers=headers)
+        headers['Content-Type'] = 'text/xml'
+        if gzipped:
+            headers['Content-Encoding'] = 'gzip'
+            return SOAPResponse(name, http_content=document.gzipped, http_headers=headers)
+        return SOAPResponse(name, http_content=document.content, http_headers=headers)
 
     def _rewrite_locations(self, element):
         for e in element.xpath('//xsd:import|//xsd:include', namespaces=element.nsmap):
             e.attrib['schemaLocation'] = '?xsd=%s' % e.attrib['schemaLocation']
 
 
-class WsgiSoapApplication(object):
+class SharedDispatcher(object):
+    """
+    Creates the SOAPDispatcher for a service on first use and shares it for
+    all following requests (used by the web framework adapters).
+    The dispatcher generates the WSDL, the XSDs and the schema validator when
+    it is created so it must not be created for every request.
+    """
+
+    def __init__(self, service, **dispatcher_kwargs):
+        self.service = service
+        self.dispatcher_kwargs = dispatcher_kwargs
+        self._dispatcher = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        dispatcher = self._dispatcher
+        if dispatcher is None:
+            with self._lock:
+                dispatcher = self._dispatcher
+                if dispatcher is None:
+                    dispatcher = self._dispatcher = SOAPDispatcher(self.service, **self.dispatcher_kwargs)
+        return dispatcher
+
+    def reset(self):
+        """
+        Discards the dispatcher (and the compiled schemas of the service) so
+        the next request creates a new one, e.g. after the service definition
+        was changed.
+        """
+        with self._lock:
+            self._dispatcher = None
+            for schema in self.service.schemas:
+                py2xsd.invalidate_xml_schema(schema)
+
+    def dispatch(self, request):
+        return self.get().dispatch(request)
+
+
+class _RequestError(Exception):
+    """
+    The HTTP request can not be handled (e.g. invalid compressed content).
+    """
+
+    def __init__(self, status_code, message):
+        super(_RequestError, self).__init__(message)
+        self.status_code = status_code
 
-    def __init__(self, dispatcher):
+    def response(self):
+        return SOAPResponse('error', http_status_code=self.status_code,
+                            http_content=six.text_type(self).encode('utf-8'),
+                            http_headers={'Content-Type': 'text/plain'})
+
+
+class _HttpApplication(object):
+    """
+    Content encoding of requests and responses for the WSGI/ASGI applications.
+
+    Requests with a gzip or deflate Content-Encoding are decompressed (up to
+    max_request_size bytes). With compress_responses=True responses are
+    compressed if the client accepts it (Accept-Encoding) and the content is
+    at least compress_min_size bytes long, streamed responses are compressed
+    incrementally.
+    """
+
+    def __init__(self, dispatcher, compress_responses=False, compress_min_size=COMPRESS_MIN_SIZE,
+                 max_request_size=MAX_REQUEST_SIZE):
         self.dispatcher = dispatcher
+        self.compress_responses = compress_responses
+        self.compress_min_size = compress_min_size
+        self.max_request_size = max_request_size
+
+    def _decompress(self, req_env, content):
+        encoding = req_env.get('HTTP_CONTENT_ENCODING')
+        if not compression.is_supported(encoding):
+            raise _RequestError(415, 'Unsupported content encoding %r' % encoding)
+        try:
+            return compression.decompress(content, encoding, self.max_request_size)
+        except compression.DecompressionError as e:
+            logger.info('Rejected compressed request: %s', e)
+            raise _RequestError(413 if e.too_large else 400, six.text_type(e))
+
+    def _compress(self, req_env, response):
+        """
+        Returns the content of response, compressed if the client accepts it
+        (and updates the response headers accordingly).
+        """
+        content = response.http_content
+        headers = response.http_headers
+        names = dict((name.lower(), name) for name in headers)
+        if 'content-encoding' in names or response.http_status_code in (204, 304):
+            return content
+        if isinstance(content, six.binary_type):
+            if len(content) < self.compress_min_size:
+                return content
+        elif isinstance(content, six.text_type) or content is None:
+            return content
+        vary = headers.get(names.get('vary'))
+        if not vary:
+            headers['Vary'] = 'Accept-Encoding'
+        elif 'accept-encoding' not in vary.lower():
+            headers[names['vary']] = vary + ', Accept-Encoding'
+        encoding = compression.accepted_encoding(req_env.get('HTTP_ACCEPT_ENCODING'))
+        if encoding is None:
+            return content
+        headers['Content-Encoding'] = encoding
+        if isinstance(content, six.binary_type):
+            content = compression.compress(content, encoding)
+            if 'content-length' in names:
+                headers[names['content-length']] = str(len(content))
+            return content
+        headers.pop(names.get('content-length'), None)
+        return compression.compress_chunks(content, encoding)
+
+
+class WsgiSoapApplication(_HttpApplication):
+    """
+    WSGI application for a SOAPDispatcher.
+    """
 
     def __call__(self, req_env, start_response, wsgi_url=None):
         content_length = int(req_env.get('CONTENT_LENGTH', '') or 0)
         content = req_env['wsgi.input'].read(content_length)
-        soap_request = SOAPRequest(req_env, content)
-        response = self.dispatcher.dispatch(soap_request)
+        try:
+            content = self._decompress(req_env, content)
+        except _RequestError as e:
+            response = e.response()
+        else:
+            soap_request = SOAPRequest(req_env, content)
+            response = self.dispatcher.dispatch(soap_request)
+        http_content = response.http_content
+        if self.compress_responses:
+            http_content = self._compress(req_env, response)
         start_response(response.http_status_text, list(response.http_headers.items()))
-        return [response.http_content]
+        if isinstance(http_content, (six.binary_type, six.text_type)):
+            return [http_content]
+        return http_content  # streamed response
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+'''
+Local asyncio HTTP server for testing ASGI applications and AsyncStub
+(Python 3.5+ only).
+'''
+
+from __future__ import absolute_import
+
+import asyncio
+
+__all__ = ['serve_asgi']
+
+# Python < 3.7
+_current_task = getattr(asyncio, 'current_task', None) or asyncio.Task.current_task
+
+
+class _Server(object):
+
+    def __init__(self, app):
+        self.app = app
+        self.server = None
+        self._handlers = set()
+
+    async def handle(self, reader, writer):
+        task = _current_task()
+        self._handlers.add(task)
+        try:
+            await self._handle(reader, writer)
+        finally:
+            self._handlers.discard(task)
+            writer.close()
+
+    async def _handle(self, reader, writer):
+        method, target, _ = (await reader.readline()).decode('latin-1').split(' ', 2)
+        path, _, query = target.partition('?')
+        headers = []
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.partition(b':')
+            headers.append((name.strip().lower(), value.strip()))
+        body = await reader.readexactly(int(dict(headers).get(b'content-length', 0)))
+        scope = {'type': 'http', 'method': method, 'path': path, 'query_string': query.encode('latin-1'),
+                 'headers': headers}
+        messages = [{'type': 'http.request', 'body': body}]
+        sent = []
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message)
+        await self.app(scope, receive, send)
+
+        writer.write(('HTTP/1.1 %d Status\r\n' % sent[0]['status']).encode('latin-1'))
+        for name, value in sent[0]['headers']:
+            writer.write(name + b': ' + value + b'\r\n')
+        chunks = [message['body'] for message in sent[1:] if message.get('body')]
+        if len(sent) > 2:
+            # streamed response
+            writer.write(b'Transfer-Encoding: chunked\r\n\r\n')
+            for chunk in chunks:
+                writer.write(('%x\r\n' % len(chunk)).encode('ascii') + chunk + b'\r\n')
+            writer.write(b'0\r\n\r\n')
+        else:
+            content = b''.join(chunks)
+            writer.write(('Content-Length: %d\r\n\r\n' % len(content)).encode('ascii') + content)
+        await writer.drain()
+
+    async def stop(self):
+        for handler in list(self._handlers):
+            handler.cancel()
+        self.server.close()
+        await self.server.wait_closed()
+
+
+async def serve_asgi(app, host='127.0.0.1', port=0):
+    '''
+    Serves the ASGI application (one request per connection). Returns the
+    server and its URL, stop it with ``await server.stop()``.
+    '''
+    server = _Server(app)
+    server.server = await asyncio.start_server(server.handle, host, port)
+    host, port = server.server.sockets[0].getsockname()[:2]
+    return server, 'http://%s:%d/service' % (host, port)
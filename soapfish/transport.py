@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+'''
+HTTP transports for soap.Stub.
+
+A transport is a callable ``transport(url, headers, body, stream=False)``
+which posts the body and returns ``(status code, headers, body)``. The
+returned body is decompressed, with stream=True it is a file-like object
+which is read while the response is received. The caller must close() it,
+that releases the connection (also if the body was not read completely).
+'''
+
+from __future__ import absolute_import
+
+import io
+import threading
+
+import requests
+import six
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+from . import compression
+from .core import SOAPRequest
+
+__all__ = ['DispatcherTransport', 'RequestsTransport', 'Urllib3Transport']
+
+
+def _http_environ(environ, headers):
+    '''
+    Adds the HTTP headers (name, value) to the WSGI environ.
+    '''
+    for name, value in headers:
+        name = name.upper().replace('-', '_')
+        if name not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            name = 'HTTP_' + name
+        environ[name] = environ[name] + ',' + value if name in environ else value
+    if 'HTTP_SOAPACTION' in environ:
+        # soap11.determine_soap_action() looks for SOAPACTION
+        environ.setdefault('SOAPACTION', environ['HTTP_SOAPACTION'])
+    return environ
+
+
+class _StreamedBody(object):
+    '''
+    File-like body of a streamed urllib3 response. close() returns the
+    connection to the pool, a connection whose response was not read
+    completely is closed first.
+    '''
+
+    def __init__(self, response):
+        self.response = response
+        self._finished = False
+
+    def read(self, size=-1):
+        data = self.response.read(size if size >= 0 else None)
+        if not data or size < 0:
+            self._finished = True
+        return data
+
+    def close(self):
+        if not self._finished:
+            self.response.close()
+        self.response.release_conn()
+
+
+class RequestsTransport(object):
+    '''
+    Transport using a requests.Session (keep-alive connections, can be
+    shared by threads), the default transport of soap.Stub.
+
+    :param session: requests.Session to use (not closed by close()), by
+        default a session is created on first use.
+    :param pool_connections: int, number of hosts for which connections are
+        pooled (own session only).
+    :param pool_maxsize: int, maximum number of connections kept per host
+        (own session only).
+    :param pool_block: bool, wait for a free connection instead of opening
+        more than pool_maxsize connections to a host (own session only).
+    :param timeout: float or (connect timeout, read timeout) in seconds.
+    '''
+
+    def __init__(self, session=None, pool_connections=10, pool_maxsize=10, pool_block=False, timeout=None):
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.pool_block = pool_block
+        self.timeout = timeout
+        self._session = session
+        self._owns_session = session is None
+        self._session_lock = threading.Lock()
+
+    @property
+    def session(self):
+        session = self._session
+        if session is None:
+            with self._session_lock:
+                if self._session is None:
+                    self._session = self._create_session()
+                session = self._session
+        return session
+
+    def _create_session(self):
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=self.pool_connections, pool_maxsize=self.pool_maxsize,
+                              pool_block=self.pool_block)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
+    def __call__(self, url, headers, body, stream=False):
+        r = self.session.post(url, headers=headers, data=body, stream=stream, timeout=self.timeout)
+        if not stream:
+            return r.status_code, r.headers, r.content
+        if r.status_code != 200:
+            # Faults are small, read them completely.
+            return r.status_code, r.headers, io.BytesIO(r.content)
+        r.raw.decode_content = True
+        return r.status_code, r.headers, _StreamedBody(r.raw)
+
+    def close(self):
+        '''
+        Closes the connections of the session created by the transport (a
+        new session is created if the transport is used again).
+        '''
+        with self._session_lock:
+            session = self._session
+            if self._owns_session:
+                self._session = None
+        if self._owns_session and session is not None:
+            session.close()
+
+
+class Urllib3Transport(object):
+    '''
+    Transport using a urllib3.PoolManager (less overhead per call than
+    requests). urllib3 is not a declared dependency of soapfish, it must be
+    installed (it usually is, requests uses it).
+
+    :param pool_manager: urllib3.PoolManager to use (not cleared by close()).
+    :param num_pools, maxsize, block: see urllib3.PoolManager (own pool
+        manager only).
+    :param timeout: float or (connect timeout, read timeout) in seconds.
+    '''
+
+    def __init__(self, pool_manager=None, num_pools=10, maxsize=10, block=False, timeout=None):
+        import urllib3
+
+        self._owns_pool_manager = pool_manager is None
+        if pool_manager is None:
+            pool_manager = urllib3.PoolManager(num_pools=num_pools, maxsize=maxsize, block=block)
+        self.pool_manager = pool_manager
+        if isinstance(timeout, tuple):
+            timeout = urllib3.Timeout(connect=timeout[0], read=timeout[1])
+        self.timeout = timeout
+
+    def __call__(self, url, headers, body, stream=False):
+        kwargs = {} if self.timeout is None else {'timeout': self.timeout}
+        r = self.pool_manager.request('POST', url, body=body, headers=headers, preload_content=not stream,
+                                      decode_content=True, **kwargs)
+        return r.status, r.headers, _StreamedBody(r) if stream else r.data
+
+    def close(self):
+        if self._owns_pool_manager:
+            self.pool_manager.clear()
+
+
+class DispatcherTransport(object):
+    '''
+    In-process transport which passes the requests to a SOAPDispatcher
+    directly (no sockets, e.g. for tests and co-located services).
+    '''
+
+    def __init__(self, dispatcher):
+        self.dispatcher = dispatcher
+
+    def __call__(self, url, headers, body, stream=False):
+        parts = six.moves.urllib.parse.urlsplit(url)
+        environ = {
+            'REQUEST_METHOD': 'POST',
+            'PATH_INFO': parts.path or '/',
+            'QUERY_STRING': parts.query,
+            'SERVER_NAME': parts.hostname or 'localhost',
+            'SERVER_PORT': str(parts.port or (443 if parts.scheme == 'https' else 80)),
+            'HTTP_HOST': parts.netloc,
+            'wsgi.url_scheme': parts.scheme or 'http',
+        }
+        # responses are not compressed, so Accept-Encoding is left out
+        _http_environ(environ, ((name, value) for name, value in headers.items()
+                               if name.lower() != 'accept-encoding'))
+        body = compression.decompress(body, environ.get('HTTP_CONTENT_ENCODING'))
+        environ['CONTENT_LENGTH'] = str(len(body))
+        response = self.dispatcher.dispatch(SOAPRequest(environ, body))
+        content = response.http_content
+        if isinstance(content, six.text_type):
+            content = content.encode('utf-8')
+        elif not isinstance(content, six.binary_type):
+            content = b''.join(content)  # streamed response
+        headers = CaseInsensitiveDict(response.http_headers)
+        return response.http_status_code, headers, io.BytesIO(content) if stream else content
+
+    def close(self):
+        pass
@@ -8,11 +8,13 @@ import keyword
 import logging
 import os
 import re
+import threading
 from datetime import datetime, timedelta
 
 import requests
 import six
 from jinja2 import Environment, PackageLoader
+from lxml import etree
 
 from . import namespaces as ns
 
@@ -186,6 +188,70 @@ def get_rendering_environment(xsd_namespaces, module='soapfish'):
     return env
 
 
+# --- XML Parsers -------------------------------------------------------------
+class XMLParserConfig(object):
+    '''
+    Options of the lxml parsers used for incoming documents (SOAP messages,
+    WSDL and XSD files). The parsers are created once per thread (an lxml
+    parser must not be used by several threads at the same time) and reused.
+    '''
+
+    def __init__(self, resolve_entities=False, huge_tree=False, collect_ids=False,
+                 remove_comments=True, remove_blank_text=False):
+        '''
+        :param resolve_entities: expand entities defined in a DTD of the
+            document (entities are never loaded from the network).
+        :param huge_tree: allow very deep trees and very long text nodes.
+        :param collect_ids: build a hash table of the XML IDs (only needed
+            for the ID lookups of lxml).
+        :param remove_comments: do not add comments to the tree (so they do
+            not appear as content, e.g. in soap11.Body.content()).
+        :param remove_blank_text: drop whitespace-only text between elements.
+        '''
+        self.options = {
+            'resolve_entities': resolve_entities,
+            'huge_tree': huge_tree,
+            'collect_ids': collect_ids,
+            'remove_comments': remove_comments,
+            'remove_blank_text': remove_blank_text,
+        }
+        self._local = threading.local()
+
+    def parser(self, schema=None):
+        '''
+        Returns the parser of the current thread (validating against the
+        etree.XMLSchema if given).
+        '''
+        try:
+            parsers = self._local.parsers
+        except AttributeError:
+            parsers = self._local.parsers = {}
+        try:
+            return parsers[schema]
+        except KeyError:
+            pass
+        parser = etree.XMLParser(schema=schema, no_network=True, **self.options)
+        if len(parsers) < MAX_CACHED_PARSERS:
+            parsers[schema] = parser
+        return parser
+
+    def fromstring(self, xml, schema=None):
+        return etree.fromstring(xml, self.parser(schema))
+
+    def iterparse(self, source, **kwargs):
+        # iterparse() creates its own parser, only the options are shared
+        kwargs.update(self.options)
+        kwargs.setdefault('no_network', True)
+        return etree.iterparse(source, **kwargs)
+
+
+MAX_CACHED_PARSERS = 32
+DEFAULT_PARSER_CONFIG = XMLParserConfig()
+# wsdl2py and xsd2py expand entities (like the default lxml parser) as the
+# generated code must reflect the documents chosen by the developer.
+GENERATOR_PARSER_CONFIG = XMLParserConfig(resolve_entities=True)
+
+
 # --- Other Functions ---------------------------------------------------------
 def find_xsd_namespaces(xml):
     nsmap = xml.nsmap.copy()
@@ -10,10 +10,10 @@ import sys
 from collections import deque
 
 import six
-from lxml import etree
 
 from .soap import SOAPVersion
 from .utils import (
+    GENERATOR_PARSER_CONFIG,
     find_xsd_namespaces,
     get_rendering_environment,
     open_document,
@@ -59,7 +59,7 @@ def merge_imports(wsdl, definitions, xsd_namespaces, cwd=None, seen=None):
         seen.add(path)
 
         xml = open_document(path)
-        xml = etree.fromstring(xml)
+        xml = GENERATOR_PARSER_CONFIG.fromstring(xml)
 
         xsd_namespaces.update(find_xsd_namespaces(xml))
 
@@ -82,7 +82,7 @@ def merge_imports(wsdl, definitions, xsd_namespaces, cwd=None, seen=None):
 def generate_code_from_wsdl(xml, target, use_wsa=False, encoding='utf8', cwd=None):
 
     if isinstance(xml, six.binary_type):
-        xml = etree.fromstring(xml)
+        xml = GENERATOR_PARSER_CONFIG.fromstring(xml)
 
     if cwd is None:
         cwd = six.moves.getcwd()
@@ -45,6 +45,7 @@ from __future__ import absolute_import
 import functools
 import itertools
 import logging
+import operator
 import re
 from copy import copy
 from datetime import datetime
@@ -56,7 +57,7 @@ import six
 from lxml import etree
 
 from . import namespaces as ns
-from .utils import timezone_offset_to_string
+from .utils import DEFAULT_PARSER_CONFIG, timezone_offset_to_string
 from .xsd_types import XSDDate
 
 # TODO: Change import we update to iso8601 > 0.1.11 (fixed in 031688e)
@@ -68,6 +69,17 @@ logger = logging.getLogger(__name__)
 NIL = object()
 UNBOUNDED = _Decimal('infinity')
 
+XSI_NIL = '{%s}nil' % ns.xsi
+
+# Attributes (besides the fields) of compact ComplexType instances.
+_INSTANCE_SLOTS = ('_xmlelement', '_lazy')
+
+# Upper bound for per-class caches keyed by data from parsed documents.
+MAX_CACHED_TAGS = 1024
+
+# Default size (in bytes) of the chunks returned by ComplexType.xml_chunks().
+XML_CHUNK_SIZE = 64 * 1024
+
 
 class CallStyle(object):
     DOCUMENT = 'document'
@@ -113,6 +125,12 @@ class Type(object):
     Abstract.
     '''
 
+    __slots__ = ()
+
+    # True if parse_xmlelement() only returns values that accept() would
+    # return unchanged, so the parser can skip accept() for parsed values.
+    _validates_on_parse = False
+
     def accept(self, value):
         raise NotImplementedError
 
@@ -358,6 +376,8 @@ class DateTime(SimpleType):
 
 class Decimal(SimpleType):
 
+    _validates_on_parse = True  # pythonvalue() calls accept()
+
     def __init__(self, enumeration=None, fractionDigits=None, maxExclusive=None,
                  maxInclusive=None, minExclusive=None, minInclusive=None,
                  pattern=None, totalDigits=None):
@@ -561,6 +581,71 @@ class MaxOccurs(SimpleType):
         return self.accept(xmlvalue)
 
 
+def _overrides(obj, cls, name):
+    '''
+    Returns True if the class of obj overrides the method "name" of cls.
+    '''
+    method = getattr(obj.__class__, name)
+    return six.get_unbound_function(method) is not six.get_unbound_function(getattr(cls, name))
+
+
+def _generic_renderer(element, field_name, namespace, elementFormDefault):
+    render = element.render
+
+    def render_field(parent, value):
+        render(parent, field_name, value, namespace, elementFormDefault)
+    return render_field
+
+
+def _write_element(xf, xmlelement):
+    '''
+    Writes a rendered element to the incremental XML writer xf. Qualified
+    elements are written with xf.element() so they use the namespace
+    declarations of the enclosing elements (xf.write() would declare the
+    namespace again on every element), empty ones are written as start and
+    end tag.
+    '''
+    if not any('{' in node.tag for node in xmlelement.iter(etree.Element)):
+        xf.write(xmlelement)
+        return
+    attrib = dict(xmlelement.attrib)
+    nsmap = {'xsi': ns.xsi} if XSI_NIL in attrib else None  # same prefix as lxml uses for xml()
+    with xf.element(xmlelement.tag, attrib=attrib, nsmap=nsmap):
+        if xmlelement.text:
+            xf.write(xmlelement.text)
+        for child in xmlelement:
+            _write_element(xf, child)
+            if child.tail:
+                xf.write(child.tail)
+
+
+def _write_rendered(xf, render, value):
+    '''
+    Renders a field the regular way and writes the resulting elements to the
+    incremental XML writer xf.
+    '''
+    parent = etree.Element('parent')
+    render(parent, value)
+    for xmlelement in parent:
+        _write_element(xf, xmlelement)
+
+
+def _xml_chunks(write, chunk_size):
+    '''
+    Calls the generator function write(xf) with an etree.xmlfile writer and
+    yields the output in chunks of (at least) chunk_size bytes.
+    '''
+    output = six.BytesIO()
+    with etree.xmlfile(output, buffered=False) as xf:
+        for _ in write(xf):
+            if output.tell() >= chunk_size:
+                yield output.getvalue()
+                output.seek(0)
+                output.truncate()
+    if output.tell():
+        yield output.getvalue()
+
+
 def import_type(type_name):
     if '.' not in type_name:
         raise ValueError('We need the full namepath to be able to import it: %s' % type_name)
@@ -604,6 +689,13 @@ class Element(object):
         self.nillable = nillable
         self.namespace = namespace
 
+    def __get__(self, instance, owner):
+        # Fields of lazily parsed instances are missing from their __dict__
+        # until they are accessed for the first time.
+        if instance is None or getattr(instance, '_lazy', None) is None:
+            return self
+        return instance._load_field(self._name)
+
     def _evaluate_type(self):
         if self._type is None:
             if isinstance(self._passed_type, six.string_types):
@@ -637,29 +729,88 @@ class Element(object):
         else:
             return self._type.accept(value)
 
+    def _qualify(self, tagname, namespace, elementFormDefault):
+        '''
+        Returns the tag (in Clark notation if qualified) and the namespace
+        used to render this element.
+        '''
+        if self.namespace is not None:
+            namespace = self.namespace
+        if namespace is not None and elementFormDefault == ElementFormDefault.QUALIFIED:
+            tagname = '{%s}%s' % (namespace, tagname)
+        return tagname, namespace
+
     def render(self, parent, field_name, value, namespace=None, elementFormDefault=None):
         self._evaluate_type()
         if value is None:
             return
 
-        if self.namespace is not None:
-            namespace = self.namespace
-        if namespace is not None and elementFormDefault == ElementFormDefault.QUALIFIED:
-            field_name = '{%s}%s' % (namespace, field_name)
+        field_name, namespace = self._qualify(field_name, namespace, elementFormDefault)
 
         xmlelement = etree.Element(field_name)
         if value == NIL:
-            xmlelement.set('{%s}nil' % ns.xsi, 'true')
+            xmlelement.set(XSI_NIL, 'true')
         else:
             self._type.render(xmlelement, value, namespace, elementFormDefault)
         parent.append(xmlelement)
 
-    def parse(self, instance, field_name, xmlelement):
+    def renderer(self, field_name, namespace=None, elementFormDefault=None):
+        '''
+        Returns a callable ``(parent, value)`` which renders this field like
+        ``render()`` does. The tag name and the render method of the type are
+        resolved once so the callable can be cached in a render plan.
+        '''
+        if _overrides(self, Element, 'render'):
+            return _generic_renderer(self, field_name, namespace, elementFormDefault)
+        self._evaluate_type()
+        tagname, namespace = self._qualify(field_name, namespace, elementFormDefault)
+        render_type = self._type.render
+
+        def render(parent, value):
+            if value is None:
+                return
+            xmlelement = etree.Element(tagname)
+            if value is NIL:
+                xmlelement.set(XSI_NIL, 'true')
+            else:
+                render_type(xmlelement, value, namespace, elementFormDefault)
+            parent.append(xmlelement)
+        return render
+
+    def _write(self, xf, field_name, value, render, namespace, elementFormDefault):
+        '''
+        Writes this field to the incremental XML writer xf (etree.xmlfile),
+        complex values are written field by field. This is a generator which
+        yields after each written element, render is the renderer of the
+        field (see renderer()).
+        '''
+        self._evaluate_type()
+        if value is None or value is NIL or not isinstance(self._type, ComplexType):
+            _write_rendered(xf, render, value)
+            yield
+            return
+        tagname, namespace = self._qualify(field_name, namespace, elementFormDefault)
+        for _ in self._type._write(xf, tagname, value, namespace, elementFormDefault):
+            yield
+
+    def _parse_xmlelement(self, xmlelement, options):
+        '''
+        Parses the value of this element. The parse options (keyword arguments
+        of ComplexType.parse_xmlelement) are only passed to complex types.
+        '''
+        if options and isinstance(self._type, ComplexType):
+            return self._type.parse_xmlelement(xmlelement, **options)
+        return self._type.parse_xmlelement(xmlelement)
+
+    def parse(self, instance, field_name, xmlelement, **options):
         self._evaluate_type()
-        if xmlelement.get('{%s}nil' % ns.xsi) == 'true':
+        if xmlelement.get(XSI_NIL) == 'true':
             value = NIL
         else:
-            value = self._type.parse_xmlelement(xmlelement)
+            value = self._parse_xmlelement(xmlelement, options)
+            if self._type._validates_on_parse:
+                _set_trusted(instance, field_name, value)
+                return
         setattr(instance, field_name, value)
 
     def __repr__(self):
@@ -695,6 +846,16 @@ class ClassNamedElement(Element):
                           elementFormDefault=value.SCHEMA.elementFormDefault)
         parent.append(xmlelement)
 
+    def _write(self, xf, field_name, value, render, namespace, elementFormDefault):
+        if value is None or value.value is None:
+            return
+        tagname, value = value.name, value.value
+        namespace = value.SCHEMA.targetNamespace
+        if namespace:
+            tagname = '{%s}%s' % (namespace, tagname)
+        for _ in self._type._write(xf, tagname, value, namespace, value.SCHEMA.elementFormDefault):
+            yield
+
 
 class Attribute(Element):
     '''
@@ -731,13 +892,16 @@ class Attribute(Element):
             xmlvalue = self._type.xmlvalue(value)
         parent.set(field_name, xmlvalue)
 
-    def parse(self, instance, field_name, xmlelement):
+    def parse(self, instance, field_name, xmlelement, **options):
         self._evaluate_type()
         xmlvalue = xmlelement.get(field_name)
         if xmlvalue is None:
             xmlvalue = self.default
         value = self._type.pythonvalue(xmlvalue)
-        setattr(instance, field_name, value)
+        if self._type._validates_on_parse:
+            _set_trusted(instance, field_name, value)
+        else:
+            setattr(instance, field_name, value)
 
 
 class Ref(Element):
@@ -811,9 +975,15 @@ class TypedList(list):
             accepted_value = NIL
         else:
             accepted_value = self._list._type.accept(value)
+        self._append(accepted_value)
+
+    def _append(self, value):
+        '''
+        Appends an accepted value, only the maxOccurs restriction is checked.
+        '''
         if self._list._maxOccurs is not None and (len(self) + 1 > self._list._maxOccurs):
             raise ValueError('You must not add more than %s items to this list.' % self._list._maxOccurs)
-        super(TypedList, self).append(accepted_value)
+        super(TypedList, self).append(value)
 
 
 class ListElement(Element):
@@ -845,39 +1015,102 @@ class ListElement(Element):
     def empty_value(self):
         return TypedList(self)
 
-    def render(self, parent, field_name, value, namespace=None, elementFormDefault=None):
-        self._evaluate_type()
-        items = value  # The value must be list of items.
+    def _check_length(self, field_name, items):
         if self._minOccurs and len(items) < self._minOccurs:
             raise ValueError('For %s minOccurs=%d but list length %d.' % (field_name, self._minOccurs, len(items)))
         if self._maxOccurs and len(items) > self._maxOccurs:
             raise ValueError('For %s maxOccurs=%d but list length %d.' % (field_name, self._maxOccurs, len(items)))
 
-        if self.namespace is not None:
-            namespace = self.namespace
-        if namespace is not None and elementFormDefault == ElementFormDefault.QUALIFIED:
-            tagname = '{%s}%s' % (namespace, self.tagname)
-        else:
-            tagname = self.tagname
+    def render(self, parent, field_name, value, namespace=None, elementFormDefault=None):
+        self._evaluate_type()
+        items = value  # The value must be list of items.
+        self._check_length(field_name, items)
+
+        tagname, namespace = self._qualify(self.tagname, namespace, elementFormDefault)
 
         for item in items:
             xmlelement = etree.Element(tagname)
             if item == NIL:
-                xmlelement.set('{%s}nil' % ns.xsi, 'true')
+                xmlelement.set(XSI_NIL, 'true')
             else:
                 self._type.render(xmlelement, item, namespace, elementFormDefault)
             parent.append(xmlelement)
 
-    def parse(self, instance, field_name, xmlelement):
+    def renderer(self, field_name, namespace=None, elementFormDefault=None):
+        if _overrides(self, ListElement, 'render'):
+            return _generic_renderer(self, field_name, namespace, elementFormDefault)
+        self._evaluate_type()
+        tagname, namespace = self._qualify(self.tagname, namespace, elementFormDefault)
+        render_type = self._type.render
+        check_length = self._check_length
+
+        def render(parent, items):
+            check_length(field_name, items)
+            for item in items:
+                xmlelement = etree.Element(tagname)
+                if item is NIL:
+                    xmlelement.set(XSI_NIL, 'true')
+                else:
+                    render_type(xmlelement, item, namespace, elementFormDefault)
+                parent.append(xmlelement)
+        return render
+
+    def _write(self, xf, field_name, value, render, namespace, elementFormDefault):
+        self._evaluate_type()
+        self._check_length(field_name, value)
+        tagname, namespace = self._qualify(self.tagname, namespace, elementFormDefault)
+        is_complex = isinstance(self._type, ComplexType)
+        for item in value:
+            if is_complex and item is not NIL:
+                for _ in self._type._write(xf, tagname, item, namespace, elementFormDefault):
+                    yield
+                continue
+            xmlelement = etree.Element(tagname)
+            if item is NIL:
+                xmlelement.set(XSI_NIL, 'true')
+            else:
+                self._type.render(xmlelement, item, namespace, elementFormDefault)
+            _write_element(xf, xmlelement)
+            yield
+
+    def parse(self, instance, field_name, xmlelement, **options):
         self._evaluate_type()
-        if xmlelement.get('{%s}nil' % ns.xsi):
+        _list = getattr(instance, field_name)
+        if xmlelement.get(XSI_NIL):
             value = NIL
         else:
-            value = self._type.parse_xmlelement(xmlelement)
-        _list = getattr(instance, field_name)
+            value = self._parse_xmlelement(xmlelement, options)
+            if self._type._validates_on_parse:
+                _list._append(value)
+                return
         _list.append(value)
 
 
+def _projection(paths):
+    '''
+    Converts dotted field names into a tree of dicts where None selects all
+    fields below a name, e.g. ['header.id', 'items'] becomes
+    {'header': {'id': None}, 'items': None}.
+    '''
+    tree = {}
+    for path in paths:
+        node = tree
+        names = path.split('.')
+        for name in names[:-1]:
+            node = node.setdefault(name, {})
+            if node is None:
+                break
+        else:
+            node[names[-1]] = None
+    return tree
+
+
+# Fields with one of these render methods can be written incrementally.
+_WRITABLE_RENDER_METHODS = frozenset(
+    six.get_unbound_function(cls.render) for cls in (Element, ClassNamedElement, Attribute, ListElement)
+)
+
+
 class ComplexTypeMetaInfo(object):
 
     def __init__(self, cls):
@@ -885,9 +1118,15 @@ class ComplexTypeMetaInfo(object):
         self.fields = []
         self.attributes = []
         self.groups = []
+        # Fields of compact classes are replaced by slots in the class body.
+        slot_elements = {}
+        for klass in reversed(cls.__mro__):
+            slot_elements.update(klass.__dict__.get('_slot_elements', {}))
         for attr in dir(cls):
             item = getattr(cls, attr)
-            if isinstance(getattr(cls, attr), Attribute):
+            if not isinstance(item, Element):
+                item = slot_elements.get(attr)
+            if isinstance(item, Attribute):
                 item._name = attr
                 self.attributes.append(item)
             elif isinstance(item, Ref):
@@ -902,6 +1141,157 @@ class ComplexTypeMetaInfo(object):
         self.allelements = sorted(self.fields + self.groups, key=lambda f: f._creation_number)
         self.all = sorted(self.fields + self.groups + self.attributes, key=lambda f: f._creation_number)
 
+        # Parse plan: child elements are matched by local name (either the
+        # field name or its tagname), so a single pass over the children of an
+        # XML element is enough to dispatch each of them to its field(s).
+        fields_by_tagname = {}
+        for field in self.fields:
+            for name in (field._name, field.tagname):
+                if name is None:
+                    continue
+                fields = fields_by_tagname.setdefault(name, [])
+                if field not in fields:
+                    fields.append(field)
+        self.fields_by_tagname = {name: tuple(fields) for name, fields in fields_by_tagname.items()}
+        self.fields_by_name = {field._name: field for field in self.all}
+        # Instances of classes with a compact base have a '_lazy' slot which
+        # must be initialized explicitly.
+        self.has_slots = hasattr(cls, '_slot_elements')
+        # True if ComplexType.write_xml() can write the fields one by one.
+        self.writable = all(
+            six.get_unbound_function(field.__class__.render) in _WRITABLE_RENDER_METHODS for field in self.all
+        )
+        # Returns the values of all fields as a tuple (used for comparisons).
+        self.values = operator.attrgetter(*[field._name for field in self.all]) if len(self.all) > 1 \
+            else lambda instance: tuple(getattr(instance, field._name) for field in self.all)
+        self._tag_plan = {}
+        self._render_plans = {}
+        self._compiled_parser = None
+        self._compiled_renderers = {}
+        self._serializer_plans = {}
+
+    def fields_for_tag(self, tag):
+        '''
+        Returns the fields an XML element with the given tag ('{ns}name' or
+        'name') is parsed into. Results are cached per tag so the tag string
+        has to be split only once.
+        '''
+        try:
+            return self._tag_plan[tag]
+        except KeyError:
+            pass
+        if not isinstance(tag, six.string_types):
+            # comments, processing instructions and entities
+            fields = ()
+        elif tag[0] == '{':
+            fields = self.fields_by_tagname.get(tag.rsplit('}', 1)[1], ())
+        else:
+            fields = self.fields_by_tagname.get(tag, ())
+        if len(self._tag_plan) < MAX_CACHED_TAGS:
+            self._tag_plan[tag] = fields
+        return fields
+
+    def compiled_parser(self):
+        '''
+        Returns the generated parse function for the class (see xsd_compiler)
+        or None if the class can not be compiled.
+        '''
+        if self._compiled_parser is None:
+            from .xsd_compiler import compile_parser
+            self._compiled_parser = compile_parser(self.cls) or False
+        return self._compiled_parser or None
+
+    def compiled_renderer(self, namespace, elementFormDefault):
+        '''
+        Returns the generated render function for the class (see
+        xsd_compiler), cached per namespace and elementFormDefault.
+        '''
+        key = (namespace, elementFormDefault)
+        try:
+            return self._compiled_renderers[key]
+        except KeyError:
+            pass
+        from .xsd_compiler import compile_renderer
+        renderer = compile_renderer(self.cls, namespace, elementFormDefault)
+        self._compiled_renderers[key] = renderer
+        return renderer
+
+    def select_fields(self, only, options):
+        '''
+        Returns the parse options for the fields selected by ``only`` (see
+        ComplexType.parse_xmlelement()) by field name. The options include
+        the selection of nested fields.
+        '''
+        if not isinstance(only, dict):
+            only = _projection(only)
+            self.check_projection(only)
+        selected = {}
+        for name, nested in only.items():
+            if name not in self.fields_by_name:
+                raise ValueError("%s has no field '%s'" % (self.cls.__name__, name))
+            selected[name] = options if nested is None else dict(options, only=nested)
+        return selected
+
+    def check_projection(self, only):
+        '''
+        Raises ValueError if the projection tree ``only`` (see _projection())
+        contains unknown field names or selects fields below a field which is
+        not a complex type. The whole tree is checked, not only the parts
+        which are present in a document.
+        '''
+        for name, nested in only.items():
+            field = self.fields_by_name.get(name)
+            if field is None:
+                raise ValueError("%s has no field '%s'" % (self.cls.__name__, name))
+            if nested is None:
+                continue
+            field._evaluate_type()
+            if not isinstance(field._type, ComplexType):
+                raise ValueError("%s.%s is not a complex type, can not select '%s'"
+                                 % (self.cls.__name__, name, "', '".join(sorted(nested))))
+            field._type._meta.check_projection(nested)
+
+    def render_plan(self, namespace, elementFormDefault):
+        '''
+        Returns a tuple of (attribute name, renderer) pairs for all fields.
+        Plans are built on first use and cached per namespace and
+        elementFormDefault.
+        '''
+        key = (namespace, elementFormDefault)
+        try:
+            return self._render_plans[key]
+        except KeyError:
+            pass
+        plan = tuple(
+            (field._name, field.renderer(field.tagname or field._name, namespace, elementFormDefault))
+            for field in self.all
+        )
+        self._render_plans[key] = plan
+        return plan
+
+
+def _hashable(value):
+    '''
+    Converts (nested) lists into tuples so the value can be hashed.
+    '''
+    if isinstance(value, (list, tuple)):
+        return tuple(_hashable(item) for item in value)
+    return value
+
+
+def _sort_key(value):
+    '''
+    Returns a key for ordering field values where None and NIL sort before
+    all other values.
+    '''
+    if isinstance(value, (list, tuple)):
+        return (2, tuple(_sort_key(item) for item in value))
+    if value is None:
+        return (0, None)
+    if value is NIL:
+        return (1, None)
+    return (2, value)
+
 
 class Complex_PythonType(type):
     '''
@@ -910,11 +1300,31 @@ class Complex_PythonType(type):
     '''
 
     def __new__(cls, name, bases, attrs):
+        compact = attrs.get('COMPACT', any(getattr(base, 'COMPACT', False) for base in bases))
+        if compact and '__slots__' not in attrs:
+            attrs = cls._compact_attrs(bases, attrs)
         newcls = super(Complex_PythonType, cls).__new__(cls, name, bases, attrs)
         if name != 'Complex':
             newcls._meta = ComplexTypeMetaInfo(newcls)
         return newcls
 
+    @staticmethod
+    def _compact_attrs(bases, attrs):
+        '''
+        Replaces the declared fields with __slots__ so instances do not need a
+        __dict__. The field definitions are kept in _slot_elements.
+        '''
+        attrs = dict(attrs)
+        elements = {k: v for k, v in attrs.items() if isinstance(v, Element)}
+        for key in elements:
+            del attrs[key]
+        slots = sorted(elements)
+        if not any(getattr(base, 'COMPACT', False) for base in bases):
+            slots.extend(_INSTANCE_SLOTS)
+        attrs['__slots__'] = tuple(slots)
+        attrs['_slot_elements'] = elements
+        return attrs
+
 
 @functools.total_ordering
 class ComplexType(six.with_metaclass(Complex_PythonType, Type)):
@@ -924,48 +1334,139 @@ class ComplexType(six.with_metaclass(Complex_PythonType, Type)):
     INDICATOR = Sequence  # Indicator see: class Indicators. To be defined in sub-type.
     INHERITANCE = None    # Type of inheritance see: class Inheritance, to be defined in sub-type.
     SCHEMA = None
+    # Use __slots__ instead of a __dict__ for instances of subclasses. This is
+    # only effective if all ComplexType base classes are compact as well.
+    COMPACT = False
+    # Keep a reference to the parsed XML element in parsed instances. Without
+    # it parsed objects do not keep the whole XML document alive. Set it on
+    # ComplexType to change the global default.
+    RETAIN_XMLELEMENT = True
+    # Parse fields only when they are accessed (see parse_xmlelement()).
+    LAZY = False
+    # Use generated parse and render functions (see xsd_compiler) instead of
+    # the generic code. Set it on ComplexType to change the global default.
+    COMPILED = False
+
+    __slots__ = ()
+
+    _validates_on_parse = True  # parse_xmlelement() returns an instance of this class
+    _requires_xmlelement = False  # always retain the XML element (overrides RETAIN_XMLELEMENT)
+    _lazy = None  # _LazyFields of lazily parsed instances
 
     def __new__(cls, *args, **kwargs):
-        instance = super(ComplexType, cls).__new__(cls)
+        instance = cls._allocate()
         for field in instance._meta.all:
-            setattr(instance, field._name, field.empty_value())
+            instance._init_field(field)
+        return instance
+
+    @classmethod
+    def _allocate(cls):
+        '''
+        Returns a new instance without any fields.
+        '''
+        instance = super(ComplexType, cls).__new__(cls)
+        if cls._meta.has_slots:
+            object.__setattr__(instance, '_lazy', None)
         return instance
 
+    def _init_field(self, field):
+        value = field.empty_value()
+        if value is not None:
+            value = field.accept(value)
+        object.__setattr__(self, field._name, value)
+
     def __init__(self, **kwargs):
         for key, value in kwargs.items():
             setattr(self, key, value)
 
+    @classmethod
+    def from_trusted(cls, **values):
+        '''
+        Creates an instance from values which are known to be valid (e.g.
+        values returned by the parser or taken from another instance).
+
+        Unlike the regular constructor this does not call accept() for the
+        values so they are neither converted nor validated. Use it only for
+        trusted input. Unknown field names are still rejected.
+        '''
+        instance = cls.__new__(cls)
+        fields_by_name = cls._meta.fields_by_name
+        for key, value in values.items():
+            if key not in fields_by_name:
+                raise ValueError("%s has no field '%s'" % (cls.__name__, key))
+            object.__setattr__(instance, key, value)
+        return instance
+
+    def __getattr__(self, name):
+        # Only called if the regular lookup failed, i.e. for the unset slots
+        # of lazily parsed compact instances.
+        if name in self._meta.fields_by_name and self._lazy is not None:
+            return self._load_field(name)
+        raise AttributeError("'%s' object has no attribute '%s'" % (self.__class__.__name__, name))
+
+    def _load_field(self, name):
+        '''
+        Parses a single field of a lazily parsed instance and caches its value.
+        '''
+        meta = self._meta
+        field = meta.fields_by_name[name]
+        lazy = self._lazy
+        xmlelement, options = lazy.xmlelement, lazy.options
+        self._init_field(field)
+        if lazy.selected is not None:
+            options = lazy.selected.get(name)
+            if options is None:
+                return getattr(self, name)
+        if isinstance(field, (Attribute, Ref)):
+            field.parse(self, name, xmlelement, **options)
+        elif meta.cls.INDICATOR == Choice:
+            if meta.fields_for_tag(xmlelement.tag)[:1] == (field, ):
+                field.parse(self, name, xmlelement, **options)
+        else:
+            for subelement in lazy.children(meta).get(name, ()):
+                field.parse(self, name, subelement, **options)
+        return getattr(self, name)
+
     def __setattr__(self, attr, value):
         if attr == '_xmlelement':
             super(ComplexType, self).__setattr__(attr, value)
         else:
-            try:
-                field = self._find_field(self._meta.all, attr)
-                super(ComplexType, self).__setattr__(attr, field.accept(value))
-            except IndexError:
-                raise AttributeError("Model '%s' doesn't have attribute '%s'." % (self.__class__.__name__, attr))
+            field = self._meta.fields_by_name.get(attr)
+            if field is None:
+                raise ValueError("%s has no field '%s'" % (self.__class__.__name__, attr))
+            super(ComplexType, self).__setattr__(attr, field.accept(value))
 
     def __str__(self):
         fields = {f._name: getattr(self, f._name, '<UNKNOWN FIELD>') for f in self._meta.fields}
         str_fields = ', '.join('%s=%s' % item for item in fields.items())
         return '<{class_name}: {fields}>'.format(class_name=self.__class__.__name__, fields=str_fields)
 
+    def _values(self):
+        return self._meta.values(self)
+
     def __hash__(self):
-        # FIXME: We should do this without the conversion back to XML.
-        return hash(etree.tostring(self._xmlelement)) if hasattr(self, '_xmlelement') else id(self)
+        '''
+        Hashes the values of all fields (not cached as nested values can be
+        modified in place), so an instance must not be modified once it is
+        used in a set or as a dict key.
+        '''
+        return hash((self.__class__, _hashable(self._values())))
 
     def __eq__(self, other):
-        # FIXME: We should do this without the conversion back to XML.
-        return hasattr(self, '_xmlelement') and hasattr(other, '_xmlelement') \
-            and etree.tostring(self._xmlelement) == etree.tostring(other._xmlelement)
+        if self is other:
+            return True
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return self._values() == other._values()
 
     def __lt__(self, other):
-        # FIXME: We should do this without the conversion back to XML.
-        return hasattr(self, '_xmlelement') and hasattr(other, '_xmlelement') \
-            and etree.tostring(self._xmlelement) < etree.tostring(other._xmlelement)
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return _sort_key(self._values()) < _sort_key(other._values())
 
     def __ne__(self, other):
-        return not self.__eq__(other)
+        result = self.__eq__(other)
+        return result if result is NotImplemented else not result
 
     def accept(self, value):
         '''
@@ -983,13 +1484,40 @@ class ComplexType(six.with_metaclass(Complex_PythonType, Type)):
             return None
         if self.SCHEMA:
             namespace = self.SCHEMA.targetNamespace
-        for field in instance._meta.all:
-            field.render(
-                parent=parent,
-                field_name=field.tagname or field._name,
-                value=getattr(instance, field._name),
-                namespace=namespace,
-                elementFormDefault=elementFormDefault)
+        meta = instance._meta
+        if meta.cls.COMPILED:
+            meta.compiled_renderer(namespace, elementFormDefault)(parent, instance)
+            return
+        for field_name, render_field in meta.render_plan(namespace, elementFormDefault):
+            render_field(parent, getattr(instance, field_name))
+
+    def _write(self, xf, tagname, instance, namespace, elementFormDefault):
+        '''
+        Writes the element for instance incrementally to xf, see
+        Element._write(). Types with a custom render() or with fields which
+        can not be written one by one are rendered as a whole.
+        '''
+        meta = instance._meta
+        if not meta.writable or _overrides(self, ComplexType, 'render'):
+            xmlelement = etree.Element(tagname)
+            self.render(xmlelement, instance, namespace, elementFormDefault)
+            _write_element(xf, xmlelement)
+            yield
+            return
+        if self.SCHEMA:
+            namespace = self.SCHEMA.targetNamespace
+        plan = list(zip(meta.all, meta.render_plan(namespace, elementFormDefault)))
+        attributes = etree.Element(tagname)
+        for field, (field_name, render) in plan:
+            if isinstance(field, Attribute):
+                render(attributes, getattr(instance, field_name))
+        with xf.element(tagname, attrib=dict(attributes.attrib)):
+            for field, (field_name, render) in plan:
+                if not isinstance(field, Attribute):
+                    writer = field._write(xf, field.tagname or field_name, getattr(instance, field_name), render,
+                                          namespace, elementFormDefault)
+                    for _ in writer:
+                        yield
 
     @classmethod
     def _find_field(cls, fields, name):
@@ -1031,65 +1559,195 @@ class ComplexType(six.with_metaclass(Complex_PythonType, Type)):
         return subelements
 
     @classmethod
-    def parse_xmlelement(cls, xmlelement):
-        instance = cls()
-        instance._xmlelement = xmlelement
-        for attribute in instance._meta.attributes:
-            attribute.parse(instance, attribute._name, xmlelement)
-
-        is_choice = (instance._meta.cls.INDICATOR == Choice)
-        for field in instance._meta.fields:
-            if is_choice:
-                if not cls._is_matching_element(field, xmlelement):
-                    continue
-                subelements = [xmlelement]
-            else:
-                subelements = cls._find_subelement(field, xmlelement)
-            for subelement in subelements:
-                field.parse(instance, field._name, subelement)
-            if is_choice:
-                break
-
-        for group in instance._meta.groups:
-            group.parse(instance, group._name, xmlelement)
+    def parse_xmlelement(cls, xmlelement, retain_xmlelement=None, lazy=None, only=None):
+        '''
+        :param retain_xmlelement: bool, keep a reference to the XML element in
+            ``_xmlelement`` of the new instance and of all nested instances.
+            If None (default) the RETAIN_XMLELEMENT setting of each class is
+            used. Classes which need their element (e.g. soap11.Body) always
+            retain it.
+        :param lazy: bool, parse each field of the new instance and of all
+            nested instances only when it is accessed for the first time.
+            Lazy instances keep a reference to their XML element and invalid
+            values are only detected on access. If None (default) the LAZY
+            setting of each class is used.
+        :param only: list of dotted field names (e.g. ['header.id',
+            'items.sku']), parse only these fields (and everything below
+            them). All other fields keep their empty value and the XML
+            subtrees for them are skipped.
+        '''
+        if cls.COMPILED and retain_xmlelement is None and lazy is None and only is None and not cls.LAZY:
+            parser = cls._meta.compiled_parser()
+            if parser is not None:
+                return parser(xmlelement)
+
+        options = {}
+        if retain_xmlelement is None:
+            retain_xmlelement = cls.RETAIN_XMLELEMENT
+        else:
+            options['retain_xmlelement'] = retain_xmlelement
+        retain_xmlelement = retain_xmlelement or cls._requires_xmlelement
+        if lazy is None:
+            lazy = cls.LAZY
+        else:
+            options['lazy'] = lazy
+        meta = cls._meta
+        # parse options for the selected fields (by name), None selects all
+        selected = None if only is None else meta.select_fields(only, options)
+
+        if lazy:
+            instance = cls._allocate()
+            object.__setattr__(instance, '_lazy', _LazyFields(xmlelement, options, selected))
+            if retain_xmlelement:
+                instance._xmlelement = xmlelement
+            return instance
+
+        instance = cls.from_trusted()
+        if retain_xmlelement:
+            instance._xmlelement = xmlelement
+        for attribute in meta.attributes:
+            if selected is None or attribute._name in selected:
+                attribute.parse(instance, attribute._name, xmlelement)
+
+        if meta.cls.INDICATOR == Choice:
+            fields = meta.fields_for_tag(xmlelement.tag)
+            if fields and (selected is None or fields[0]._name in selected):
+                field_options = options if selected is None else selected[fields[0]._name]
+                fields[0].parse(instance, fields[0]._name, xmlelement, **field_options)
+        elif selected is None:
+            for subelement in xmlelement:
+                for field in meta.fields_for_tag(subelement.tag):
+                    field.parse(instance, field._name, subelement, **options)
+        else:
+            for subelement in xmlelement:
+                for field in meta.fields_for_tag(subelement.tag):
+                    field_options = selected.get(field._name)
+                    if field_options is not None:
+                        field.parse(instance, field._name, subelement, **field_options)
+
+        for group in meta.groups:
+            if selected is None:
+                group.parse(instance, group._name, xmlelement, **options)
+            elif group._name in selected:
+                group.parse(instance, group._name, xmlelement, **selected[group._name])
 
         return instance
 
     @classmethod
     def __parse_with_validation(cls, xml, schema):
-        from .py2xsd import generate_xsd
-        schema = generate_xsd(schema)
-        schemaelement = etree.XMLSchema(schema)
+        from .py2xsd import get_xml_schema
+        schemaelement = get_xml_schema(schema)
         if isinstance(xml, six.string_types):
-            parser = etree.XMLParser(schema=schemaelement)
-            xmlelement = etree.fromstring(xml, parser)
+            xmlelement = DEFAULT_PARSER_CONFIG.fromstring(xml, schemaelement)
         else:
             schemaelement.assertValid(xml)
             xmlelement = xml
         return xmlelement
 
     @classmethod
-    def parsexml(cls, xml, schema=None):
-        if schema is None:
-            parser = etree.fromstring
-        else:
-            if not isinstance(schema, etree.XMLSchema):
-                from .py2xsd import generate_xsd
-                schema = etree.XMLSchema(generate_xsd(schema))
-            xmlparser = etree.XMLParser(schema=schema)
-            parser = functools.partial(etree.fromstring, parser=xmlparser)
-        xmlelement = parser(xml)
-        return cls.parse_xmlelement(xmlelement)
-
-    def xml(self, tagname, namespace=None, elementFormDefault=None, schema=None, pretty_print=True):
+    def parsexml(cls, xml, schema=None, retain_xmlelement=None, lazy=None, only=None, parser_config=None):
+        '''
+        Parses the XML string. schema can be an etree.XMLSchema or a soapfish
+        Schema (compiled once, see py2xsd.get_xml_schema()) to validate the
+        document. parser_config (utils.XMLParserConfig) defines the options of
+        the lxml parser, by default utils.DEFAULT_PARSER_CONFIG.
+        '''
+        if schema is not None and not isinstance(schema, etree.XMLSchema):
+            from .py2xsd import get_xml_schema
+            schema = get_xml_schema(schema)
+        if parser_config is None:
+            parser_config = DEFAULT_PARSER_CONFIG
+        xmlelement = parser_config.fromstring(xml, schema)
+        return cls.parse_xmlelement(xmlelement, retain_xmlelement=retain_xmlelement, lazy=lazy, only=only)
+
+    @classmethod
+    def iterparse(cls, source, path, ancestors=(), parser_config=None):
+        '''
+        Parses the items of a (nested) field incrementally and yields them one
+        at a time. Processed elements are cleared so the memory usage does not
+        depend on the size of the document. Only the items are returned, all
+        other fields of the document are skipped.
+
+        Items never retain their XML element (see ``RETAIN_XMLELEMENT``).
+
+        :param source: filename or file-like object (e.g. a streamed HTTP
+            response body).
+        :param path: str, dotted field names from this class to the field
+            whose items are returned, e.g. 'items' or 'order.items'.
+        :param ancestors: local names of the elements enclosing the element of
+            this class, e.g. ('Envelope', 'Body') for a SOAP message.
+        :param parser_config: utils.XMLParserConfig with the parser options.
+        '''
+        tags, field = cls._iterparse_path(path, ancestors)
+        return _iterparse(source, tags, field, parser_config or DEFAULT_PARSER_CONFIG)
+
+    @classmethod
+    def _iterparse_path(cls, path, ancestors=()):
+        '''
+        Returns the local names of the elements down to the items and the
+        field of the items for iterparse(), raises ValueError if the path is
+        invalid.
+        '''
+        tags = list(ancestors) + [None]
+        klass, field = cls, None
+        for name in path.split('.'):
+            if klass is None:
+                type_name = field._type.__class__.__name__
+                raise ValueError("%s is not a complex type, invalid path '%s'" % (type_name, path))
+            field = klass._meta.fields_by_name.get(name)
+            if field is None or isinstance(field, Attribute):
+                raise ValueError("%s has no element '%s'" % (klass.__name__, name))
+            field._evaluate_type()
+            if not isinstance(field, Ref):
+                tags.append(field.tagname or field._name)
+            klass = field._type.__class__ if isinstance(field._type, ComplexType) else None
+        return tags, field
+
+    def xml(self, tagname, namespace=None, elementFormDefault=None, schema=None, pretty_print=True, direct=False):
+        '''
+        Renders this object as XML element with the given tag name. If direct
+        is True (and no schema is given) the XML is written directly to bytes
+        without building an lxml element tree (see xsd_serializer), the output
+        is the same. schema (etree.XMLSchema or soapfish Schema) is used to
+        validate the rendered element.
+        '''
+        if direct and schema is None:
+            from .xsd_serializer import tostring
+            xml = tostring(self, tagname, namespace, elementFormDefault, pretty_print=pretty_print)
+            if xml is not None:
+                return xml
         if namespace:
             tagname = '{%s}%s' % (namespace, tagname)
         xmlelement = etree.Element(tagname)
         self.render(xmlelement, self, namespace, elementFormDefault)
         if schema is not None:
+            if not isinstance(schema, etree.XMLSchema):
+                from .py2xsd import get_xml_schema
+                schema = get_xml_schema(schema)
             schema.assertValid(xmlelement)
         return etree.tostring(xmlelement, pretty_print=pretty_print)
 
+    def write_xml(self, output, tagname, namespace=None, elementFormDefault=None):
+        '''
+        Writes the XML for this object incrementally to output (filename or
+        file-like object) without building the complete XML tree first.
+        '''
+        if namespace:
+            tagname = '{%s}%s' % (namespace, tagname)
+        with etree.xmlfile(output) as xf:
+            for _ in self._write(xf, tagname, self, namespace, elementFormDefault):
+                pass
+
+    def xml_chunks(self, tagname, namespace=None, elementFormDefault=None, chunk_size=XML_CHUNK_SIZE):
+        '''
+        Returns an iterator over the XML for this object (like xml() without
+        pretty printing) in chunks of about chunk_size bytes. The XML is
+        rendered while the chunks are consumed.
+        '''
+        if namespace:
+            tagname = '{%s}%s' % (namespace, tagname)
+        return _xml_chunks(lambda xf: self._write(xf, tagname, self, namespace, elementFormDefault), chunk_size)
+
     @classmethod
     def _force_elements_type_evalution(cls):
         '''
@@ -1100,6 +1758,79 @@ class ComplexType(six.with_metaclass(Complex_PythonType, Type)):
             element._evaluate_type()
 
 
+def _iterparse(source, tags, field, parser_config):
+    '''
+    Yields the values of field for all elements whose ancestors match the
+    local names in tags (None matches any name), see ComplexType.iterparse().
+    '''
+    options = {'retain_xmlelement': False, 'lazy': False}  # elements are cleared
+    depth = matched = 0  # depth of the current element, number of matched ancestors
+    for event, xmlelement in parser_config.iterparse(source, events=('start', 'end')):
+        if event == 'start':
+            if matched == depth and matched < len(tags):
+                tag = tags[matched]
+                if tag is None or tag == xmlelement.tag.rsplit('}', 1)[-1]:
+                    matched += 1
+            depth += 1
+            continue
+
+        depth -= 1
+        if matched == len(tags) and depth == matched - 1:
+            if xmlelement.get(XSI_NIL) == 'true':
+                if not field.nillable:
+                    raise ValueError('Nil value for not nillable element.')
+                value = NIL
+            else:
+                value = field._parse_xmlelement(xmlelement, options)
+                if not field._type._validates_on_parse:
+                    value = field._type.accept(value)
+            yield value
+        elif matched == len(tags) and depth >= matched:
+            continue  # still needed to parse the current item
+        # Drop the element and its already processed siblings.
+        xmlelement.clear()
+        parent = xmlelement.getparent()
+        if parent is not None:
+            while xmlelement.getprevious() is not None:
+                del parent[0]
+        matched = min(matched, depth)
+
+
+class _LazyFields(object):
+    '''
+    XML element and parse options of a lazily parsed ComplexType instance.
+    '''
+    __slots__ = ('xmlelement', 'options', 'selected', '_children')
+
+    def __init__(self, xmlelement, options, selected=None):
+        self.xmlelement = xmlelement
+        self.options = options
+        self.selected = selected  # see ComplexTypeMetaInfo.select_fields()
+        self._children = None
+
+    def children(self, meta):
+        '''
+        Returns the child elements of the XML element grouped by field name.
+        '''
+        if self._children is None:
+            children = {}
+            for subelement in self.xmlelement:
+                for field in meta.fields_for_tag(subelement.tag):
+                    children.setdefault(field._name, []).append(subelement)
+            self._children = children
+        return self._children
+
+
+def _set_trusted(instance, name, value):
+    '''
+    Assigns a value without passing it through accept() again.
+    '''
+    if isinstance(instance, ComplexType):
+        object.__setattr__(instance, name, value)
+    else:
+        setattr(instance, name, value)
+
+
 class Group(ComplexType):
     '''
     Parent object for XSD Groups. Marker. Must be used with Ref.
@@ -1140,7 +1871,7 @@ class Document(ComplexType):
     @classmethod
     def parsexml(cls, xml):
         field = cls._meta.fields[0]  # The only field.
-        xmlelement = etree.fromstring(xml)
+        xmlelement = DEFAULT_PARSER_CONFIG.fromstring(xml)
         field.parse(cls, field._name, xmlelement)
 
 
@@ -11,10 +11,10 @@ import os
 import sys
 
 import six
-from lxml import etree
 
 from . import xsdspec
 from .utils import (
+    GENERATOR_PARSER_CONFIG,
     find_xsd_namespaces,
     get_rendering_environment,
     open_document,
@@ -62,7 +62,7 @@ def generate_code_from_xsd(xml, known_paths=None, known_types=None,
                            standalone=True):
 
     if isinstance(xml, six.binary_type):
-        xml = etree.fromstring(xml)
+        xml = GENERATOR_PARSER_CONFIG.fromstring(xml)
 
     if cwd is None:
         cwd = six.moves.getcwd()
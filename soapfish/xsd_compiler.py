@@ -0,0 +1,297 @@
+# -*- coding: utf-8 -*-
+'''
+Generates specialised parse and render functions for ComplexType classes.
+
+The generic ComplexType.parse_xmlelement() and render() look up the type,
+the tag name and the NIL handling of every field for every XML element. The
+functions generated here contain one straight-line block of code per field
+with all of this resolved in advance. They are used for classes with
+``COMPILED = True`` (see xsd.ComplexType).
+
+Classes with features the generator does not know (e.g. Choice indicators or
+custom Element subclasses) are not compiled and use the generic code.
+'''
+
+from __future__ import absolute_import
+
+import keyword
+import re
+
+import six
+from lxml import etree
+
+from . import xsd
+
+__all__ = ['compile_parser', 'compile_renderer']
+
+_IDENTIFIER = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+
+
+def _is_exactly(field, cls, *methods):
+    '''
+    Returns True if field is an instance of cls (or of a subclass which does
+    not override any of the given methods).
+    '''
+    if not isinstance(field, cls):
+        return False
+    return not any(xsd._overrides(field, cls, method) for method in methods)
+
+
+def _renders_text(type_):
+    return isinstance(type_, xsd.SimpleType) and not xsd._overrides(type_, xsd.SimpleType, 'render')
+
+
+class _Source(object):
+
+    def __init__(self):
+        self.lines = []
+        self.indent = 0
+
+    def add(self, line, *args):
+        self.lines.append('    ' * self.indent + (line % args if args else line))
+
+    def __str__(self):
+        return '\n'.join(self.lines) + '\n'
+
+
+def _get(name):
+    '''
+    Returns the source for reading the attribute name of instance.
+    '''
+    if _IDENTIFIER.match(name) and not keyword.iskeyword(name):
+        return 'instance.' + name
+    return 'getattr(instance, %r)' % name
+
+
+def _build(source, namespace, name):
+    '''
+    Returns the function name defined by source. The values of namespace
+    are bound as closure variables, which are faster to look up than the
+    globals of the generated module.
+    '''
+    factory = _Source()
+    factory.add('def factory(namespace):')
+    factory.indent += 1
+    for key in sorted(namespace):
+        factory.add('%s = namespace[%r]', key, key)
+    factory.lines.extend('    ' + line for line in source.lines)
+    factory.add('return %s', name)
+    scope = {}
+    six.exec_(str(factory), scope)
+    return scope['factory'](namespace)
+
+
+def compile_parser(cls):
+    '''
+    Returns a function ``parse(xmlelement)`` which does the same as
+    ``cls.parse_xmlelement(xmlelement)`` (without parse options) or None if
+    the class can not be compiled.
+    '''
+    meta = cls._meta
+    if cls.INDICATOR == xsd.Choice or cls.__new__ is not xsd.ComplexType.__new__:
+        return None
+    if any(len(fields) > 1 for fields in meta.fields_by_tagname.values()):
+        return None
+    for field in meta.attributes:
+        if not _is_exactly(field, xsd.Attribute, 'parse', 'accept'):
+            return None
+    for field in meta.fields:
+        if type(field) not in (xsd.Element, xsd.ListElement):
+            return None
+    for field in meta.all:
+        field._evaluate_type()
+
+    namespace = {
+        'cls': cls,
+        'NIL': xsd.NIL,
+        'XSI_NIL': xsd.XSI_NIL,
+        'MAX_CACHED_TAGS': xsd.MAX_CACHED_TAGS,
+        'TypedList': xsd.TypedList,
+        'fields_for_tag': meta.fields_for_tag,
+        'object_new': object.__new__,
+        'object_setattr': object.__setattr__,
+        'list_extend': list.extend,
+        'tag_index': {},
+    }
+    index = {}
+    src = _Source()
+    src.add('def parse(xmlelement):')
+    src.indent += 1
+    src.add('instance = object_new(cls)')
+
+    # attributes
+    for k, field in enumerate(meta.attributes):
+        namespace['fa%d' % k] = field
+        namespace['pa%d' % k] = field._type.pythonvalue
+        namespace['default%d' % k] = field.default
+        src.add('a%d = pa%d(xmlelement.get(%r, default%d))', k, k, field._name, k)
+        if not field._type._validates_on_parse:
+            src.add('a%d = fa%d.accept(a%d)', k, k, k)
+
+    # child elements
+    for k, field in enumerate(meta.fields):
+        index[field] = k
+        namespace['f%d' % k] = field
+        namespace['p%d' % k] = field._type.parse_xmlelement
+        namespace['ta%d' % k] = field._type.accept
+        namespace['max%d' % k] = getattr(field, '_maxOccurs', None)
+        if isinstance(field, xsd.ListElement):
+            src.add('v%d = []', k)
+        elif field.default is None:
+            src.add('v%d = None', k)
+        else:
+            src.add('v%d = f%d.accept(f%d.default)', k, k, k)
+    namespace['index_for'] = lambda fields: index[fields[0]] if fields else -1
+
+    if meta.fields:
+        src.add('for sub in xmlelement:')
+        src.indent += 1
+        src.add('i = tag_index.get(sub.tag)')
+        src.add('if i is None:')
+        src.add('    i = index_for(fields_for_tag(sub.tag))')
+        src.add('    if len(tag_index) < MAX_CACHED_TAGS:')
+        src.add('        tag_index[sub.tag] = i')
+        src.add('if i < 0:')
+        src.add('    continue')
+        _dispatch(src, list(enumerate(meta.fields)))
+        src.indent -= 1
+
+    # store the values
+    for k, field in enumerate(meta.fields):
+        if isinstance(field, xsd.ListElement):
+            src.add('items = v%d', k)
+            src.add('v%d = TypedList(f%d)', k, k)
+            src.add('list_extend(v%d, items)', k)
+    if meta.has_slots:
+        store = 'object_setattr(instance, %r, %s)'
+        src.add(store, '_lazy', None)
+    else:
+        store = 'values[%r] = %s'
+        src.add('values = instance.__dict__')
+    for k, field in enumerate(meta.attributes):
+        src.add(store, field._name, 'a%d' % k)
+    for k, field in enumerate(meta.fields):
+        src.add(store, field._name, 'v%d' % k)
+    for k, field in enumerate(meta.groups):
+        namespace['g%d' % k] = field
+        src.add('g%d.parse(instance, %r, xmlelement)', k, field._name)
+    src.add('if cls.RETAIN_XMLELEMENT or cls._requires_xmlelement:')
+    src.add('    ' + store, '_xmlelement', 'xmlelement')
+    src.add('return instance')
+    return _build(src, namespace, 'parse')
+
+
+def _dispatch(src, fields):
+    '''
+    Adds a binary search over the field index i with the parse code of each
+    field.
+    '''
+    if len(fields) == 1:
+        k, field = fields[0]
+        _parse_field(src, k, field)
+        return
+    middle = len(fields) // 2
+    src.add('if i < %d:', fields[middle][0])
+    src.indent += 1
+    _dispatch(src, fields[:middle])
+    src.indent -= 1
+    src.add('else:')
+    src.indent += 1
+    _dispatch(src, fields[middle:])
+    src.indent -= 1
+
+
+def _parse_field(src, k, field):
+    validates = field._type._validates_on_parse
+    if isinstance(field, xsd.ListElement):
+        src.add('if sub.get(XSI_NIL):')
+        if field.nillable:
+            src.add('    v%d.append(NIL)', k)
+        else:
+            src.add("    raise ValueError('Nil value in not nillable list.')")
+        src.add('else:')
+        if validates:
+            src.add('    v%d.append(p%d(sub))', k, k)
+        else:
+            src.add('    v%d.append(ta%d(p%d(sub)))', k, k, k)
+        if field._maxOccurs not in (None, xsd.UNBOUNDED):
+            src.add('if len(v%d) > max%d:', k, k)
+            src.add("    raise ValueError('You must not add more than %%s items to this list.' %% max%d)", k)
+        return
+    src.add("if sub.get(XSI_NIL) == 'true':")
+    src.add('    v%d = f%d.accept(NIL)', k, k)
+    src.add('else:')
+    if validates:
+        src.add('    v%d = p%d(sub)', k, k)
+    else:
+        src.add('    v%d = ta%d(p%d(sub))', k, k, k)
+
+
+def compile_renderer(cls, namespace, elementFormDefault):
+    '''
+    Returns a function ``render(parent, instance)`` which does the same as
+    the generic ComplexType.render() for the given namespace (after applying
+    the SCHEMA of the type) and elementFormDefault.
+    '''
+    meta = cls._meta
+    plan = meta.render_plan(namespace, elementFormDefault)
+    names = {
+        'NIL': xsd.NIL,
+        'XSI_NIL': xsd.XSI_NIL,
+        'SubElement': etree.SubElement,
+    }
+    src = _Source()
+    src.add('def render(parent, instance):')
+    src.indent += 1
+    for k, (field, (_, renderer)) in enumerate(zip(meta.all, plan)):
+        field._evaluate_type()
+        field_name = field.tagname or field._name
+        src.add('v = %s', _get(field._name))
+        names['rp%d' % k] = renderer
+        if isinstance(field, xsd.Attribute):
+            if not _is_exactly(field, xsd.Attribute, 'render'):
+                src.add('rp%d(parent, v)', k)
+                continue
+            src.add('if v is None:')
+            if field._minOccurs:
+                src.add("    raise ValueError('Value None is not acceptable for required field.')")
+            else:
+                src.add('    pass')
+            src.add('elif v is NIL:')
+            if field.nillable:
+                src.add('    parent.set(%r, %r)', field_name, 'nil')
+            else:
+                src.add("    raise ValueError('Nil value for not nillable Attribute.')")
+            src.add('else:')
+            names['xv%d' % k] = field._type.xmlvalue
+            src.add('    parent.set(%r, xv%d(v))', field_name, k)
+        elif type(field) is xsd.Element or (type(field) is xsd.ListElement and not
+                                            xsd._overrides(field, xsd.ListElement, 'render')):
+            is_list = isinstance(field, xsd.ListElement)
+            tagname, type_namespace = field._qualify(field.tagname if is_list else field_name,
+                                                     namespace, elementFormDefault)
+            names['ns%d' % k] = type_namespace
+            if is_list:
+                names['check_length%d' % k] = field._check_length
+                src.add('check_length%d(%r, v)', k, field_name)
+                src.add('for item in v:')
+                value = 'item'
+            else:
+                src.add('if v is not None:')
+                value = 'v'
+            src.indent += 1
+            src.add('e = SubElement(parent, %r)', tagname)
+            src.add('if %s is NIL:', value)
+            src.add('    e.set(XSI_NIL, %r)', 'true')
+            src.add('else:')
+            if _renders_text(field._type):
+                names['xv%d' % k] = field._type.xmlvalue
+                src.add('    e.text = xv%d(%s)', k, value)
+            else:
+                names['r%d' % k] = field._type.render
+                src.add('    r%d(e, %s, ns%d, %r)', k, value, k, elementFormDefault)
+            src.indent -= 1
+        else:
+            src.add('rp%d(parent, v)', k)
+    src.add('return None')
+    return _build(src, names, 'render')
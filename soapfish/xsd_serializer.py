@@ -0,0 +1,342 @@
+# -*- coding: utf-8 -*-
+'''
+Serializes ComplexType instances directly to bytes.
+
+ComplexType.xml() renders an lxml element tree and serializes it with
+etree.tostring(). The serializer here walks the same fields (in the same
+order and with the same namespace rules) but writes the escaped XML text
+directly, without creating any lxml elements. The output is the same as the
+one of xml(), including the namespace declarations which lxml adds when the
+rendered elements are appended to their parents:
+
+- each element declares the namespace of its tag unless the (default) lxml
+  prefix for the namespace is already bound to it by an ancestor
+- xsi:nil attributes declare the xsi prefix on the element itself
+
+Types and fields with a custom render() method are not supported. In this
+case (and for all errors) tostring() returns None and the caller renders the
+XML with lxml instead, so the errors are reported in the same way.
+'''
+
+from __future__ import absolute_import
+
+import re
+import sys
+from collections import OrderedDict
+
+import six
+from lxml import etree
+
+from . import namespaces as ns, xsd
+
+__all__ = ['tostring']
+
+_NAME = re.compile(r'^[A-Za-z_][A-Za-z0-9_.-]*$')
+_INVALID = u'\x00-\x08\x0b\x0c\x0e-\x1f' + (u'\ud800-\udfff' if sys.maxunicode > 0xffff else u'')
+_INVALID_CHARS = re.compile(u'[%s]' % _INVALID)
+# characters which must be escaped (or are not allowed at all)
+_TEXT_SPECIAL = re.compile(u'[&<>\r%s]' % _INVALID)
+_ATTRIBUTE_SPECIAL = re.compile(u'[&<>"\r\n\t%s]' % _INVALID)
+_INDENT = '  '
+_XSI_DECLARATION = ' xmlns:xsi="%s"' % ns.xsi
+
+
+class _Unsupported(Exception):
+    pass
+
+
+def _unbound(cls, name='render'):
+    return six.get_unbound_function(getattr(cls, name))
+
+
+_ELEMENT = _unbound(xsd.Element)
+_LIST = _unbound(xsd.ListElement)
+_ATTRIBUTE = _unbound(xsd.Attribute)
+_REF = _unbound(xsd.Ref)
+_CLASS_NAMED = _unbound(xsd.ClassNamedElement)
+_SIMPLE = _unbound(xsd.SimpleType)
+_COMPLEX = _unbound(xsd.ComplexType)
+
+
+def _strips_nested_declarations():
+    '''
+    Returns True if lxml removes redundant namespace declarations in the
+    whole subtree when an element is appended (and not only from the
+    appended element itself). The serializer produces the same output as
+    lxml only in this case.
+    '''
+    root = etree.Element('{urn:test}root')
+    child = etree.Element('child')
+    child.append(etree.Element('{urn:test}grandchild'))
+    root.append(child)
+    return etree.tostring(root).count(b'xmlns') == 1
+
+
+_SUPPORTED = _strips_nested_declarations()
+_names = {}
+
+
+def _name(tag):
+    '''
+    Returns (namespace, prefix, start, declaring start, end tag) for a tag in
+    Clark notation, the declaring start also declares the namespace.
+    '''
+    try:
+        return _names[tag]
+    except KeyError:
+        pass
+    namespace, name = None, tag
+    if tag.startswith('{'):
+        namespace, _, name = tag[1:].partition('}')
+    if not _NAME.match(name) or namespace == ns.xml:
+        raise _Unsupported()
+    if not namespace:
+        result = (None, None, '<' + name, None, '</%s>' % name)
+    else:
+        # the prefix lxml uses for new elements in this namespace
+        prefix = etree.Element(tag).prefix
+        qname = '%s:%s' % (prefix, name)
+        declaration = '<%s xmlns:%s="%s"' % (qname, prefix, _escape_attribute(namespace))
+        result = (namespace, prefix, '<' + qname, declaration, '</%s>' % qname)
+    if len(_names) < xsd.MAX_CACHED_TAGS:
+        _names[tag] = result
+    return result
+
+
+def _text(value):
+    if isinstance(value, six.binary_type):
+        try:
+            value = value.decode('ascii')
+        except UnicodeDecodeError:
+            raise _Unsupported()
+    elif not isinstance(value, six.text_type):
+        raise _Unsupported()
+    if _INVALID_CHARS.search(value):
+        raise _Unsupported()
+    return value
+
+
+def _escape_text(value):
+    if type(value) is not six.text_type or _TEXT_SPECIAL.search(value):
+        value = _text(value)
+        value = value.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;').replace('\r', '&#13;')
+    return value
+
+
+def _escape_attribute(value):
+    if type(value) is not six.text_type or _ATTRIBUTE_SPECIAL.search(value):
+        value = _text(value)
+        value = value.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;').replace('"', '&quot;')
+        value = value.replace('\r', '&#13;').replace('\n', '&#10;').replace('\t', '&#9;')
+    return value
+
+
+_ELEMENT_FIELD, _LIST_FIELD, _REF_FIELD, _CLASS_NAMED_FIELD = range(4)
+
+
+def _build_plan(meta, namespace, elementFormDefault):
+    '''
+    Returns the attributes and the child elements of the class as
+    (attributes, children) with everything which does not depend on the
+    values resolved (see _Serializer.attributes() and children()).
+    '''
+    attributes, children = [], []
+    for field in meta.all:
+        render = _unbound(field.__class__)
+        field_name = field.tagname or field._name
+        if render is _ATTRIBUTE:
+            field._evaluate_type()
+            if not _NAME.match(field_name):
+                raise _Unsupported()
+            attributes.append((field, field_name))
+        elif render is _REF:
+            attributes.append((field, None))
+            tag = '{%s}%s' % (namespace, field_name) if namespace else field_name
+            children.append((_REF_FIELD, field, _name(tag), namespace, None))
+        elif render is _ELEMENT or render is _LIST:
+            field._evaluate_type()
+            if render is _ELEMENT:
+                kind = _ELEMENT_FIELD
+                tag, type_namespace = field._qualify(field_name, namespace, elementFormDefault)
+            else:
+                kind = _LIST_FIELD
+                tag, type_namespace = field._qualify(field.tagname, namespace, elementFormDefault)
+            type_render = _unbound(field._type.__class__)
+            xmlvalue = field._type.xmlvalue if type_render is _SIMPLE else None
+            children.append((kind, field, _name(tag), type_namespace, xmlvalue))
+        elif render is _CLASS_NAMED:
+            children.append((_CLASS_NAMED_FIELD, field, None, None, None))
+        else:
+            raise _Unsupported()
+    return tuple(attributes), tuple(children)
+
+
+def _plan(meta, namespace, elementFormDefault):
+    key = (namespace, elementFormDefault)
+    try:
+        plan = meta._serializer_plans[key]
+    except KeyError:
+        try:
+            plan = _build_plan(meta, namespace, elementFormDefault)
+        except _Unsupported:
+            plan = None
+        meta._serializer_plans[key] = plan
+    if plan is None:
+        raise _Unsupported()
+    return plan
+
+
+class _Serializer(object):
+
+    def __init__(self, pretty_print):
+        self.parts = []
+        self.pretty_print = pretty_print
+
+    def start(self, name, scope, indent):
+        '''
+        Writes the start tag (without the closing bracket) and returns the
+        namespace scope for the content of the element.
+        '''
+        namespace, prefix, start, declaring_start, _ = name
+        if namespace is None or scope.get(prefix) == namespace:
+            self.parts.append(indent + start)
+        else:
+            scope = dict(scope)
+            scope[prefix] = namespace
+            self.parts.append(indent + declaring_start)
+        return scope
+
+    def nil(self, name, scope, indent):
+        scope = self.start(name, scope, indent)
+        if scope.get('xsi') != ns.xsi:
+            self.parts.append(_XSI_DECLARATION)
+        self.parts.append(' xsi:nil="true"/>')
+
+    def element(self, name, scope, indent, type_, value, namespace, elementFormDefault):
+        '''
+        Writes an element with value rendered by type_ (like the render()
+        method of simple and complex types does).
+        '''
+        render = _unbound(type_.__class__)
+        if render is _SIMPLE:
+            self.simple(name, scope, indent, type_.xmlvalue(value))
+        elif render is _COMPLEX:
+            self.complex(name, scope, indent, type_, value, namespace, elementFormDefault)
+        else:
+            raise _Unsupported()
+
+    def simple(self, name, scope, indent, text):
+        self.start(name, scope, indent)
+        if text is None:
+            self.parts.append('/>')
+        else:
+            self.parts.append('>' + _escape_text(text) + name[4])
+
+    def complex(self, name, scope, indent, type_, instance, namespace, elementFormDefault):
+        if type_.SCHEMA:
+            namespace = type_.SCHEMA.targetNamespace
+        attributes, children = _plan(instance._meta, namespace, elementFormDefault)
+        scope = self.start(name, scope, indent)
+        parts = self.parts
+        if attributes:
+            values = OrderedDict()
+            self.attributes(values, attributes, instance, namespace, elementFormDefault)
+            for attribute, value in values.items():
+                parts.append(' %s="%s"' % (attribute, _escape_attribute(value)))
+        parts.append('>')
+        start = len(parts)
+        child_indent = indent + _INDENT if self.pretty_print else indent
+        self.children(children, instance, namespace, elementFormDefault, scope, child_indent)
+        if len(parts) == start:
+            parts[-1] = '/>'
+        else:
+            parts.append(indent + name[4])
+
+    def attributes(self, values, attributes, instance, namespace, elementFormDefault):
+        '''
+        Collects the attribute values of instance like ComplexType.render()
+        (and Ref.render() for groups) would set them.
+        '''
+        for field, attribute in attributes:
+            value = getattr(instance, field._name)
+            if attribute is None:
+                # Ref field
+                if value is None:
+                    raise _Unsupported()
+                if isinstance(value, xsd.Group):
+                    if _unbound(field._type.__class__) is not _COMPLEX:
+                        raise _Unsupported()
+                    group_attributes, _ = _plan(value._meta, namespace, elementFormDefault)
+                    self.attributes(values, group_attributes, value, namespace, elementFormDefault)
+            elif value is None:
+                if field._minOccurs:
+                    raise _Unsupported()
+            elif value is xsd.NIL:
+                if not field.nillable:
+                    raise _Unsupported()
+                values[attribute] = 'nil'
+            else:
+                values[attribute] = field._type.xmlvalue(value)
+
+    def children(self, children, instance, namespace, elementFormDefault, scope, indent):
+        '''
+        Writes the child elements of instance like ComplexType.render() would
+        append them.
+        '''
+        for kind, field, name, type_namespace, xmlvalue in children:
+            value = getattr(instance, field._name)
+            if kind is _ELEMENT_FIELD:
+                if value is None:
+                    continue
+                elif value is xsd.NIL:
+                    self.nil(name, scope, indent)
+                elif xmlvalue is not None:
+                    self.simple(name, scope, indent, xmlvalue(value))
+                else:
+                    self.element(name, scope, indent, field._type, value, type_namespace, elementFormDefault)
+            elif kind is _LIST_FIELD:
+                field._check_length(field.tagname or field._name, value)
+                for item in value:
+                    if item is xsd.NIL:
+                        self.nil(name, scope, indent)
+                    elif xmlvalue is not None:
+                        self.simple(name, scope, indent, xmlvalue(item))
+                    else:
+                        self.element(name, scope, indent, field._type, item, type_namespace, elementFormDefault)
+            elif kind is _REF_FIELD:
+                if isinstance(value, xsd.Group):
+                    _, group_children = _plan(value._meta, namespace, elementFormDefault)
+                    self.children(group_children, value, namespace, elementFormDefault, scope, indent)
+                else:
+                    self.element(name, scope, indent, field._type, value, namespace, elementFormDefault)
+            elif value is not None and value.value is not None:
+                # ClassNamedElement
+                value, tagname = value.value, value.name
+                type_namespace = value.SCHEMA.targetNamespace
+                tag = '{%s}%s' % (type_namespace, tagname) if type_namespace else tagname
+                self.element(_name(tag), scope, indent, field._type, value, type_namespace,
+                             value.SCHEMA.elementFormDefault)
+
+
+def tostring(instance, tagname, namespace=None, elementFormDefault=None, pretty_print=True):
+    '''
+    Returns the same bytes as ``instance.xml(tagname, namespace,
+    elementFormDefault, pretty_print=pretty_print)`` or None if the instance
+    can not be serialized directly.
+    '''
+    if not _SUPPORTED or _unbound(instance.__class__) is not _COMPLEX:
+        return None
+    if namespace:
+        tagname = '{%s}%s' % (namespace, tagname)
+    serializer = _Serializer(pretty_print)
+    try:
+        serializer.complex(_name(tagname), {}, '\n' if pretty_print else '', instance, instance, namespace,
+                           elementFormDefault)
+    except Exception:
+        return None
+    parts = serializer.parts
+    if pretty_print:
+        # no line break before the root element but after it
+        parts[0] = parts[0][1:]
+        parts.append('\n')
+    return ''.join(parts).encode('ascii', 'xmlcharrefreplace')
@@ -0,0 +1,278 @@
+# -*- coding: utf-8 -*-
+# Python 3.5+ only (asyncio, async def), collected by aio_test.py
+
+from __future__ import absolute_import, unicode_literals
+
+import asyncio
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from pythonic_testcase import PythonicTestCase, assert_equals, assert_none, assert_raises, assert_true
+
+from soapfish import compression, soap11, xsd
+from soapfish.aio import AsgiSoapApplication, AsyncHttpTransport, AsyncStub
+from soapfish.core import SOAPError, SOAPResponse
+from soapfish.middlewares import ExceptionToSoapFault
+from soapfish.soap_dispatch import SOAPDispatcher
+from soapfish.testutil import echo_service
+from soapfish.testutil.aio import serve_asgi
+from soapfish.testutil.echo_service import EchoType
+
+ECHO_MESSAGE = (
+    b'<senv:Envelope xmlns:senv="http://schemas.xmlsoap.org/soap/envelope/">'
+    b'<senv:Body><ns1:echoRequest xmlns:ns1="http://soap.example/echo/types">'
+    b'<value>foobar</value>'
+    b'</ns1:echoRequest></senv:Body></senv:Envelope>'
+)
+
+
+async def _request(app, body=ECHO_MESSAGE, method='POST', query_string=b'', headers=()):
+    scope = {
+        'type': 'http',
+        'method': method,
+        'path': '/service',
+        'query_string': query_string,
+        'headers': [(b'soapaction', b'echo'), (b'host', b'soap.example')] + list(headers),
+    }
+    # the body is received in two chunks
+    messages = [{'type': 'http.request', 'body': body[:10], 'more_body': True},
+                {'type': 'http.request', 'body': body[10:]}]
+    sent = []
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message)
+    await app(scope, receive, send)
+    start = sent[0]
+    assert_equals('http.response.start', start['type'])
+    headers = dict((k.decode('latin-1'), v.decode('latin-1')) for k, v in start['headers'])
+    return start['status'], headers, b''.join(message.get('body', b'') for message in sent[1:])
+
+
+def _run(coroutine):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+class AsgiSoapApplicationTest(PythonicTestCase):
+    def _echo_value(self, content):
+        return soap11.Envelope.parsexml(content).Body.parse_as(EchoType).value
+
+    def test_can_dispatch_regular_service_methods(self):
+        app = AsgiSoapApplication(SOAPDispatcher(echo_service()))
+        status, headers, content = _run(_request(app))
+        assert_equals(200, status)
+        assert_equals('text/xml', headers['content-type'])
+        assert_equals('foobar', self._echo_value(content))
+
+        status, headers, content = _run(_request(app, body=b'', method='GET', query_string=b'wsdl'))
+        assert_equals(200, status)
+        assert_true(b'soap.example' in content)
+
+    def test_supports_async_service_methods_and_middlewares(self):
+        service = echo_service()
+        calls = []
+
+        @service.route('echoOperation')
+        async def echo(request, input_):
+            await asyncio.sleep(0)
+            if input_.value == 'error':
+                raise ValueError('invalid value')
+            return EchoType.create(input_.value.upper())
+
+        async def async_middleware(request, next_call):
+            calls.append('async')
+            response = await next_call(request)
+            calls.append(type(response.soap_body).__name__)
+            return response
+
+        dispatcher = SOAPDispatcher(service, middlewares=[ExceptionToSoapFault(), async_middleware])
+        app = AsgiSoapApplication(dispatcher)
+        status, headers, content = _run(_request(app))
+        assert_equals(200, status)
+        assert_equals('FOOBAR', self._echo_value(content))
+        assert_equals(['async', 'EchoType'], calls)
+
+        # the regular middleware handles exceptions of the coroutine
+        status, headers, content = _run(_request(app, body=ECHO_MESSAGE.replace(b'foobar', b'error')))
+        assert_equals(500, status)
+        fault = soap11.Envelope.parsexml(content).Body.Fault
+        assert_equals('ValueError: invalid value', fault.faultstring)
+
+    def test_handles_slow_requests_concurrently(self):
+        service = echo_service()
+
+        @service.route('echoOperation')
+        async def echo(request, input_):
+            await asyncio.sleep(0.2)
+            return SOAPResponse(EchoType.create(input_.value))
+
+        app = AsgiSoapApplication(SOAPDispatcher(service, single_pass=True))
+
+        async def requests():
+            return await asyncio.gather(*[_request(app) for _ in range(50)])
+        start = time.time()
+        responses = _run(requests())
+        assert_true(time.time() - start < 2)
+        assert_equals([200] * 50, [status for status, headers, content in responses])
+
+    def test_regular_middlewares_around_coroutines_need_one_executor_thread(self):
+        service = echo_service()
+        calls = []
+
+        @service.route('echoOperation')
+        async def echo(request, input_):
+            await asyncio.sleep(0.01)
+            return EchoType.create(input_.value)
+
+        def middleware(name):
+            def call(request, next_call):
+                calls.append(name)
+                return next_call(request)
+            return call
+
+        async def async_middleware(request, next_call):
+            return await next_call(request)
+
+        for middlewares, regular_count in (([middleware('a'), middleware('b')], 2),
+                                           ([middleware('a'), async_middleware, middleware('b'), middleware('c')], 3)):
+            del calls[:]
+            with ThreadPoolExecutor(1) as executor:
+                app = AsgiSoapApplication(SOAPDispatcher(service, middlewares=middlewares), executor=executor)
+
+                async def requests():
+                    return await asyncio.wait_for(asyncio.gather(*[_request(app) for _ in range(20)]), 5)
+                responses = _run(requests())
+            assert_equals([200] * 20, [status for status, headers, content in responses])
+            assert_equals(20 * regular_count, len(calls))
+
+    def test_can_offload_parsing_and_rendering(self):
+        with ThreadPoolExecutor(2) as executor:
+            app = AsgiSoapApplication(SOAPDispatcher(echo_service(), stream_responses=True), executor=executor,
+                                      offload=True, compress_responses=True, compress_min_size=0)
+            status, headers, content = _run(_request(app, headers=[(b'accept-encoding', b'gzip')]))
+        assert_equals(200, status)
+        assert_equals('gzip', headers['content-encoding'])
+        assert_equals('foobar', self._echo_value(compression.decompress(content, 'gzip')))
+        assert_raises(TypeError, lambda: AsgiSoapApplication(SOAPDispatcher(echo_service()),
+                                                             executor=ProcessPoolExecutor(1)))
+
+    def test_rejects_invalid_compressed_requests(self):
+        app = AsgiSoapApplication(SOAPDispatcher(echo_service()))
+        status, headers, content = _run(_request(app, headers=[(b'content-encoding', b'gzip')]))
+        assert_equals(400, status)
+
+
+class AsyncStubTest(PythonicTestCase):
+    def _call(self, app, calls, **stub_kwargs):
+        """
+        Runs calls(stub) against a local server for the ASGI application.
+        """
+        async def run():
+            server, location = await serve_asgi(app)
+            try:
+                stub = AsyncStub(location=location, service=echo_service(), **stub_kwargs)
+                return await calls(stub)
+            finally:
+                await server.stop()
+        return _run(run())
+
+    def test_can_call_service(self):
+        app = AsgiSoapApplication(SOAPDispatcher(echo_service()), compress_responses=True, compress_min_size=0)
+        response = self._call(app, lambda stub: stub.call('echoOperation', EchoType.create('foo')),
+                              compress_requests=True)
+        assert_equals('foo', response.soap_body.value)
+
+        # streamed (chunked) response
+        app = AsgiSoapApplication(SOAPDispatcher(echo_service(), stream_responses=True))
+        response = self._call(app, lambda stub: stub.call('echoOperation', EchoType.create('bar')))
+        assert_equals('bar', response.soap_body.value)
+
+    def test_limits_response_size(self):
+        def call(stub):
+            return stub.call('echoOperation', EchoType.create('x' * 5000))
+        transport = AsyncHttpTransport(max_response_size=1000)
+        for dispatcher_kwargs, app_kwargs in (({}, {}), ({'stream_responses': True}, {}),
+                                              ({}, {'compress_responses': True, 'compress_min_size': 0})):
+            app = AsgiSoapApplication(SOAPDispatcher(echo_service(), **dispatcher_kwargs), **app_kwargs)
+            assert_raises(ValueError, lambda: self._call(app, call, transport=transport))
+        response = self._call(app, call, transport=AsyncHttpTransport(max_response_size=10000))
+        assert_equals('x' * 5000, response.soap_body.value)
+        assert_none(AsyncStub(location='http://soap.example/ws', service=echo_service()).session)
+
+    def test_raises_faults(self):
+        service = echo_service()
+
+        @service.route('echoOperation')
+        async def echo(request, input_):
+            return SOAPError(soap11.Code.SERVER, 'failed')
+        app = AsgiSoapApplication(SOAPDispatcher(service))
+        e = assert_raises(SOAPError, lambda: self._call(
+            app, lambda stub: stub.call('echoOperation', EchoType.create('foo'))))
+        assert_equals('failed', e.message)
+
+    def test_limits_concurrent_calls_and_supports_timeouts(self):
+        service = echo_service()
+        active = []
+        max_active = []
+
+        @service.route('echoOperation')
+        async def echo(request, input_):
+            active.append(input_.value)
+            max_active.append(len(active))
+            await asyncio.sleep(float(input_.value))
+            active.remove(input_.value)
+            return EchoType.create(input_.value)
+        app = AsgiSoapApplication(SOAPDispatcher(service))
+
+        async def calls(stub):
+            return await asyncio.gather(*[stub.call('echoOperation', EchoType.create('0.02')) for _ in range(10)])
+        responses = self._call(app, calls, max_concurrency=3)
+        assert_equals(['0.02'] * 10, [response.soap_body.value for response in responses])
+        assert_equals(3, max(max_active))
+
+        assert_raises(asyncio.TimeoutError, lambda: self._call(
+            app, lambda stub: stub.call('echoOperation', EchoType.create('1'), timeout=0.05)))
+
+    def test_supports_custom_transports(self):
+        class Result(xsd.ComplexType):
+            values = xsd.ListElement(xsd.String, 'value')
+        requests = []
+
+        async def transport(url, headers, body):
+            requests.append((url, headers, body))
+            return 200, {}, (b'<soap:Envelope xmlns:soap="http://schemas.xmlsoap.org/soap/envelope/"><soap:Body>'
+                             b'<result><value>a</value><value>b</value></result></soap:Body></soap:Envelope>')
+        service = echo_service()
+        service.get_method('echoOperation').output = Result
+        stub = AsyncStub(username='user', password='secret', location='http://soap.example/ws', service=service,
+                         transport=transport)
+        values = _run(stub.iter_call('echoOperation', EchoType.create('foo'), 'values'))
+        assert_equals(['a', 'b'], list(values))
+        url, headers, body = requests[0]
+        assert_equals('http://soap.example/ws', url)
+        assert_equals('Basic dXNlcjpzZWNyZXQ=', headers['Authorization'])
+        assert_equals('foo', soap11.Envelope.parsexml(body).Body.parse_as(EchoType).value)
+
+    def test_call_many(self):
+        async def transport(url, headers, body):
+            value = soap11.Envelope.parsexml(body).Body.parse_as(EchoType).value
+            await asyncio.sleep(0.01 * (3 - int(value) % 3))
+            if value == '1':
+                return 500, {}, soap11.Envelope.error_response(soap11.Code.SERVER, 'failed')
+            return 200, {}, soap11.Envelope.response('echoResponse', EchoType.create(value))
+        stub = AsyncStub(location='http://soap.example/ws', service=echo_service(), transport=transport)
+        results = _run(stub.call_many('echoOperation', [EchoType.create(str(i)) for i in range(6)]))
+        assert_equals('0', results[0].soap_body.value)
+        assert_equals('failed', results[1].message)
+        assert_equals(['2', '3', '4', '5'], [result.soap_body.value for result in results[2:]])
+
+        async def completed():
+            return [await result for result in stub.iter_call_many('echoOperation', [EchoType.create('0'),
+                                                                                      EchoType.create('2')])]
+        assert_equals([1, 0], [index for index, _ in _run(completed())])
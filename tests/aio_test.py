@@ -0,0 +1,12 @@
+# -*- coding: utf-8 -*-
+# The tests are in aio_cases.py (async def is a SyntaxError before Python 3.5).
+
+from __future__ import absolute_import, unicode_literals
+
+import sys
+import unittest
+
+if sys.version_info < (3, 5):
+    raise unittest.SkipTest('soapfish.aio requires Python 3.5+.')
+
+from aio_cases import AsgiSoapApplicationTest, AsyncStubTest  # noqa: E402,F401
@@ -0,0 +1,49 @@
+from __future__ import absolute_import
+
+import zlib
+
+import mock
+from pythonic_testcase import PythonicTestCase, assert_equals, assert_false, assert_none, assert_raises, assert_true
+
+from soapfish import compression
+
+
+class CompressionTest(PythonicTestCase):
+    def test_negotiates_accepted_encoding(self):
+        assert_equals('gzip', compression.accepted_encoding('deflate, gzip'))
+        assert_equals('gzip', compression.accepted_encoding('x-gzip'))
+        assert_equals('deflate', compression.accepted_encoding('gzip;q=0, deflate;q=0.5'))
+        assert_none(compression.accepted_encoding('gzip; q=0, br'))
+        assert_none(compression.accepted_encoding(None))
+
+    def test_can_decompress_compressed_data(self):
+        data = b'<value>foobar</value>' * 100
+        for encoding in compression.ENCODINGS:
+            assert_equals(data, compression.decompress(compression.compress(data, encoding), encoding))
+            chunks = compression.compress_chunks([data[:50], data[50:]], encoding)
+            assert_equals(data, compression.decompress(b''.join(chunks), encoding, max_size=len(data)))
+        compressor = zlib.compressobj(6, zlib.DEFLATED, -zlib.MAX_WBITS)
+        raw = compressor.compress(data) + compressor.flush()
+        assert_equals(data, compression.decompress(raw, 'deflate'))
+        assert_equals(data, compression.decompress(data, 'identity'))
+
+    def test_rejects_invalid_or_too_large_content(self):
+        data = compression.compress(b'\0' * 100000, 'gzip')
+        e = assert_raises(compression.DecompressionError, lambda: compression.decompress(data, 'gzip', 1000))
+        assert_true(e.too_large)
+        e = assert_raises(compression.DecompressionError, lambda: compression.decompress(b'foo', 'gzip'))
+        assert_false(e.too_large)
+        for size in (2 * compression._CHUNK_SIZE, 2 * compression._CHUNK_SIZE + 10):
+            data = compression.compress(b'\0' * size, 'gzip')
+            assert_equals(size, len(compression.decompress(data, 'gzip', size)))
+            e = assert_raises(compression.DecompressionError, lambda: compression.decompress(data, 'gzip', size - 1))
+            assert_true(e.too_large)
+        # the size limit includes the output of the final flush
+        with mock.patch('zlib.decompressobj') as decompressobj:
+            decompressobj.return_value.configure_mock(unconsumed_tail=b'')
+            decompressobj.return_value.decompress.return_value = b'a'
+            decompressobj.return_value.flush.return_value = b'b' * 10
+            e = assert_raises(compression.DecompressionError, lambda: compression.decompress(b'x', 'gzip', 5))
+        assert_true(e.too_large)
+        assert_false(compression.is_supported('br'))
+        assert_raises(compression.DecompressionError, lambda: compression.decompress(b'foo', 'br'))
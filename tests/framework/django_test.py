@@ -34,7 +34,8 @@ class DjangoDispatchTest(framework.DispatchTestMixin, unittest.TestCase):
 
     def setUp(self):  # noqa
         self.service = echo_service()
-        settings.ROOT_URLCONF = urlconf(urlpatterns=(url(r'^ws/$', django_dispatcher(self.service)),))
+        self.view = django_dispatcher(self.service)
+        settings.ROOT_URLCONF = urlconf(urlpatterns=(url(r'^ws/$', self.view),))
         self.client = Client()
 
     def _prepare_extras(self, headers):
@@ -56,3 +57,11 @@ class DjangoDispatchTest(framework.DispatchTestMixin, unittest.TestCase):
         self.assertEquals(200, response.status_code)
         body = self._soap_response(response.content)
         self.assertEquals(input_value, body.value)
+
+    def test_reuses_dispatcher(self):
+        dispatcher = self.view.get_dispatcher()
+        self.test_can_dispatch_simple_request()
+        self.assertIs(dispatcher, self.view.get_dispatcher())
+
+        self.view.reset_dispatcher()
+        self.assertIsNot(dispatcher, self.view.get_dispatcher())
@@ -18,7 +18,8 @@ class FlaskDispatchTest(framework.DispatchTestMixin, unittest.TestCase):
     def setUp(self):  # noqa
         self.service = echo_service()
         app = flask.Flask(__name__)
-        app.add_url_rule('/ws/', 'ws', flask_dispatcher(self.service), methods=['GET', 'POST'])
+        self.view = flask_dispatcher(self.service)
+        app.add_url_rule('/ws/', 'ws', self.view, methods=['GET', 'POST'])
         self.client = app.test_client()
 
     def test_can_retrieve_wsdl(self):
@@ -34,3 +35,13 @@ class FlaskDispatchTest(framework.DispatchTestMixin, unittest.TestCase):
         self.assertEquals(200, response.status_code)
         body = self._soap_response(response.data)
         self.assertEquals(input_value, body.value)
+
+    def test_reuses_dispatcher(self):
+        dispatcher = self.view.get_dispatcher()
+        self.client.get('/ws/', query_string='wsdl')
+        self.test_can_dispatch_simple_request()
+        self.assertIs(dispatcher, self.view.get_dispatcher())
+
+        self.view.reset_dispatcher()
+        self.test_can_dispatch_simple_request()
+        self.assertIsNot(dispatcher, self.view.get_dispatcher())
@@ -1,10 +1,11 @@
 
 from __future__ import absolute_import, unicode_literals
 
+import mock
 from lxml import etree
-from pythonic_testcase import PythonicTestCase, assert_false, assert_true
+from pythonic_testcase import PythonicTestCase, assert_equals, assert_false, assert_true
 
-from soapfish import xsd
+from soapfish import py2xsd, xsd
 from soapfish.py2xsd import generate_xsd
 
 
@@ -35,3 +36,60 @@ class py2xsdTest(PythonicTestCase):
 
         bad_xml = '<foo xmlns="%s"><code>abc</code></foo>' % ns
         assert_false(is_valid(bad_xml))
+
+
+class XMLSchemaCacheTest(PythonicTestCase):
+    def setUp(self):
+        ns = 'http://soap.example/cache.xsd'
+
+        class Item(xsd.ComplexType):
+            code = xsd.Element(xsd.String)
+        self.Item = Item
+        self.schema = xsd.Schema(ns, location=ns, elementFormDefault=xsd.ElementFormDefault.QUALIFIED,
+                                 complexTypes=[Item], elements={'item': xsd.Element(Item)})
+        self.xml = '<item xmlns="%s"><code>1234</code></item>' % ns
+
+    def tearDown(self):
+        py2xsd.invalidate_xml_schema(self.schema)
+
+    def test_compiles_schema_only_once(self):
+        xml_schema = py2xsd.get_xml_schema(self.schema)
+        assert_true(isinstance(xml_schema, etree.XMLSchema))
+        assert_true(xml_schema is py2xsd.get_xml_schema(self.schema))
+        assert_true(xml_schema is py2xsd.get_xml_schema([self.schema]))
+        assert_equals(xml_schema.assertValid, py2xsd.schema_validator([self.schema]))
+
+        item = self.Item.parsexml(self.xml, schema=self.schema)
+        assert_equals('1234', item.code)
+        item.xml('item', namespace=self.schema.targetNamespace, schema=self.schema,
+                 elementFormDefault=self.schema.elementFormDefault)
+        assert_true(xml_schema is py2xsd.get_xml_schema(self.schema))
+
+    def test_can_invalidate_cached_schemas(self):
+        xml_schema = py2xsd.get_xml_schema(self.schema)
+        py2xsd.invalidate_xml_schema(self.schema)
+        assert_false(xml_schema is py2xsd.get_xml_schema(self.schema))
+
+        xml_schema = py2xsd.get_xml_schema(self.schema)
+        py2xsd.invalidate_xml_schema()
+        assert_false(xml_schema is py2xsd.get_xml_schema(self.schema))
+
+    def test_invalidates_schemas_importing_the_schema(self):
+        importing = xsd.Schema('http://soap.example/importing.xsd', imports=[self.schema])
+        xml_schema = py2xsd.get_xml_schema(importing)
+        py2xsd.invalidate_xml_schema(self.schema)
+        assert_false(xml_schema is py2xsd.get_xml_schema(importing))
+        py2xsd.invalidate_xml_schema(importing)
+
+    def test_evicts_least_recently_used_schemas(self):
+        schemas = [xsd.Schema('http://soap.example/lru%d.xsd' % i) for i in range(3)]
+        with mock.patch.object(py2xsd, 'MAX_CACHED_SCHEMAS', 2):
+            first = py2xsd.get_xml_schema(schemas[0])
+            second = py2xsd.get_xml_schema(schemas[1])
+            assert_true(first is py2xsd.get_xml_schema(schemas[0]))  # most recently used
+            third = py2xsd.get_xml_schema(schemas[2])
+            assert_true(third is py2xsd.get_xml_schema(schemas[2]))
+            assert_true(first is py2xsd.get_xml_schema(schemas[0]))
+            assert_false(second is py2xsd.get_xml_schema(schemas[1]))
+        for schema in schemas:
+            py2xsd.invalidate_xml_schema(schema)
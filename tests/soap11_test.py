@@ -2,12 +2,36 @@
 from __future__ import absolute_import
 
 from lxml import etree
-from pythonic_testcase import PythonicTestCase, assert_contains
+from pythonic_testcase import PythonicTestCase, assert_contains, assert_equals, assert_false
 
-from soapfish.soap11 import Code, get_error_response
+from soapfish import xsd
+from soapfish.soap11 import Code, Envelope, get_error_response
+from soapfish.testutil import echo_service
+from soapfish.testutil.echo_service import EchoType
 
 
 class SOAP11Test(PythonicTestCase):
+    def test_envelope_keeps_body_element_if_not_retained_globally(self):
+        echo_service()  # binds the schema of EchoType
+        xml = Envelope.response('echoRequest', EchoType.create('foo'))
+        xsd.ComplexType.RETAIN_XMLELEMENT = False
+        try:
+            envelope = Envelope.parsexml(xml)
+            echo = envelope.Body.parse_as(EchoType)
+        finally:
+            xsd.ComplexType.RETAIN_XMLELEMENT = True
+        assert_equals('foo', echo.value)
+        assert_false(hasattr(envelope, '_xmlelement'))
+        assert_false(hasattr(echo, '_xmlelement'))
+
+    def test_envelope_keeps_body_element_if_not_retained_by_call(self):
+        echo_service()
+        xml = Envelope.response('echoRequest', EchoType.create('foo'))
+        envelope = Envelope.parsexml(xml, retain_xmlelement=False)
+        echo = envelope.Body.parse_as(EchoType)
+        assert_equals('foo', echo.value)
+        assert_false(hasattr(envelope, '_xmlelement'))
+
     def test_get_error_response(self):
         response = get_error_response(Code.SERVER, u'some error', actor='me')
         xml = self._xml_strip(response)
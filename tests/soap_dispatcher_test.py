@@ -1,5 +1,12 @@
 from __future__ import absolute_import
 
+import functools
+import gzip
+import io
+import sys
+import threading
+
+import mock
 import six
 from lxml import etree
 from pythonic_testcase import (
@@ -17,7 +24,7 @@ from pythonic_testcase import (
 from soapfish import wsa, xsd
 from soapfish.core import SOAPError, SOAPRequest, SOAPResponse
 from soapfish.middlewares import ExceptionToSoapFault
-from soapfish.soap_dispatch import SOAPDispatcher
+from soapfish.soap_dispatch import SharedDispatcher, SOAPDispatcher
 from soapfish.testutil import (
     EchoInputHeader,
     EchoOutputHeader,
@@ -153,6 +160,81 @@ class SOAPDispatcherTest(PythonicTestCase):
         response = dispatcher.dispatch(request)
         self.assert_is_successful_response(response, handler_state)
 
+    def test_routes_methods_added_or_bound_after_creation(self):
+        handler, handler_state = echo_handler()
+        service = echo_service(handler)
+        dispatcher = SOAPDispatcher(service)
+        soap_message = (
+            '<ns1:echoRequest xmlns:ns1="http://soap.example/echo/types">'
+            '<value>foobar</value>'
+            '</ns1:echoRequest>'
+        )
+        request_message = self._wrap_with_soap_envelope(soap_message)
+
+        def dispatch(soap_action):
+            request = SOAPRequest(dict(SOAPACTION=soap_action, REQUEST_METHOD='POST'), request_message)
+            return dispatcher.dispatch(request)
+        self.assert_is_soap_fault(dispatch('reverse'), partial_fault_string="Invalid soap action 'reverse'")
+
+        reverse_handler, reverse_state = echo_handler()
+        service.methods = service.methods + [
+            xsd.Method(operationName='reverseOperation', soapAction='reverse', input='echoRequest',
+                       output='echoResponse', function=reverse_handler),
+        ]
+        self.assert_is_successful_response(dispatch('reverse'), reverse_state)
+        assert_false(handler_state.was_called)
+
+        bound_handler, bound_state = echo_handler()
+        service.route('reverseOperation')(bound_handler)
+        self.assert_is_successful_response(dispatch('reverse'), bound_state)
+        self.assert_is_successful_response(dispatch('echo'), handler_state)
+        assert_equals('foobar', handler_state.input_.value)
+
+    def test_can_serialize_responses_directly(self):
+        soap_message = (
+            '<ns1:echoRequest xmlns:ns1="http://soap.example/echo/types">'
+            '<value>foo &amp; bar</value>'
+            '</ns1:echoRequest>'
+        )
+        request_message = self._wrap_with_soap_envelope(soap_message)
+        responses = []
+        for direct_responses in (False, True):
+            handler, handler_state = echo_handler()
+            dispatcher = SOAPDispatcher(echo_service(handler), direct_responses=direct_responses)
+            request = SOAPRequest(dict(SOAPACTION='echo', REQUEST_METHOD='POST'), request_message)
+            response = dispatcher.dispatch(request)
+            self.assert_is_successful_response(response, handler_state)
+            responses.append(response.http_content)
+        assert_contains(b'<value>foo &amp; bar</value>', responses[1])
+        assert_equals(responses[0], responses[1])
+
+    def test_shared_dispatcher_is_created_once(self):
+        handler, handler_state = echo_handler()
+        shared = SharedDispatcher(echo_service(handler), direct_responses=True)
+        dispatchers = []
+        threads = [threading.Thread(target=lambda: dispatchers.append(shared.get())) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert_length(8, dispatchers)
+        dispatcher = dispatchers[0]
+        assert_true(all(d is dispatcher for d in dispatchers))
+        assert_true(dispatcher.direct_responses)
+
+        soap_message = (
+            '<ns1:echoRequest xmlns:ns1="http://soap.example/echo/types">'
+            '<value>foobar</value>'
+            '</ns1:echoRequest>'
+        )
+        request = SOAPRequest(dict(SOAPACTION='echo', REQUEST_METHOD='POST'),
+                              self._wrap_with_soap_envelope(soap_message))
+        self.assert_is_successful_response(shared.dispatch(request), handler_state)
+        assert_true(shared.get() is dispatcher)
+
+        shared.reset()
+        assert_false(shared.get() is dispatcher)
+
     def test_can_use_soap_error_from_handler(self):
         soap_error = SOAPError('code', 'internal data error', 'actor')
 
@@ -284,6 +366,66 @@ class SOAPDispatcherTest(PythonicTestCase):
         assert_equals('text/xml', response.http_headers['Content-Type'])
         assert_equals(500, response.http_status_code)
 
+    def test_middleware_chain_is_composed_once(self):
+        calls = []
+
+        def tracing(name):
+            def middleware(request, next_call):
+                calls.append(name)
+                return next_call(request)
+            return middleware
+        outer, inner = tracing('outer'), tracing('inner')
+        handler, handler_state = echo_handler()
+        dispatcher = SOAPDispatcher(echo_service(handler), middlewares=[outer, inner])
+        soap_message = (
+            '<tns:echoRequest xmlns:tns="http://soap.example/echo/types">'
+            '<value>foobar</value>'
+            '</tns:echoRequest>'
+        )
+        request_message = self._wrap_with_soap_envelope(soap_message)
+
+        def dispatch():
+            del calls[:]
+            request = SOAPRequest(dict(SOAPACTION='echo', REQUEST_METHOD='POST'), request_message)
+            self.assert_is_successful_response(dispatcher.dispatch(request), handler_state)
+            return list(calls)
+        assert_equals(['outer', 'inner'], dispatch())
+        chain = dispatcher.middleware()
+        assert_equals(['outer', 'inner'], dispatch())
+        assert_true(chain is dispatcher.middleware())
+
+        first = tracing('first')
+        dispatcher.add_middleware(first, index=0)
+        dispatcher.add_middleware(tracing('last'))
+        assert_equals(['first', 'outer', 'inner', 'last'], dispatch())
+        dispatcher.remove_middleware(first)
+        assert_equals(['outer', 'inner', 'last'], dispatch())
+        assert_raises(ValueError, lambda: dispatcher.remove_middleware(first))
+
+        # changing the list directly is still supported
+        dispatcher.middlewares.pop()
+        assert_equals(['outer', 'inner'], dispatch())
+        dispatcher.middlewares = []
+        assert_equals([], dispatch())
+
+    def test_records_timings_of_request_phases(self):
+        handler, handler_state = echo_handler()
+        dispatcher = SOAPDispatcher(echo_service(handler))
+        soap_message = (
+            '<tns:echoRequest xmlns:tns="http://soap.example/echo/types">'
+            '<value>foobar</value>'
+            '</tns:echoRequest>'
+        )
+        request = SOAPRequest(dict(SOAPACTION='echo', REQUEST_METHOD='POST'),
+                              self._wrap_with_soap_envelope(soap_message))
+        self.assert_is_successful_response(dispatcher.dispatch(request), handler_state)
+        assert_equals(['parse', 'validate', 'route', 'parse_input', 'call', 'render'], list(request.timings))
+        assert_true(all(seconds >= 0 for seconds in request.timings.values()))
+
+        request = SOAPRequest(dict(SOAPACTION='echo', REQUEST_METHOD='POST'), b'<invalid')
+        self.assert_is_soap_fault(dispatcher.dispatch(request))
+        assert_equals(['render'], list(request.timings))
+
     def test_can_validate_wsa_header(self):
         dispatcher = SOAPDispatcher(echo_service())
         header = wsa.Header.parsexml(
@@ -310,6 +452,63 @@ class SOAPDispatcherTest(PythonicTestCase):
         assert_not_contains('${scheme}', response.http_content.decode())
         assert_not_contains('${host}', response.http_content.decode())
 
+    def test_caches_wsdl_per_host(self):
+        service = echo_service()
+        service.location = '${scheme}://${host}/ws'
+        dispatcher = SOAPDispatcher(service)
+
+        def get_wsdl(host):
+            request = SOAPRequest(dict(REQUEST_METHOD='GET', QUERY_STRING='wsdl', HTTP_HOST=host), '')
+            return dispatcher.dispatch(request)
+        response = get_wsdl('a.example')
+        assert_contains(b'http://a.example/ws', response.http_content)
+        assert_true(response.http_content is get_wsdl('a.example').http_content)
+        assert_contains(b'http://b.example/ws', get_wsdl('b.example').http_content)
+        assert_equals(response.http_headers['ETag'], get_wsdl('a.example').http_headers['ETag'])
+        assert_false(response.http_headers['ETag'] == get_wsdl('b.example').http_headers['ETag'])
+
+        with mock.patch('soapfish.soap_dispatch.WSDL_CACHE_SIZE', 2):
+            dispatcher = SOAPDispatcher(service)
+        first = get_wsdl('a.example').http_content
+        get_wsdl('b.example')
+        get_wsdl('c.example')
+        assert_false(first is get_wsdl('a.example').http_content)
+        assert_equals(first, get_wsdl('a.example').http_content)
+
+    def test_supports_etags_and_gzip_for_wsdl_and_xsd(self):
+        xsds = {'xsd': b'<xs:schema xmlns:xs="http://www.w3.org/2001/XMLSchema"/>'}
+        dispatcher = SOAPDispatcher(echo_service(), xsds=xsds)
+        for query_string in ('wsdl', 'xsd='):
+            def get(**environ):
+                environ.update(REQUEST_METHOD='GET', QUERY_STRING=query_string)
+                return dispatcher.dispatch(SOAPRequest(environ, ''))
+            response = get()
+            self.assert_is_successful_response(response)
+            assert_equals('Accept-Encoding', response.http_headers['Vary'])
+            assert_not_contains('Content-Encoding', response.http_headers)
+            etag = response.http_headers['ETag']
+
+            gzipped = get(HTTP_ACCEPT_ENCODING='deflate, gzip;q=0.8')
+            self.assert_is_successful_response(gzipped)
+            assert_equals('gzip', gzipped.http_headers['Content-Encoding'])
+            assert_equals(response.http_content, gzip.GzipFile(fileobj=io.BytesIO(gzipped.http_content)).read())
+            gzip_etag = gzipped.http_headers['ETag']
+            assert_false(etag == gzip_etag)
+            assert_not_contains('Content-Encoding', get(HTTP_ACCEPT_ENCODING='gzip;q=0').http_headers)
+
+            for if_none_match in (etag, 'W/' + etag, '"foo", ' + gzip_etag, '*'):
+                not_modified = get(HTTP_IF_NONE_MATCH=if_none_match)
+                assert_equals(304, not_modified.http_status_code)
+                assert_equals(b'', not_modified.http_content)
+                assert_equals(etag, not_modified.http_headers['ETag'])
+            self.assert_is_successful_response(get(HTTP_IF_NONE_MATCH='"foo"'))
+
+    def test_returns_404_for_unknown_xsd(self):
+        dispatcher = SOAPDispatcher(echo_service())
+        response = dispatcher.dispatch(SOAPRequest(dict(REQUEST_METHOD='GET', QUERY_STRING='xsd=foo'), ''))
+        assert_equals(404, response.http_status_code)
+        assert_equals('404 Not Found', response.http_status_text)
+
     def test_service_bind_function(self):
         handler, handler_state = echo_handler()
         service = echo_service(handler)
@@ -373,3 +572,20 @@ class SOAPDispatcherTest(PythonicTestCase):
             '</senv:Envelope>'
         ) % dict(payload=payload, header=header)
         return envelope.encode('utf-8')
+
+
+class SinglePassSOAPDispatcherTest(SOAPDispatcherTest):
+    '''
+    Runs all dispatcher tests with SOAPDispatcher(..., single_pass=True).
+    '''
+
+    def setUp(self):
+        dispatcher_class = functools.partial(SOAPDispatcher, single_pass=True)
+        patcher = mock.patch.object(sys.modules[__name__], 'SOAPDispatcher', dispatcher_class)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_rejects_empty_soap_body(self):
+        dispatcher = SOAPDispatcher(echo_service())
+        request = SOAPRequest(dict(SOAPACTION='echo', REQUEST_METHOD='POST'), self._wrap_with_soap_envelope(''))
+        self.assert_is_soap_fault(dispatcher.dispatch(request), partial_fault_string='Missing SOAP body content')
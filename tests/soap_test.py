@@ -1,9 +1,16 @@
+import threading
+import time
 import unittest
+from io import BytesIO
 
+import mock
 from lxml import etree
 from pythonic_testcase import assert_equals, assert_none, assert_raises
 
-from soapfish import core, soap, soap11, soap12
+from soapfish import compression, core, soap, soap11, soap12, utils, xsd
+from soapfish.soap_dispatch import SOAPDispatcher
+from soapfish.testutil import echo_service
+from soapfish.testutil.echo_service import EchoType
 
 
 SOAP11_ERROR_MESSAGE = '''
@@ -127,6 +134,165 @@ class ErrorHandling(unittest.TestCase):
         assert_equals('http://gizmos.com/order', e.actor)
 
 
+class StubTest(unittest.TestCase):
+    def test_iter_call_parses_response_incrementally(self):
+        class Result(xsd.ComplexType):
+            values = xsd.ListElement(xsd.String, 'value')
+
+        service = echo_service()
+        service.get_method('echoOperation').output = Result
+        stub = soap.Stub(location='http://soap.example/ws', service=service)
+        xml = (b'<soap:Envelope xmlns:soap="http://schemas.xmlsoap.org/soap/envelope/"><soap:Body>'
+               b'<result><value>a</value><value>b</value><value>c</value></result>'
+               b'</soap:Body></soap:Envelope>')
+        raw = BytesIO(xml)
+        raw.release_conn = mock.Mock()
+        response = mock.Mock(status_code=200, headers={}, raw=raw)
+
+        with mock.patch('requests.Session.post', return_value=response) as post:
+            values = stub.iter_call('echoOperation', EchoType.create('foo'), 'values')
+            self.assertEqual(['a', 'b', 'c'], list(values))
+        self.assertTrue(post.call_args[1]['stream'])
+        self.assertEqual(1, raw.release_conn.call_count)
+
+    def test_iter_call_closes_response_if_stopped_early(self):
+        class Result(xsd.ComplexType):
+            values = xsd.ListElement(xsd.String, 'value')
+
+        service = echo_service()
+        service.get_method('echoOperation').output = Result
+        stub = soap.Stub(location='http://soap.example/ws', service=service)
+        xml = (b'<soap:Envelope xmlns:soap="http://schemas.xmlsoap.org/soap/envelope/"><soap:Body>'
+               b'<result><value>a</value><value>b</value></result></soap:Body></soap:Envelope>')
+        raw = BytesIO(xml)
+        raw.release_conn = mock.Mock()
+        response = mock.Mock(status_code=200, headers={}, raw=raw)
+
+        with mock.patch('requests.Session.post', return_value=response):
+            values = stub.iter_call('echoOperation', EchoType.create('foo'), 'values')
+            values.close()  # before the first item
+        self.assertTrue(raw.closed)
+        self.assertEqual(1, raw.release_conn.call_count)
+
+    def test_iter_call_raises_faults(self):
+        stub = soap.Stub(location='http://soap.example/ws', service=echo_service())
+        response = mock.Mock(status_code=500, headers={}, content=SOAP11_ERROR_MESSAGE.encode('utf-8'))
+
+        with mock.patch('requests.Session.post', return_value=response):
+            e = assert_raises(core.SOAPError, lambda: stub.iter_call('echoOperation', EchoType.create('foo'), 'value'))
+        assert_equals('Result', e.code)
+
+    def test_iter_call_checks_path_before_sending_request(self):
+        transport = mock.Mock()
+        stub = soap.Stub(location='http://soap.example/ws', service=echo_service(), transport=transport)
+
+        assert_raises(ValueError, lambda: stub.iter_call('echoOperation', EchoType.create('foo'), 'missing'))
+        self.assertFalse(transport.called)
+
+    def test_iter_call_closes_response_of_errors(self):
+        source = BytesIO(b'<soap:Envelope xmlns:soap="http://schemas.xmlsoap.org/soap/envelope/">'
+                         b'<soap:Body><echoResponse><value>foo</value></echoResponse></soap:Body></soap:Envelope>')
+        transport = mock.Mock(return_value=(502, {}, source))
+        stub = soap.Stub(location='http://soap.example/ws', service=echo_service(), transport=transport)
+
+        e = assert_raises(core.SOAPError, lambda: stub.iter_call('echoOperation', EchoType.create('foo'), 'value'))
+        assert_equals('Server', e.code)
+        self.assertTrue(source.closed)
+
+        source = BytesIO(SOAP11_ERROR_MESSAGE.encode('utf-8'))
+        transport.return_value = (500, {}, source)
+        assert_raises(core.SOAPError, lambda: stub.iter_call('echoOperation', EchoType.create('foo'), 'value'))
+        self.assertTrue(source.closed)
+
+    def test_can_send_compressed_requests(self):
+        stub = soap.Stub(location='http://soap.example/ws', service=echo_service(), compress_requests=True)
+        stub.COMPRESS_MIN_SIZE = 0
+        response = mock.Mock(status_code=200, headers={}, content=SOAP11_ERROR_MESSAGE)
+
+        with mock.patch('requests.Session.post', return_value=response) as post:
+            assert_raises(core.SOAPError, lambda: stub.call('echoOperation', EchoType.create('foo')))
+        headers, data = post.call_args[1]['headers'], post.call_args[1]['data']
+        assert_equals('gzip', headers['Content-Encoding'])
+        assert_equals('gzip, deflate', headers['Accept-Encoding'])
+        envelope = soap11.Envelope.parsexml(compression.decompress(data, 'gzip'))
+        assert_equals('foo', envelope.Body.parse_as(EchoType).value)
+
+        stub.COMPRESS_MIN_SIZE = len(data) * 100
+        with mock.patch('requests.Session.post', return_value=response) as post:
+            assert_raises(core.SOAPError, lambda: stub.call('echoOperation', EchoType.create('foo')))
+        self.assertNotIn('Content-Encoding', post.call_args[1]['headers'])
+
+    def test_reuses_session_until_closed(self):
+        with soap.Stub(location='http://soap.example/ws', service=echo_service(), pool_maxsize=3,
+                       timeout=(1, 5)) as stub:
+            session = stub.session
+            self.assertIs(session, stub.session)
+            adapter = session.get_adapter('http://soap.example/ws')
+            assert_equals(3, adapter._pool_maxsize)
+            response = mock.Mock(status_code=500, headers={}, content=SOAP11_ERROR_MESSAGE)
+            with mock.patch('requests.Session.post', return_value=response) as post:
+                assert_raises(core.SOAPError, lambda: stub.call('echoOperation', EchoType.create('foo')))
+            assert_equals((1, 5), post.call_args[1]['timeout'])
+        assert_none(stub.transport._session)
+        self.assertIsNot(session, stub.session)
+
+        # sessions passed to the stub are not closed
+        session = mock.Mock()
+        soap.Stub(location='http://soap.example/ws', service=echo_service(), session=session).close()
+        self.assertFalse(session.close.called)
+
+    def test_call_many_returns_results_in_input_order(self):
+        stub = soap.Stub(location='http://soap.example/ws', service=echo_service())
+        threads = set()
+
+        def post(url, data=None, **kwargs):
+            value = soap11.Envelope.parsexml(data).Body.parse_as(EchoType).value
+            threads.add(threading.current_thread())
+            time.sleep(0.01 * (5 - int(value) % 5))
+            if value == '3':
+                return mock.Mock(status_code=500, headers={}, content=SOAP11_ERROR_MESSAGE)
+            content = soap11.Envelope.response('echoResponse', EchoType.create(value))
+            return mock.Mock(status_code=200, headers={}, content=content)
+
+        with mock.patch('requests.Session.post', side_effect=post):
+            results = stub.call_many('echoOperation', (EchoType.create(str(i)) for i in range(10)), max_workers=4)
+            assert_equals(4, len(threads))
+            indexes = [index for index, _ in stub.iter_call_many('echoOperation', [EchoType.create('1')] * 5)]
+        assert_equals(['0', '1', '2'], [result.soap_body.value for result in results[:3]])
+        assert_equals('Result', results[3].code)
+        assert_equals([str(i) for i in range(4, 10)], [result.soap_body.value for result in results[4:]])
+        assert_equals(list(range(5)), sorted(indexes))
+
+
+class ServiceTest(unittest.TestCase):
+    def test_get_method(self):
+        service = echo_service()
+        method = service.get_method('echoOperation')
+        assert_equals('echo', method.soapAction)
+        assert_raises(StopIteration, lambda: service.get_method('fooOperation'))
+
+        foo = xsd.Method(operationName='fooOperation', soapAction='foo', input='echoRequest')
+        service.methods = service.methods + [foo]
+        self.assertIs(foo, service.get_method('fooOperation'))
+        self.assertIs(method, service.get_method('echoOperation'))
+
+    def test_parser_config_is_shared_by_stub_and_dispatcher(self):
+        service = echo_service()
+        self.assertIs(utils.DEFAULT_PARSER_CONFIG, service.parser_config)
+        service.parser_config = utils.XMLParserConfig(remove_blank_text=True)
+        stub = soap.Stub(location='http://soap.example/ws', service=service)
+        self.assertIs(service.parser_config, stub.parser_config)
+        self.assertIs(service.parser_config, SOAPDispatcher(service).parser_config)
+        parser_config = utils.XMLParserConfig()
+        self.assertIs(parser_config, SOAPDispatcher(service, parser_config=parser_config).parser_config)
+
+        xml = (b'<soap:Envelope xmlns:soap="http://schemas.xmlsoap.org/soap/envelope/"><soap:Body>'
+               b'<!-- comment --><echoResponse><value>foo</value></echoResponse>'
+               b'</soap:Body></soap:Envelope>')
+        response = stub._handle_response(service.get_method('echoOperation'), {}, xml)
+        assert_equals('foo', response.soap_body.value)
+
+
 class SOAPVersionTest(unittest.TestCase):
     WSDL = '''<?xml version="1.0" encoding="utf-8"?>
         <definitions xmlns:http="http://schemas.xmlsoap.org/wsdl/http/" xmlns:soap="http://schemas.xmlsoap.org/wsdl/soap/" xmlns:soap12="http://schemas.xmlsoap.org/wsdl/soap12/" xmlns:s="http://www.w3.org/2001/XMLSchema" xmlns:s0="http://tempuri.org/encodedTypes" xmlns:soapenc="http://schemas.xmlsoap.org/soap/encoding/" xmlns:tns="http://tempuri.org/" xmlns:tm="http://microsoft.com/wsdl/mime/textMatching/" xmlns:mime="http://schemas.xmlsoap.org/wsdl/mime/" targetNamespace="http://tempuri.org/" xmlns="http://schemas.xmlsoap.org/wsdl/">
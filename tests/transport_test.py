@@ -0,0 +1,112 @@
+from __future__ import absolute_import
+
+import threading
+import unittest
+from wsgiref.simple_server import make_server, WSGIRequestHandler
+
+import mock
+from pythonic_testcase import assert_equals, assert_raises
+
+from soapfish import core, soap, soap11, xsd
+from soapfish.soap_dispatch import SOAPDispatcher, WsgiSoapApplication
+from soapfish.testutil import echo_service
+from soapfish.testutil.echo_service import EchoType
+from soapfish.transport import DispatcherTransport, RequestsTransport, Urllib3Transport
+
+
+class Result(xsd.ComplexType):
+    values = xsd.ListElement(xsd.String, 'value')
+
+
+Result.SCHEMA = xsd.Schema('http://soap.example/echo/types', elementFormDefault=xsd.ElementFormDefault.UNQUALIFIED)
+
+
+def _service():
+    service = echo_service()
+
+    @service.route('echoOperation')
+    def echo(request, input_):
+        if input_.value == 'fault':
+            return core.SOAPError(soap11.Code.SERVER, 'failed')
+        return EchoType.create(input_.value)
+    return service
+
+
+class DispatcherTransportTest(unittest.TestCase):
+    def test_can_call_dispatcher_in_process(self):
+        transport = DispatcherTransport(SOAPDispatcher(_service()))
+        stub = soap.Stub(username='user', password='secret', location='http://soap.example/ws', service=_service(),
+                         transport=transport, compress_requests=True)
+        stub.COMPRESS_MIN_SIZE = 0
+        assert_equals('foo', stub.call('echoOperation', EchoType.create('foo')).soap_body.value)
+        e = assert_raises(core.SOAPError, lambda: stub.call('echoOperation', EchoType.create('fault')))
+        assert_equals('failed', e.message)
+
+        with mock.patch.object(transport.dispatcher, 'dispatch', wraps=transport.dispatcher.dispatch) as dispatch:
+            stub.call('echoOperation', EchoType.create('foo'))
+        environ = dispatch.call_args[0][0].environ
+        assert_equals('echo', environ['SOAPACTION'])
+        assert_equals('soap.example', environ['HTTP_HOST'])
+        assert_equals('Basic dXNlcjpzZWNyZXQ=', environ['HTTP_AUTHORIZATION'])
+
+    def test_supports_streamed_responses(self):
+        service = echo_service()
+        service.get_method('echoOperation').output = Result
+
+        @service.route('echoOperation')
+        def echo(request, input_):
+            return Result(values=['a', 'b'])
+        transport = DispatcherTransport(SOAPDispatcher(service, stream_responses=True))
+        stub = soap.Stub(location='http://soap.example/ws', service=service, transport=transport)
+        values = stub.iter_call('echoOperation', EchoType.create('foo'), 'values')
+        assert_equals(['a', 'b'], list(values))
+
+
+def _connection_pool(pool_manager):
+    keys = list(pool_manager.pools.keys())
+    assert_equals(1, len(keys))
+    return pool_manager.pools[keys[0]].pool  # queue of the idle connections
+
+
+class _QuietHandler(WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+class HttpTransportTest(unittest.TestCase):
+    def setUp(self):
+        app = WsgiSoapApplication(SOAPDispatcher(_service()), compress_responses=True, compress_min_size=0)
+        self.server = make_server('127.0.0.1', 0, app, handler_class=_QuietHandler)
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+        self.location = 'http://127.0.0.1:%d/ws' % self.server.server_port
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+
+    def _check_transport(self, transport, pool_manager):
+        with soap.Stub(location=self.location, service=_service(), transport=transport) as stub:
+            assert_equals('foo', stub.call('echoOperation', EchoType.create('foo')).soap_body.value)
+            # a streamed response which is not read completely releases its connection
+            pool = _connection_pool(pool_manager())
+            with stub.iter_call('echoOperation', EchoType.create('foo'), 'value'):
+                assert_equals(pool.maxsize - 1, pool.qsize())
+            assert_equals(pool.maxsize, pool.qsize())
+            e = assert_raises(core.SOAPError, lambda: stub.call('echoOperation', EchoType.create('fault')))
+            assert_equals('failed', e.message)
+            status, headers, content = transport(self.location, {'Accept-Encoding': 'gzip'}, b'<invalid')
+            assert_equals(500, status)
+            assert_equals('gzip', headers['Content-Encoding'])
+            soap11.Envelope.parsexml(content)  # decompressed
+        transport.close()
+
+    def test_requests_transport(self):
+        transport = RequestsTransport(timeout=(1, 5))
+        self._check_transport(transport, lambda: transport.session.get_adapter(self.location).poolmanager)
+
+    def test_urllib3_transport(self):
+        transport = Urllib3Transport(timeout=(1, 5))
+        assert_equals(1, transport.timeout.connect_timeout)
+        self._check_transport(transport, lambda: transport.pool_manager)
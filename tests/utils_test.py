@@ -1,10 +1,13 @@
 from __future__ import absolute_import
 
+import threading
 from datetime import timedelta
+from io import BytesIO
 
-from pythonic_testcase import PythonicTestCase, assert_equals
+from lxml import etree
+from pythonic_testcase import PythonicTestCase, assert_equals, assert_false, assert_raises, assert_true
 
-from soapfish.utils import timezone_offset_to_string
+from soapfish.utils import DEFAULT_PARSER_CONFIG, GENERATOR_PARSER_CONFIG, XMLParserConfig, timezone_offset_to_string
 
 
 class FormatOffsetTest(PythonicTestCase):
@@ -17,3 +20,53 @@ class FormatOffsetTest(PythonicTestCase):
         assert_equals('-00:30', timezone_offset_to_string(timedelta(minutes=-30)))
         assert_equals('-01:30', timezone_offset_to_string(timedelta(minutes=-90)))
         assert_equals('-14:00', timezone_offset_to_string(timedelta(hours=-14)))
+
+
+class XMLParserConfigTest(PythonicTestCase):
+    XML = b'''<?xml version="1.0"?>
+<!DOCTYPE root [<!ENTITY name "entity value">]>
+<root id="r1">
+  <!-- comment -->
+  <value>&name;</value>
+</root>'''
+
+    def test_reuses_parser_per_thread(self):
+        config = XMLParserConfig()
+        parser = config.parser()
+        assert_true(parser is config.parser())
+        schema = etree.XMLSchema(etree.fromstring(
+            b'<xs:schema xmlns:xs="http://www.w3.org/2001/XMLSchema"><xs:element name="root"/></xs:schema>'))
+        assert_false(parser is config.parser(schema))
+        assert_true(config.parser(schema) is config.parser(schema))
+
+        parsers = []
+        thread = threading.Thread(target=lambda: parsers.append(config.parser()))
+        thread.start()
+        thread.join()
+        assert_false(parser is parsers[0])
+
+    def test_does_not_resolve_entities_collect_ids_or_keep_comments_by_default(self):
+        root = DEFAULT_PARSER_CONFIG.fromstring(self.XML)
+        assert_equals(None, root.find('value').text)
+        assert_equals(['value'], [child.tag for child in root])
+        assert_false(DEFAULT_PARSER_CONFIG.options['collect_ids'])
+        assert_equals(2, len(XMLParserConfig(remove_comments=False).fromstring(self.XML)))  # comment, value
+
+        root = XMLParserConfig(resolve_entities=True).fromstring(self.XML)
+        assert_equals('entity value', root.find('value').text)
+        # wsdl2py and xsd2py expand entities
+        assert_equals('entity value', GENERATOR_PARSER_CONFIG.fromstring(self.XML).find('value').text)
+
+    def test_can_remove_comments_and_blank_text(self):
+        config = XMLParserConfig(remove_comments=True, remove_blank_text=True)
+        root = config.fromstring(self.XML)
+        assert_equals(['value'], [child.tag for child in root])
+        assert_equals(None, root.text)
+        # the same options are used for incremental parsing
+        tags = [e.tag for _, e in config.iterparse(BytesIO(self.XML), events=('start',))]
+        assert_equals(['root', 'value'], tags)
+
+    def test_rejects_invalid_documents(self):
+        assert_raises(etree.XMLSyntaxError, lambda: DEFAULT_PARSER_CONFIG.fromstring(b'<root>'))
+        # the parser is still usable
+        assert_equals('root', DEFAULT_PARSER_CONFIG.fromstring(b'<root/>').tag)
@@ -4,10 +4,12 @@ from __future__ import absolute_import, unicode_literals
 
 from io import BytesIO
 
-from pythonic_testcase import PythonicTestCase, assert_equals
+from pythonic_testcase import PythonicTestCase, assert_equals, assert_false
 
+from soapfish import compression, soap11
 from soapfish.soap_dispatch import SOAPDispatcher, WsgiSoapApplication
 from soapfish.testutil import echo_service
+from soapfish.testutil.echo_service import EchoType
 
 
 class WsgiSoapApplicationTest(PythonicTestCase):
@@ -39,6 +41,88 @@ class WsgiSoapApplicationTest(PythonicTestCase):
         )
         assert_equals(expected_xml, b''.join(response))
 
+    def test_can_stream_responses(self):
+        dispatcher = SOAPDispatcher(echo_service(), stream_responses=True)
+        app = WsgiSoapApplication(dispatcher)
+        start_response = self._response_mock()
+        soap_message = (
+            b'<senv:Envelope xmlns:senv="http://schemas.xmlsoap.org/soap/envelope/">'
+            b'<senv:Body><ns1:echoRequest xmlns:ns1="http://soap.example/echo/types">'
+            b'<value>foobar</value>'
+            b'</ns1:echoRequest></senv:Body></senv:Envelope>'
+        )
+        response = app(self._wsgi_env(soap_message), start_response)
+        assert_equals('200 OK', start_response.code)
+        assert_false(isinstance(response, list))
+        envelope = soap11.Envelope.parsexml(b''.join(response))
+        assert_equals('foobar', envelope.Body.parse_as(EchoType).value)
+
+    def test_decompresses_requests(self):
+        app = WsgiSoapApplication(SOAPDispatcher(echo_service()), max_request_size=1000)
+        for encoding in ('gzip', 'x-gzip', 'deflate'):
+            start_response = self._response_mock()
+            env = self._wsgi_env(compression.compress(self._echo_message(), encoding.replace('x-', '')))
+            env['HTTP_CONTENT_ENCODING'] = encoding
+            response = app(env, start_response)
+            assert_equals('200 OK', start_response.code)
+            envelope = soap11.Envelope.parsexml(b''.join(response))
+            assert_equals('foobar', envelope.Body.parse_as(EchoType).value)
+
+    def test_rejects_invalid_or_too_large_compressed_requests(self):
+        app = WsgiSoapApplication(SOAPDispatcher(echo_service()), max_request_size=100)
+        for content, encoding, code in ((self._echo_message(), 'gzip', '400 Bad Request'),
+                                        (compression.compress(self._echo_message(), 'gzip'), 'gzip',
+                                         '413 Request Entity Too Large'),
+                                        (self._echo_message(), 'br', '415 Unsupported Media Type')):
+            start_response = self._response_mock()
+            env = self._wsgi_env(content)
+            env['HTTP_CONTENT_ENCODING'] = encoding
+            app(env, start_response)
+            assert_equals(code, start_response.code)
+
+    def test_compresses_responses(self):
+        app = WsgiSoapApplication(SOAPDispatcher(echo_service()), compress_responses=True, compress_min_size=0)
+        start_response = self._response_mock()
+        env = self._wsgi_env(self._echo_message())
+        env['HTTP_ACCEPT_ENCODING'] = 'gzip;q=0, deflate'
+        response = b''.join(app(env, start_response))
+        headers = dict(start_response.headers)
+        assert_equals('deflate', headers['Content-Encoding'])
+        assert_equals('Accept-Encoding', headers['Vary'])
+        envelope = soap11.Envelope.parsexml(compression.decompress(response, 'deflate'))
+        assert_equals('foobar', envelope.Body.parse_as(EchoType).value)
+
+        # not accepted by the client, too short or disabled (default)
+        for accept_encoding, min_size, enabled in ((None, 0, True), ('gzip', 10000, True), ('gzip', 0, False)):
+            app.compress_min_size = min_size
+            app.compress_responses = enabled
+            start_response = self._response_mock()
+            env = self._wsgi_env(self._echo_message())
+            if accept_encoding:
+                env['HTTP_ACCEPT_ENCODING'] = accept_encoding
+            response = b''.join(app(env, start_response))
+            assert_false('Content-Encoding' in dict(start_response.headers))
+            soap11.Envelope.parsexml(response)
+
+    def test_compresses_streamed_responses(self):
+        dispatcher = SOAPDispatcher(echo_service(), stream_responses=True)
+        app = WsgiSoapApplication(dispatcher, compress_responses=True)
+        start_response = self._response_mock()
+        env = self._wsgi_env(self._echo_message())
+        env['HTTP_ACCEPT_ENCODING'] = 'gzip'
+        response = app(env, start_response)
+        assert_equals('gzip', dict(start_response.headers)['Content-Encoding'])
+        envelope = soap11.Envelope.parsexml(compression.decompress(b''.join(response), 'gzip'))
+        assert_equals('foobar', envelope.Body.parse_as(EchoType).value)
+
+    def _echo_message(self):
+        return (
+            b'<senv:Envelope xmlns:senv="http://schemas.xmlsoap.org/soap/envelope/">'
+            b'<senv:Body><ns1:echoRequest xmlns:ns1="http://soap.example/echo/types">'
+            b'<value>foobar</value>'
+            b'</ns1:echoRequest></senv:Body></senv:Envelope>'
+        )
+
     def _response_mock(self):
         class StartResponse():
             self.code = None
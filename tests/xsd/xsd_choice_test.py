@@ -59,6 +59,12 @@ class XSDChoiceTest(unittest.TestCase):
         assert_none(result.message)
         assert_equals('123', result.code)
 
+    def test_can_parse_choice_groups_lazily(self):
+        Result = self._choice_schema().elements['result']._type
+        result = Result.parse_xmlelement(etree.fromstring('<code>123</code>'), lazy=True)
+        assert_equals('123', result.code)
+        assert_none(result.message)
+
     def _result_wrap(self, child_string):
         return '<result xmlns="http://foo.example/">%s</result>' % child_string
 
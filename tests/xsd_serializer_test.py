@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+
+import unittest
+
+from soapfish import namespaces as ns, soap11, soap12, xsd, xsd_serializer, xsdspec
+
+
+class Airport(xsd.ComplexType):
+    type = xsd.Element(xsd.String)
+    code = xsd.Element(xsd.String)
+
+
+class Flight(xsd.ComplexType):
+    tail_number = xsd.Element(xsd.String)
+    takeoff_datetime = xsd.Element(xsd.DateTime, minOccurs=0)
+    takeoff_airport = xsd.Element(Airport)
+    landing_airport = xsd.Element(Airport)
+    passengers = xsd.ListElement(xsd.String, 'passenger', maxOccurs=10, minOccurs=0)
+
+
+class RequestResponseOperation(xsd.Group):
+    input = xsd.Element(xsd.String, minOccurs=0)
+    output = xsd.Element(xsd.String, minOccurs=0)
+
+
+class Operation(xsd.ComplexType):
+    name = xsd.Element(xsd.String)
+    requestResponseOperation = xsd.Ref(RequestResponseOperation)
+
+
+class TBodyAttributes(xsd.AttributeGroup):
+    encodingStyle = xsd.Attribute(xsd.String, use=xsd.Use.OPTIONAL)
+    use = xsd.Attribute(xsd.String)
+
+
+class TBody(xsd.ComplexType):
+    parts = xsd.Attribute(xsd.String)
+    tBodyAttributes = xsd.Ref(TBodyAttributes)
+
+
+class CompactItem(xsd.ComplexType):
+    COMPACT = True
+    sku = xsd.Attribute(xsd.String)
+    quantity = xsd.Element(xsd.Integer)
+    price = xsd.Element(xsd.Decimal)
+
+
+class CompactCatalogue(xsd.ComplexType):
+    COMPACT = True
+    items = xsd.ListElement(CompactItem, 'item')
+
+
+class Echo(xsd.ComplexType):
+    value = xsd.Element(xsd.String)
+    codes = xsd.ListElement(xsd.Integer, 'code', nillable=True)
+    language = xsd.Attribute(xsd.String, use=xsd.Use.OPTIONAL, nillable=True)
+    comment = xsd.Element(xsd.String, minOccurs=0, nillable=True)
+
+
+class Message(xsd.ComplexType):
+    echo = xsd.Element(Echo)
+    flight = xsd.Element(Flight, namespace='http://flight.example/')
+    echoes = xsd.ListElement(Echo, 'item', namespace='http://echo.example/')
+
+
+SCHEMA_XML = b'''<xs:schema targetNamespace="http://flightdataservices.com/ops.xsd"
+    xmlns:xs="http://www.w3.org/2001/XMLSchema" elementFormDefault="qualified">
+  <xs:element name="ops" type="fds:ops"/>
+  <xs:complexType name="ops">
+    <xs:sequence>
+      <xs:element name="aircraft" type="xs:string"/>
+      <xs:element name="flight" type="fds:flight" minOccurs="0" maxOccurs="unbounded"/>
+    </xs:sequence>
+    <xs:attribute name="version" ref="fds:version" type="xs:string" use="optional"/>
+  </xs:complexType>
+</xs:schema>
+'''
+
+ECHO_SCHEMA = xsd.Schema('http://echo.example/', elementFormDefault=xsd.ElementFormDefault.QUALIFIED,
+                         complexTypes=[Echo])
+
+
+class DirectSerializationTest(unittest.TestCase):
+    '''
+    The output of the direct serializer must be the same as the one of
+    etree.tostring() for the rendered element tree.
+    '''
+
+    def assert_same_xml(self, instance, tagname, **kwargs):
+        for pretty_print in (True, False):
+            expected = instance.xml(tagname, pretty_print=pretty_print, **kwargs)
+            xml = xsd_serializer.tostring(instance, tagname, pretty_print=pretty_print, **kwargs)
+            self.assertEqual(expected, xml)
+            self.assertEqual(expected, instance.xml(tagname, pretty_print=pretty_print, direct=True, **kwargs))
+
+    def assert_same_xml_in_all_forms(self, instance, tagname):
+        self.assert_same_xml(instance, tagname)
+        for elementFormDefault in (xsd.ElementFormDefault.QUALIFIED, xsd.ElementFormDefault.UNQUALIFIED):
+            self.assert_same_xml(instance, tagname, namespace='http://test.example/',
+                                 elementFormDefault=elementFormDefault)
+
+    def _flight(self):
+        airport = Airport(type='IATA', code='WAW')
+        return Flight(tail_number='LN-KKA', takeoff_airport=airport, landing_airport=airport,
+                      passengers=['A', 'B'])
+
+    def test_simple_and_complex_elements(self):
+        self.assert_same_xml_in_all_forms(self._flight(), 'flight')
+        self.assert_same_xml_in_all_forms(Flight(), 'flight')
+        self.assert_same_xml_in_all_forms(Airport(), 'airport')
+
+    def test_escaping_and_non_ascii_characters(self):
+        echo = Echo(value=u'<&>"\' \r\n\t äöü € \U0001F600 ]]>', language=u'"<&>\'\r\n\t ä')
+        self.assert_same_xml_in_all_forms(echo, 'echo')
+        self.assert_same_xml_in_all_forms(Echo(value=u'', language=u''), 'echo')
+
+    def test_nil_values(self):
+        echo = Echo(value='foo', codes=[1, xsd.NIL, 3], language=xsd.NIL, comment=xsd.NIL)
+        self.assert_same_xml_in_all_forms(echo, 'echo')
+
+    def test_namespaces_of_nested_types(self):
+        message = Message(echo=Echo(value='foo', codes=[xsd.NIL]), flight=self._flight(),
+                          echoes=[Echo(value='bar'), xsd.NIL, Echo(codes=[1])])
+        self.assert_same_xml_in_all_forms(message, 'message')
+        self.assert_same_xml(message, 'message', namespace='http://echo.example/',
+                             elementFormDefault=xsd.ElementFormDefault.QUALIFIED)
+
+    def test_groups_compact_types_and_parsed_objects(self):
+        operation = Operation(name='foo')
+        operation.requestResponseOperation.input = 'IN'
+        self.assert_same_xml_in_all_forms(operation, 'operation')
+        self.assert_same_xml_in_all_forms(Operation(), 'operation')
+        body = TBody(parts='foo')
+        body.tBodyAttributes.use = 'literal'
+        self.assert_same_xml_in_all_forms(body, 'body')
+        catalogue = CompactCatalogue(items=[CompactItem(sku='A1', quantity=3, price=1.5)])
+        self.assert_same_xml_in_all_forms(catalogue, 'catalogue')
+        self.assert_same_xml_in_all_forms(CompactCatalogue.parsexml(catalogue.xml('catalogue')), 'catalogue')
+
+        schema = xsdspec.Schema.parsexml(SCHEMA_XML)
+        self.assert_same_xml(schema, 'schema', namespace=ns.xsd,
+                             elementFormDefault=xsd.ElementFormDefault.QUALIFIED)
+
+    def test_compiled_types(self):
+        xsd.ComplexType.COMPILED = True
+        try:
+            self.assert_same_xml_in_all_forms(self._flight(), 'flight')
+        finally:
+            xsd.ComplexType.COMPILED = False
+
+    def test_soap_envelopes(self):
+        for soap in (soap11, soap12):
+            echo = Echo(value='foo', codes=[1, xsd.NIL])
+            expected = soap.Envelope.response('echoResponse', echo)
+            self.assertEqual(expected, soap.Envelope.response('echoResponse', echo, direct=True))
+            envelope = soap.Envelope._response_envelope('echoResponse', echo)
+            self.assertIsNotNone(xsd_serializer.tostring(envelope, 'Envelope', namespace=soap.ENVELOPE_NAMESPACE,
+                                                         elementFormDefault=xsd.ElementFormDefault.QUALIFIED))
+
+    def test_uses_lxml_for_custom_render_methods(self):
+        # soap12.Fault contains a type with a custom render() method
+        envelope = soap12.Envelope()
+        envelope.Body = soap12.Body()
+        envelope.Body.Fault = soap12.Fault(Code=soap12.Code(Value='Sender'), Reason=soap12.Reason(Text='foo'))
+        self.assertIsNone(xsd_serializer.tostring(envelope, 'Envelope'))
+        self.assertEqual(envelope.xml('Envelope'), envelope.xml('Envelope', direct=True))
+
+        echo = Echo(value='foo')
+        self.assertEqual(soap11.Envelope.response('echoResponse', echo, header=soap11.Header()),
+                         soap11.Envelope.response('echoResponse', echo, header=soap11.Header(), direct=True))
+
+    def test_errors_are_raised_by_lxml(self):
+        self.assertIsNone(xsd_serializer.tostring(Echo(value=u'\x00'), 'echo'))
+        self.assertRaises(ValueError, Echo(value=u'\x00').xml, 'echo', direct=True)
+        self.assertRaises(ValueError, Echo(value=u'foo').xml, 'invalid tag', direct=True)
+        self.assertRaises(ValueError, Flight(passengers=['A'] * 11).xml, 'flight', direct=True)
@@ -1,6 +1,7 @@
 
 import unittest
 from decimal import Decimal
+from io import BytesIO
 
 import iso8601
 from lxml import etree
@@ -103,6 +104,19 @@ class ElementTest(unittest.TestCase):
         flight = Flight(takeoff_airport=Airport())
         str(flight)
 
+    def test_rejects_unknown_attribute(self):
+        flight = Flight()
+        with self.assertRaises(ValueError):
+            flight.invalid = 'foo'
+
+    def test_can_create_instance_from_trusted_values(self):
+        flight = Flight.from_trusted(tail_number='LN-KKA', takeoff_pilot='NOT_A_PILOT')
+        self.assertEqual('LN-KKA', flight.tail_number)
+        # accept() is skipped so the enumeration restriction is not checked
+        self.assertEqual('NOT_A_PILOT', flight.takeoff_pilot)
+        self.assertEqual([], flight.passengers)
+        self.assertRaises(ValueError, Flight.from_trusted, invalid='foo')
+
 
 class ListElementTest(unittest.TestCase):
 
@@ -416,6 +430,67 @@ class ComplexTest(unittest.TestCase):
         xml = etree.tostring(xmlelement, pretty_print=True)
         self.assertEqual(expected_xml, xml)
 
+    def test_render_plan_is_cached_per_namespace(self):
+        airport = Airport.create('IATA', 'WAW')
+        qualified = airport.xml('airport', namespace='http://airport.example/',
+                                elementFormDefault=xsd.ElementFormDefault.QUALIFIED)
+        expected_xml = b'''<ns0:airport xmlns:ns0="http://airport.example/">
+  <ns0:type>IATA</ns0:type>
+  <ns0:code>WAW</ns0:code>
+</ns0:airport>
+'''
+        self.assertEqual(expected_xml, qualified)
+        self.assertEqual(b'<airport>\n  <type>IATA</type>\n  <code>WAW</code>\n</airport>\n', airport.xml('airport'))
+
+        plan = Airport._meta.render_plan(None, None)
+        self.assertEqual(['type', 'code'], [name for name, _ in plan])
+        self.assertIs(plan, Airport._meta.render_plan(None, None))
+        self.assertIsNot(plan, Airport._meta.render_plan('http://airport.example/',
+                                                         xsd.ElementFormDefault.QUALIFIED))
+
+    def test_equality_and_hash_are_based_on_field_values(self):
+        parsed = Airport.parsexml(b'<airport><type>IATA</type><code>WAW</code></airport>')
+        created = Airport.create('IATA', 'WAW')
+        self.assertEqual(created, parsed)
+        self.assertEqual(hash(created), hash(parsed))
+        self.assertNotEqual(Airport.create('IATA', 'GDN'), parsed)
+        self.assertNotEqual(parsed, Aircraft(tail_number='IATA'))
+
+        airports = {parsed, created, Airport.create('IATA', 'GDN')}
+        self.assertEqual(2, len(airports))
+
+        flight = Flight(tail_number='LN-KKA', takeoff_airport=created, landing_airport=parsed,
+                        passengers=['A', 'B'])
+        other = Flight(tail_number='LN-KKA', takeoff_airport=parsed, landing_airport=created,
+                       passengers=['A', 'B'])
+        self.assertEqual(flight, other)
+        self.assertEqual(hash(flight), hash(other))
+
+    def test_hash_follows_field_assignment(self):
+        airport = Airport.create('IATA', 'WAW')
+        old_hash = hash(airport)
+        airport.code = 'GDN'
+        self.assertNotEqual(old_hash, hash(airport))
+        self.assertEqual(hash(Airport.create('IATA', 'GDN')), hash(airport))
+
+    def test_equality_and_hash_follow_in_place_modifications(self):
+        flight = Flight(tail_number='LN-KKA', takeoff_airport=Airport.create('IATA', 'WAW'), passengers=['A'])
+        other = Flight(tail_number='LN-KKA', takeoff_airport=Airport.create('IATA', 'GDN'), passengers=['A', 'B'])
+        self.assertNotEqual(hash(flight), hash(other))
+        flight.passengers.append('B')
+        flight.takeoff_airport.code = 'GDN'
+        self.assertEqual(flight, other)
+        self.assertEqual(hash(flight), hash(other))
+
+    def test_ordering(self):
+        waw = Airport.create('IATA', 'WAW')
+        gdn = Airport.create('IATA', 'GDN')
+        unknown = Airport.create('IATA', None)
+        self.assertEqual([unknown, gdn, waw], sorted([waw, gdn, unknown]))
+        self.assertTrue(gdn < waw)
+        self.assertTrue(waw >= gdn)
+        self.assertRaises(TypeError, lambda: waw < Aircraft())
+
     def test_attribute_parsing(self):
         XML = b'<aircraft tail_number="LN-KKX"/>\n'
         aircraft = Aircraft.parsexml(XML)
@@ -531,6 +606,307 @@ class ComplexTest(unittest.TestCase):
         assert_equals('bar', foo.name)
 
 
+class CompactItem(xsd.ComplexType):
+    COMPACT = True
+    sku = xsd.Attribute(xsd.String)
+    quantity = xsd.Element(xsd.Integer)
+
+
+class CompactPricedItem(CompactItem):
+    price = xsd.Element(xsd.Decimal)
+
+
+class CompactCatalogue(xsd.ComplexType):
+    COMPACT = True
+    items = xsd.ListElement(CompactPricedItem, 'item')
+
+
+class CompactTest(unittest.TestCase):
+
+    def test_instances_have_no_dict(self):
+        item = CompactPricedItem(sku='A1', quantity=3, price=1.5)
+        self.assertFalse(hasattr(item, '__dict__'))
+        self.assertEqual(('price', ), CompactPricedItem.__slots__)
+        self.assertEqual(['sku', 'quantity', 'price'], [f._name for f in CompactPricedItem._meta.all])
+        self.assertRaises(ValueError, setattr, item, 'invalid', 'foo')
+        self.assertRaises(ValueError, setattr, item, 'quantity', 'foo')
+
+    def test_parsing_and_rendering(self):
+        xml = b'''<catalogue>
+  <item sku="A1">
+    <quantity>3</quantity>
+    <price>1.5</price>
+  </item>
+  <item sku="B2">
+    <quantity>1</quantity>
+    <price>20.5</price>
+  </item>
+</catalogue>
+'''
+        catalogue = CompactCatalogue.parsexml(xml)
+        self.assertEqual(['A1', 'B2'], [item.sku for item in catalogue.items])
+        self.assertEqual([3, 1], [item.quantity for item in catalogue.items])
+        self.assertFalse(hasattr(catalogue.items[0], '__dict__'))
+        self.assertEqual(xml, catalogue.xml('catalogue'))
+
+    def test_equality_and_hash(self):
+        item = CompactPricedItem(sku='A1', quantity=3, price=1.5)
+        same = CompactPricedItem.parsexml(b'<item sku="A1"><quantity>3</quantity><price>1.5</price></item>')
+        self.assertEqual(item, same)
+        self.assertEqual(1, len({item, same}))
+        hash(item)
+        item.quantity = 4
+        self.assertNotEqual(item, same)
+        self.assertNotEqual(hash(item), hash(same))
+
+
+class Shipment(xsd.ComplexType):
+    number = xsd.Element(xsd.String)
+    catalogue = xsd.Element(CompactCatalogue)
+    labels = xsd.ListElement(xsd.String, 'label', nillable=True)
+
+
+class IterparseTest(unittest.TestCase):
+    XML = b'''<shipment>
+  <number>S1</number>
+  <catalogue>
+    <item sku="A1"><quantity>3</quantity><price>1.5</price></item>
+    <!-- comment -->
+    <item sku="B2"><quantity>1</quantity><price>20.5</price></item>
+  </catalogue>
+  <label>fragile</label>
+  <label xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" xsi:nil="true"/>
+</shipment>
+'''
+
+    def test_yields_items_of_nested_list(self):
+        items = Shipment.iterparse(BytesIO(self.XML), 'catalogue.items')
+        self.assertEqual(['A1', 'B2'], [item.sku for item in items])
+
+        item = next(Shipment.iterparse(BytesIO(self.XML), 'catalogue.items'))
+        self.assertEqual(CompactPricedItem(sku='A1', quantity=3, price=1.5), item)
+        self.assertFalse(hasattr(item, '_xmlelement'))
+
+    def test_yields_simple_values_and_nil(self):
+        labels = list(Shipment.iterparse(BytesIO(self.XML), 'labels'))
+        self.assertEqual(['fragile', xsd.NIL], labels)
+        numbers = list(Shipment.iterparse(BytesIO(self.XML), 'number'))
+        self.assertEqual(['S1'], numbers)
+
+    def test_can_skip_enclosing_elements(self):
+        xml = b'<Envelope><Body>%s</Body></Envelope>' % self.XML
+        items = Shipment.iterparse(BytesIO(xml), 'catalogue.items', ancestors=('Envelope', 'Body'))
+        self.assertEqual(['A1', 'B2'], [item.sku for item in items])
+        self.assertEqual([], list(Shipment.iterparse(BytesIO(xml), 'catalogue.items', ancestors=('Body', ))))
+
+    def test_rejects_invalid_paths(self):
+        self.assertRaises(ValueError, Shipment.iterparse, BytesIO(self.XML), 'invalid')
+        self.assertRaises(ValueError, Shipment.iterparse, BytesIO(self.XML), 'number.invalid')
+        self.assertRaises(ValueError, Shipment.iterparse, BytesIO(self.XML), 'catalogue.items.sku')
+
+
+class LazyParsingTest(unittest.TestCase):
+    FLIGHT_XML = b'''<flight>
+  <tail_number>LN-KKA</tail_number>
+  <takeoff_datetime>2001-10-26T21:32:52</takeoff_datetime>
+  <takeoff_airport><type>IATA</type><code>WAW</code></takeoff_airport>
+  <landing_airport><type>ICAO</type><code>EGLL</code></landing_airport>
+  <passenger>A</passenger>
+  <passenger>B</passenger>
+</flight>
+'''
+
+    def test_fields_are_parsed_on_access(self):
+        flight = Flight.parsexml(self.FLIGHT_XML, lazy=True)
+        self.assertNotIn('takeoff_airport', flight.__dict__)
+        self.assertEqual('WAW', flight.takeoff_airport.code)
+        self.assertIn('takeoff_airport', flight.__dict__)
+        self.assertIs(flight.takeoff_airport, flight.takeoff_airport)
+        self.assertNotIn('code', flight.landing_airport.__dict__)
+        self.assertEqual(['A', 'B'], flight.passengers)
+        self.assertIsNone(flight.takeoff_pilot)
+
+        self.assertEqual(Flight.parsexml(self.FLIGHT_XML), Flight.parsexml(self.FLIGHT_XML, lazy=True))
+        self.assertEqual(Flight.parsexml(self.FLIGHT_XML).xml('flight'),
+                         Flight.parsexml(self.FLIGHT_XML, lazy=True).xml('flight'))
+
+    def test_assigned_values_are_kept(self):
+        flight = Flight.parsexml(self.FLIGHT_XML, lazy=True)
+        flight.tail_number = 'LN-KKB'
+        flight.passengers.append('C')
+        self.assertEqual('LN-KKB', flight.tail_number)
+        self.assertEqual(['A', 'B', 'C'], flight.passengers)
+
+    def test_invalid_values_are_detected_on_access(self):
+        xml = self.FLIGHT_XML.replace(b'2001-10-26T21:32:52', b'invalid')
+        flight = Flight.parsexml(xml, lazy=True)
+        self.assertEqual('LN-KKA', flight.tail_number)
+        self.assertRaises(ValueError, getattr, flight, 'takeoff_datetime')
+
+    def test_groups_attributes_and_compact_types(self):
+        operation = Operation.parsexml(GroupTest.XML, lazy=True)
+        self.assertEqual('IN', operation.requestResponseOperation.input)
+        self.assertEqual('TEST-Operation', operation.name)
+
+        shipment = Shipment.parsexml(IterparseTest.XML, lazy=True)
+        item = shipment.catalogue.items[1]
+        self.assertFalse(hasattr(item, '__dict__'))
+        self.assertEqual('B2', item.sku)
+        self.assertEqual(Decimal('20.5'), item.price)
+        self.assertEqual(['fragile', xsd.NIL], shipment.labels)
+        self.assertRaises(AttributeError, getattr, item, 'invalid')
+
+    def test_lazy_class_setting(self):
+        Airport.LAZY = True
+        try:
+            flight = Flight.parsexml(self.FLIGHT_XML)
+        finally:
+            del Airport.LAZY
+        self.assertIn('tail_number', flight.__dict__)
+        self.assertNotIn('code', flight.takeoff_airport.__dict__)
+        self.assertEqual('WAW', flight.takeoff_airport.code)
+
+
+class ProjectionTest(unittest.TestCase):
+
+    def test_parses_only_selected_fields(self):
+        flight = Flight.parsexml(LazyParsingTest.FLIGHT_XML, only=['tail_number', 'takeoff_airport.code'])
+        self.assertEqual('LN-KKA', flight.tail_number)
+        self.assertEqual('WAW', flight.takeoff_airport.code)
+        self.assertIsNone(flight.takeoff_airport.type)
+        self.assertIsNone(flight.landing_airport)
+        self.assertIsNone(flight.takeoff_datetime)
+        self.assertEqual([], flight.passengers)
+
+    def test_selects_fields_of_list_items_and_groups(self):
+        shipment = Shipment.parsexml(IterparseTest.XML, only=['catalogue.items.sku', 'catalogue.items.price'])
+        self.assertEqual(['A1', 'B2'], [item.sku for item in shipment.catalogue.items])
+        self.assertEqual([None, None], [item.quantity for item in shipment.catalogue.items])
+        self.assertEqual(Decimal('20.5'), shipment.catalogue.items[1].price)
+        self.assertIsNone(shipment.number)
+
+        operation = Operation.parsexml(GroupTest.XML, only=['requestResponseOperation.output'])
+        self.assertIsNone(operation.name)
+        self.assertIsNone(operation.requestResponseOperation.input)
+        self.assertEqual('OUT', operation.requestResponseOperation.output)
+
+    def test_selecting_a_field_selects_all_nested_fields(self):
+        flight = Flight.parsexml(LazyParsingTest.FLIGHT_XML, only=['takeoff_airport.code', 'takeoff_airport'])
+        self.assertEqual(Airport.create('IATA', 'WAW'), flight.takeoff_airport)
+
+    def test_can_be_combined_with_lazy_parsing(self):
+        flight = Flight.parsexml(LazyParsingTest.FLIGHT_XML, lazy=True, only=['takeoff_airport.code'])
+        self.assertIsNone(flight.tail_number)
+        self.assertEqual('WAW', flight.takeoff_airport.code)
+        self.assertIsNone(flight.takeoff_airport.type)
+
+    def test_rejects_unknown_fields(self):
+        self.assertRaises(ValueError, Flight.parsexml, LazyParsingTest.FLIGHT_XML, only=['invalid'])
+        self.assertRaises(ValueError, Flight.parsexml, LazyParsingTest.FLIGHT_XML, only=['takeoff_airport.invalid'])
+        # checked even if the document does not contain the element
+        xml = b'<flight><tail_number>LN-KKA</tail_number></flight>'
+        self.assertRaises(ValueError, Flight.parsexml, xml, only=['takeoff_airport.invalid'])
+        self.assertRaises(ValueError, Flight.parsexml, xml, only=['tail_number.bogus'])
+        self.assertRaises(ValueError, Flight.parsexml, xml, lazy=True, only=['landing_airport.code.bogus'])
+
+
+class IncrementalRenderingTest(unittest.TestCase):
+
+    def test_output_matches_xml(self):
+        shipment = Shipment(number='S1', labels=['fragile', xsd.NIL])
+        shipment.catalogue = CompactCatalogue(items=[
+            CompactPricedItem(sku='A%d' % i, quantity=i, price=1.5) for i in range(50)
+        ])
+        expected_xml = shipment.xml('shipment', pretty_print=False)
+
+        chunks = list(shipment.xml_chunks('shipment', chunk_size=100))
+        self.assertTrue(len(chunks) > 10)
+        self.assertEqual(expected_xml, b''.join(chunks))
+
+        output = BytesIO()
+        shipment.write_xml(output, 'shipment')
+        self.assertEqual(expected_xml, output.getvalue())
+
+    def test_renders_types_with_groups_as_a_whole(self):
+        operation = Operation(name='TEST-Operation')
+        operation.requestResponseOperation.input = 'IN'
+        self.assertFalse(Operation._meta.writable)
+        self.assertEqual(operation.xml('operation', pretty_print=False), b''.join(operation.xml_chunks('operation')))
+
+    def test_qualified_output_is_equivalent(self):
+        airport = Airport.create('IATA', 'WAW')
+        flight = Flight(tail_number='LN-KKA', takeoff_airport=airport, landing_airport=airport, passengers=['A'])
+        kwargs = dict(namespace='http://flight.example/', elementFormDefault=xsd.ElementFormDefault.QUALIFIED)
+        xml = b''.join(flight.xml_chunks('flight', **kwargs))
+        self.assertEqual(flight, Flight.parsexml(xml))
+        self.assertEqual(flight.xml('flight', pretty_print=False, **kwargs), xml)
+
+
+class CompiledTest(unittest.TestCase):
+
+    def setUp(self):
+        xsd.ComplexType.COMPILED = True
+
+    def tearDown(self):
+        xsd.ComplexType.COMPILED = False
+
+    def _assert_same_as_generic(self, cls, xml, tagname):
+        compiled = cls.parsexml(xml)
+        xsd.ComplexType.COMPILED = False
+        generic = cls.parsexml(xml)
+        generic_xml = generic.xml(tagname)
+        xsd.ComplexType.COMPILED = True
+        self.assertEqual(generic, compiled)
+        self.assertEqual(generic_xml, compiled.xml(tagname))
+        self.assertEqual(generic_xml, generic.xml(tagname))
+
+    def test_output_matches_generic_code(self):
+        for cls in (Flight, Airport, Shipment, CompactCatalogue, CompactPricedItem, Operation):
+            self.assertTrue(cls._meta.compiled_parser() is not None, cls.__name__)
+        self._assert_same_as_generic(Flight, LazyParsingTest.FLIGHT_XML, 'flight')
+        self._assert_same_as_generic(Shipment, IterparseTest.XML, 'shipment')
+        self._assert_same_as_generic(Operation, GroupTest.XML, 'operation')
+
+        shipment = Shipment.parsexml(IterparseTest.XML)
+        self.assertFalse(hasattr(shipment.catalogue.items[0], '__dict__'))
+        self.assertEqual(['fragile', xsd.NIL], shipment.labels)
+        self.assertRaises(ValueError, shipment.labels.append, 1)
+
+    def test_qualified_rendering(self):
+        airport = Airport.create('IATA', 'WAW')
+        flight = Flight(tail_number='LN-KKA', takeoff_airport=airport, passengers=['A', xsd.NIL])
+        kwargs = dict(namespace='http://flight.example/', elementFormDefault=xsd.ElementFormDefault.QUALIFIED)
+        xml = flight.xml('flight', **kwargs)
+        xsd.ComplexType.COMPILED = False
+        self.assertEqual(flight.xml('flight', **kwargs), xml)
+
+    def test_validation_errors(self):
+        xml = LazyParsingTest.FLIGHT_XML.replace(b'2001-10-26T21:32:52', b'invalid')
+        self.assertRaises(ValueError, Flight.parsexml, xml)
+        nil = b'xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" xsi:nil="true"'
+        xml = IterparseTest.XML.replace(b'<label>fragile</label>', b'<label %s/>' % nil)
+        self.assertEqual([xsd.NIL, xsd.NIL], Shipment.parsexml(xml).labels)
+        self.assertRaises(ValueError, Flight.parsexml, b'<flight><passenger %s/></flight>' % nil)
+        self.assertRaises(ValueError, Flight.parsexml, b'<flight>%s</flight>' % (b'<passenger>A</passenger>' * 11))
+
+    def test_unsupported_types_use_generic_code(self):
+        class Payment(xsd.ComplexType):
+            INDICATOR = xsd.Choice
+            cash = xsd.Element(xsd.Integer)
+            card = xsd.Element(xsd.String)
+
+        self.assertIsNone(Payment._meta.compiled_parser())
+        payment = Payment.parse_xmlelement(etree.fromstring(b'<card>1234</card>'))
+        self.assertEqual('1234', payment.card)
+        self.assertIsNone(payment.cash)
+
+    def test_parse_options_use_generic_code(self):
+        flight = Flight.parsexml(LazyParsingTest.FLIGHT_XML, only=['tail_number'])
+        self.assertIsNone(flight.takeoff_airport)
+        flight = Flight.parsexml(LazyParsingTest.FLIGHT_XML, retain_xmlelement=False)
+        self.assertFalse(hasattr(flight, '_xmlelement'))
+
+
 class XMLParsingTest(unittest.TestCase):
     SIMPLE_XML = b'''<flight>
   <landing_airport>
@@ -579,6 +955,56 @@ class XMLParsingTest(unittest.TestCase):
         self.assertEqual('ICAO', flight.landing_airport.type)
         self.assertEqual(['abc', '123'], flight.passengers)
 
+    def test_parsing_ignores_namespaces_and_comments(self):
+        xml = b'''<ns0:flight xmlns:ns0="http://flight.example/">
+  <!-- first passenger -->
+  <ns0:passenger>abc</ns0:passenger>
+  <unknown>ignored</unknown>
+  <?pi ignored?>
+  <tail_number>LN-KKA</tail_number>
+  <ns0:passenger>123</ns0:passenger>
+</ns0:flight>
+'''
+        flight = Flight.parse_xmlelement(etree.fromstring(xml))
+        self.assertEqual('LN-KKA', flight.tail_number)
+        self.assertEqual(['abc', '123'], flight.passengers)
+        self.assertEqual((Flight.passengers, ), Flight._meta.fields_for_tag('{http://flight.example/}passenger'))
+        self.assertEqual((), Flight._meta.fields_for_tag('unknown'))
+
+    def test_can_drop_xmlelement_per_call(self):
+        flight = Flight.parse_xmlelement(etree.fromstring(self.LIST_XML), retain_xmlelement=False)
+        self.assertEqual('WAW', flight.takeoff_airport.code)
+        self.assertFalse(hasattr(flight, '_xmlelement'))
+        self.assertFalse(hasattr(flight.takeoff_airport, '_xmlelement'))
+
+        flight = Flight.parsexml(self.LIST_XML)
+        self.assertEqual('flight', flight._xmlelement.tag)
+        self.assertEqual('takeoff_airport', flight.takeoff_airport._xmlelement.tag)
+
+    def test_can_drop_xmlelement_per_class(self):
+        class DetachedAirport(Airport):
+            RETAIN_XMLELEMENT = False
+
+        class DetachedFlight(xsd.ComplexType):
+            tail_number = xsd.Element(xsd.String)
+            takeoff_airport = xsd.Element(DetachedAirport)
+
+        flight = DetachedFlight.parsexml(self.LIST_XML)
+        self.assertEqual('WAW', flight.takeoff_airport.code)
+        self.assertEqual('flight', flight._xmlelement.tag)
+        self.assertFalse(hasattr(flight.takeoff_airport, '_xmlelement'))
+        # equality does not depend on the XML tree
+        self.assertEqual(flight.takeoff_airport, flight.takeoff_airport)
+
+    def test_can_drop_xmlelement_globally(self):
+        xsd.ComplexType.RETAIN_XMLELEMENT = False
+        try:
+            flight = Flight.parsexml(self.LIST_XML)
+        finally:
+            xsd.ComplexType.RETAIN_XMLELEMENT = True
+        self.assertEqual('LN-KKA', flight.tail_number)
+        self.assertFalse(hasattr(flight, '_xmlelement'))
+
 
 class XSD_Spec_Test(unittest.TestCase):
     AIRPORT_XML = '''